@@ -10,7 +10,7 @@ from app.config import DATABASE_URL
 from app.models import Base
 
 config = context.config
-config.set_main_option('sqlalchemy.url', DATABASE_URL.replace('+asyncpg', ''))
+config.set_main_option('sqlalchemy.url', DATABASE_URL.replace('+asyncpg', '').replace('+aiosqlite', ''))
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
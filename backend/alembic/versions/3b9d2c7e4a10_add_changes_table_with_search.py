@@ -0,0 +1,93 @@
+"""add changes table with full-text search
+
+Revision ID: 3b9d2c7e4a10
+Revises: f61fe514b7c7
+Create Date: 2026-10-19 00:21:47.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3b9d2c7e4a10'
+down_revision = 'f61fe514b7c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'changes',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('source_id', sa.String(), nullable=False),
+        sa.Column('source_name', sa.String(), nullable=False),
+        sa.Column('change_summary', sa.Text(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=False),
+        sa.Column('risk_level', sa.String(), nullable=False),
+        sa.Column('affected_sector', sa.String(), nullable=True),
+        sa.Column('link', sa.Text(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('matched_keywords', sa.Text(), nullable=True),
+        sa.Column('analysis_summary', sa.Text(), nullable=True),
+        sa.Column('ingest_seq', sa.BigInteger(), nullable=False),
+        sa.Column('ingested_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_changes_source_id', 'changes', ['source_id'])
+    op.create_index('ix_changes_detected_at', 'changes', ['detected_at'])
+    op.create_index('ix_changes_risk_level', 'changes', ['risk_level'])
+    op.create_index('ix_changes_ingest_seq', 'changes', ['ingest_seq'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Weighted: title (A), keywords and analysis summary (B), content (C)
+        op.execute("""
+            ALTER TABLE changes ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(change_summary, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(matched_keywords, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(analysis_summary, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(content, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_changes_search_vector ON changes USING GIN (search_vector)")
+    else:
+        op.execute("""
+            CREATE VIRTUAL TABLE changes_fts USING fts5(
+                change_summary, content, matched_keywords, analysis_summary,
+                content='changes', content_rowid='rowid', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER changes_fts_insert AFTER INSERT ON changes BEGIN
+                INSERT INTO changes_fts(rowid, change_summary, content, matched_keywords, analysis_summary)
+                VALUES (new.rowid, new.change_summary, new.content, new.matched_keywords, new.analysis_summary);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER changes_fts_delete AFTER DELETE ON changes BEGIN
+                INSERT INTO changes_fts(changes_fts, rowid, change_summary, content, matched_keywords, analysis_summary)
+                VALUES ('delete', old.rowid, old.change_summary, old.content, old.matched_keywords, old.analysis_summary);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER changes_fts_update AFTER UPDATE ON changes BEGIN
+                INSERT INTO changes_fts(changes_fts, rowid, change_summary, content, matched_keywords, analysis_summary)
+                VALUES ('delete', old.rowid, old.change_summary, old.content, old.matched_keywords, old.analysis_summary);
+                INSERT INTO changes_fts(rowid, change_summary, content, matched_keywords, analysis_summary)
+                VALUES (new.rowid, new.change_summary, new.content, new.matched_keywords, new.analysis_summary);
+            END
+        """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_changes_search_vector")
+    else:
+        op.execute("DROP TRIGGER IF EXISTS changes_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS changes_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS changes_fts_insert")
+        op.execute("DROP TABLE IF EXISTS changes_fts")
+    op.drop_index('ix_changes_ingest_seq', table_name='changes')
+    op.drop_index('ix_changes_risk_level', table_name='changes')
+    op.drop_index('ix_changes_detected_at', table_name='changes')
+    op.drop_index('ix_changes_source_id', table_name='changes')
+    op.drop_table('changes')
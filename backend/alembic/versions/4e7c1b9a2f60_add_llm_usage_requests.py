@@ -0,0 +1,25 @@
+"""add llm usage requests
+
+Revision ID: 4e7c1b9a2f60
+Revises: 6d2b8e4f1a93
+Create Date: 2026-10-19 02:24:31.806127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '4e7c1b9a2f60'
+down_revision = '6d2b8e4f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Usage recorded before this column has no count of its Gemini calls
+    op.add_column('llm_usage', sa.Column('requests', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('llm_usage') as batch_op:
+        batch_op.drop_column('requests')
@@ -0,0 +1,41 @@
+"""add analysis cache table
+
+Revision ID: 5c1e9b7d3f24
+Revises: 8e4f1a6c2d57
+Create Date: 2026-10-19 00:50:27.581930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5c1e9b7d3f24'
+down_revision = '8e4f1a6c2d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analysis_cache',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('change_id', sa.String(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('knowledge_version', sa.String(), nullable=True),
+        sa.Column('obligation_id', sa.String(), nullable=True),
+        sa.Column('cached_at', sa.DateTime(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_analysis_cache_change_id', 'analysis_cache', ['change_id'])
+    op.create_index('ix_analysis_cache_knowledge_version', 'analysis_cache', ['knowledge_version'])
+    op.create_index('ix_analysis_cache_obligation_id', 'analysis_cache', ['obligation_id'])
+    op.create_index('ix_analysis_cache_cached_at', 'analysis_cache', ['cached_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_cache_cached_at', table_name='analysis_cache')
+    op.drop_index('ix_analysis_cache_obligation_id', table_name='analysis_cache')
+    op.drop_index('ix_analysis_cache_knowledge_version', table_name='analysis_cache')
+    op.drop_index('ix_analysis_cache_change_id', table_name='analysis_cache')
+    op.drop_table('analysis_cache')
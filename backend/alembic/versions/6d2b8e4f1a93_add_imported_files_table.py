@@ -0,0 +1,29 @@
+"""add imported files table
+
+Revision ID: 6d2b8e4f1a93
+Revises: 9a4c7e2b5d18
+Create Date: 2026-10-19 02:10:04.271653
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '6d2b8e4f1a93'
+down_revision = '9a4c7e2b5d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'imported_files',
+        sa.Column('digest', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('imported_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('digest'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('imported_files')
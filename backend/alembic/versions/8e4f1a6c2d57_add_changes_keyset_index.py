@@ -0,0 +1,22 @@
+"""add composite index for keyset pagination of changes
+
+Revision ID: 8e4f1a6c2d57
+Revises: 3b9d2c7e4a10
+Create Date: 2026-10-19 00:31:12.318204
+
+"""
+from alembic import op
+
+
+revision = '8e4f1a6c2d57'
+down_revision = '3b9d2c7e4a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_changes_detected_at_id', 'changes', ['detected_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_changes_detected_at_id', table_name='changes')
@@ -0,0 +1,29 @@
+"""version analysis cache keys
+
+Revision ID: 9a4c7e2b5d18
+Revises: c8f2a6d1e937
+Create Date: 2026-10-19 01:55:52.630917
+
+"""
+from alembic import op
+
+
+revision = '9a4c7e2b5d18'
+down_revision = 'c8f2a6d1e937'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keys end with the knowledge version the analysis was made with; unversioned analyses are stale anyway
+    op.execute("UPDATE analysis_cache SET key = key || '@' || COALESCE(knowledge_version, '')")
+
+
+def downgrade() -> None:
+    # Plain keys hold one analysis per change and tenant: keep the latest
+    op.execute(
+        "DELETE FROM analysis_cache AS older WHERE EXISTS ("
+        "SELECT 1 FROM analysis_cache AS newer WHERE newer.change_id = older.change_id "
+        "AND newer.tenant_id = older.tenant_id AND (newer.cached_at, newer.key) > (older.cached_at, older.key))"
+    )
+    op.execute("UPDATE analysis_cache SET key = substr(key, 1, length(key) - length(COALESCE(knowledge_version, '')) - 1)")
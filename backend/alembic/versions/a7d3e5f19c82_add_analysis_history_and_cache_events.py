@@ -0,0 +1,42 @@
+"""add analysis history and cache events tables
+
+Revision ID: a7d3e5f19c82
+Revises: 5c1e9b7d3f24
+Create Date: 2026-10-19 00:59:05.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a7d3e5f19c82'
+down_revision = '5c1e9b7d3f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analysis_history',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('update_text', sa.Text(), nullable=False),
+        sa.Column('result', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'cache_events',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cache_events_created_at', 'cache_events', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cache_events_created_at', table_name='cache_events')
+    op.drop_table('cache_events')
+    op.drop_table('analysis_history')
@@ -0,0 +1,32 @@
+"""add llm usage table
+
+Revision ID: b5e1d8f3a274
+Revises: e2f7a9c4b613
+Create Date: 2026-10-19 01:20:12.508194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b5e1d8f3a274'
+down_revision = 'e2f7a9c4b613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'llm_usage',
+        sa.Column('minute', sa.DateTime(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('calls', sa.Integer(), nullable=False),
+        sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('minute', 'source', 'tenant_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('llm_usage')
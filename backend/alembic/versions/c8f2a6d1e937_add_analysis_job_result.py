@@ -0,0 +1,24 @@
+"""add analysis job result
+
+Revision ID: c8f2a6d1e937
+Revises: b5e1d8f3a274
+Create Date: 2026-10-19 01:36:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c8f2a6d1e937'
+down_revision = 'b5e1d8f3a274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analysis_jobs', sa.Column('result', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.drop_column('result')
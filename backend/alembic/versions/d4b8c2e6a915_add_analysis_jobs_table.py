@@ -0,0 +1,40 @@
+"""add analysis jobs table
+
+Revision ID: d4b8c2e6a915
+Revises: a7d3e5f19c82
+Create Date: 2026-10-19 01:08:37.512908
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd4b8c2e6a915'
+down_revision = 'a7d3e5f19c82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analysis_jobs',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('change_id', sa.String(), nullable=False),
+        sa.Column('change', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('change_id')
+    )
+    op.create_index('ix_analysis_jobs_status_run_after', 'analysis_jobs', ['status', 'run_after'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_jobs_status_run_after', table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
@@ -0,0 +1,35 @@
+"""add analysis job priority
+
+Revision ID: e2f7a9c4b613
+Revises: d4b8c2e6a915
+Create Date: 2026-10-19 01:13:49.230571
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e2f7a9c4b613'
+down_revision = 'd4b8c2e6a915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('analysis_jobs', sa.Column('risk_level', sa.String(), nullable=False, server_default='high'))
+    # Jobs queued before priorities keep their queue order
+    op.add_column('analysis_jobs', sa.Column('rank_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE analysis_jobs SET rank_at = run_after")
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.alter_column('risk_level', server_default=None)
+        batch_op.alter_column('rank_at', existing_type=sa.DateTime(), nullable=False)
+    op.drop_index('ix_analysis_jobs_status_run_after', table_name='analysis_jobs')
+    op.create_index('ix_analysis_jobs_status_rank_at', 'analysis_jobs', ['status', 'rank_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_jobs_status_rank_at', table_name='analysis_jobs')
+    op.create_index('ix_analysis_jobs_status_run_after', 'analysis_jobs', ['status', 'run_after'])
+    with op.batch_alter_table('analysis_jobs') as batch_op:
+        batch_op.drop_column('rank_at')
+        batch_op.drop_column('risk_level')
@@ -0,0 +1,6 @@
+from app.config import IMPORT_TIMING
+
+if IMPORT_TIMING:
+    # Installed before any other app module loads, so all of them are timed
+    from app.startup import install_import_timer
+    install_import_timer()
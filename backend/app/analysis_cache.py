@@ -0,0 +1,421 @@
+"""
+Two-tier analysis cache.
+
+A bounded in-memory LRU of CacheEntry records, with a TTL, sits in front
+of the durable tier, the `analysis_cache` table in the database:
+- Reads go through the memory tier to the database (read-through), and
+  entries read from the database are kept in memory for the next request.
+- New analyses go into the memory tier at once and are written to the
+  database in batches shortly after (write-behind), so an analysis never
+  waits on a database write.
+- The TTL bounds how long an entry is served from memory before it is
+  re-read; the database keeps every analysis until it is invalidated.
+
+Writes and invalidations are published as cache events (app.events), so
+other worker processes drop their in-memory copies of affected entries.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import json
+import time
+
+from sqlalchemy import and_, delete, func, not_, or_, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db import engine
+from app.events import publish
+from app.metrics import cache_evictions
+from app.models import CachedAnalysis, ImportedFile
+from app.records import CacheEntry
+
+# Seconds to wait before retrying a failed write to the database
+FLUSH_RETRY_DELAY = 5.0
+
+# Rows per IN (...) lookup or upsert statement
+DB_BATCH_SIZE = 500
+
+
+class MemoryTier:
+    """Bounded LRU of cache entries, each expiring `ttl` seconds after it was loaded."""
+
+    def __init__(self, max_entries: int, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is not None and self.ttl and time.monotonic() - item[0] > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            item = None
+        if item is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = (time.monotonic(), entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+            cache_evictions.inc(cache="analysis_memory")
+
+    def discard(self, key: str) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def remove(self, selected: Callable[[CacheEntry], bool]) -> int:
+        """Remove the entries a predicate selects."""
+        keys = [key for key, (_, entry) in self._entries.items() if selected(entry)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def entries(self) -> Dict[str, CacheEntry]:
+        """Entries currently in memory, least recently used first."""
+        return {key: entry for key, (_, entry) in self._entries.items()}
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class Selection:
+    """
+    Analyses selected for invalidation.
+
+    With no criteria every analysis is selected; otherwise an analysis
+    must match all of the given ones.
+    """
+
+    def __init__(self, change_id: Optional[str] = None, obligation_id: Optional[str] = None,
+                 knowledge_version: Optional[str] = None, current_versions: Optional[Dict[str, str]] = None,
+                 tenant_id: Optional[str] = None):
+        self.change_id = change_id
+        self.obligation_id = obligation_id
+        self.knowledge_version = knowledge_version
+        # Select analyses made with any knowledge version but their tenant's
+        # current one (tenant ID to version), or for a tenant no longer there
+        self.current_versions = current_versions
+        self.tenant_id = tenant_id
+
+    def to_dict(self) -> Dict:
+        """The selection's criteria, as keyword arguments for Selection()."""
+        return {
+            name: value for name, value in (
+                ("change_id", self.change_id),
+                ("obligation_id", self.obligation_id),
+                ("knowledge_version", self.knowledge_version),
+                ("current_versions", self.current_versions),
+                ("tenant_id", self.tenant_id),
+            ) if value is not None
+        }
+
+    def matches(self, entry: CacheEntry) -> bool:
+        return (
+            (self.change_id is None or entry.change_id == self.change_id)
+            and (self.obligation_id is None or entry.analysis.obligation_id == self.obligation_id)
+            and (self.knowledge_version is None or entry.knowledge_version == self.knowledge_version)
+            and (self.current_versions is None
+                 or entry.knowledge_version != self.current_versions.get(entry.tenant_id))
+            and (self.tenant_id is None or entry.tenant_id == self.tenant_id)
+        )
+
+    def where(self) -> List:
+        """The selection as SQL conditions on the `analysis_cache` table."""
+        table = CachedAnalysis.__table__.c
+        conditions = []
+        if self.change_id is not None:
+            conditions.append(table.change_id == self.change_id)
+        if self.obligation_id is not None:
+            conditions.append(table.obligation_id == self.obligation_id)
+        if self.knowledge_version is not None:
+            conditions.append(table.knowledge_version == self.knowledge_version)
+        if self.current_versions is not None:
+            current = [
+                and_(table.tenant_id == tenant_id, table.knowledge_version == version)
+                for tenant_id, version in self.current_versions.items()
+            ]
+            conditions.append(not_(or_(*current)) if current else true())
+        if self.tenant_id is not None:
+            conditions.append(table.tenant_id == self.tenant_id)
+        return conditions
+
+
+# Durable tier
+
+def entry_to_row(key: str, entry: CacheEntry) -> Dict:
+    """Convert a cache entry into an `analysis_cache` table row."""
+    try:
+        cached_at = datetime.fromisoformat(entry.cached_at)
+    except (TypeError, ValueError):
+        cached_at = datetime.now()
+    return {
+        "key": key,
+        "change_id": entry.change_id,
+        "tenant_id": entry.tenant_id,
+        "knowledge_version": entry.knowledge_version,
+        "obligation_id": entry.analysis.obligation_id,
+        "cached_at": cached_at,
+        "payload": json.dumps(entry.to_dict(), ensure_ascii=False),
+    }
+
+
+async def load_entries(keys: Iterable[str]) -> Dict[str, CacheEntry]:
+    """Read cache entries from the database."""
+    keys = list(keys)
+    table = CachedAnalysis.__table__
+    entries = {}
+    async with engine.connect() as connection:
+        for start in range(0, len(keys), DB_BATCH_SIZE):
+            result = await connection.execute(
+                select(table.c.key, table.c.payload).where(table.c.key.in_(keys[start:start + DB_BATCH_SIZE]))
+            )
+            for key, payload in result:
+                entries[key] = CacheEntry.from_dict(json.loads(payload))
+    return entries
+
+
+async def load_recent_entries(limit: int) -> Dict[str, CacheEntry]:
+    """Read the most recently cached entries from the database, oldest first."""
+    table = CachedAnalysis.__table__
+    async with engine.connect() as connection:
+        result = await connection.execute(
+            select(table.c.key, table.c.payload).order_by(table.c.cached_at.desc()).limit(limit)
+        )
+        rows = result.all()
+    return {key: CacheEntry.from_dict(json.loads(payload)) for key, payload in reversed(rows)}
+
+
+async def write_entries(entries: Dict[str, CacheEntry]) -> None:
+    """Insert or update cache entries in the database."""
+    rows = [entry_to_row(key, entry) for key, entry in entries.items()]
+    if not rows:
+        return
+
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(CachedAnalysis.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=["key"],
+        set_={name: statement.excluded[name] for name in rows[0] if name != "key"}
+    )
+    async with engine.begin() as connection:
+        for start in range(0, len(rows), DB_BATCH_SIZE):
+            await connection.execute(statement, rows[start:start + DB_BATCH_SIZE])
+
+
+async def delete_entries(selection: Selection) -> int:
+    """Delete the selected cache entries from the database."""
+    async with engine.begin() as connection:
+        result = await connection.execute(delete(CachedAnalysis.__table__).where(*selection.where()))
+    return result.rowcount
+
+
+async def is_file_imported(digest: str) -> bool:
+    """Whether a cache file with these contents was already imported."""
+    async with engine.connect() as connection:
+        result = await connection.execute(
+            select(ImportedFile.__table__.c.digest).where(ImportedFile.__table__.c.digest == digest)
+        )
+        return result.first() is not None
+
+
+async def record_file_import(digest: str, name: str) -> None:
+    """Record that a cache file was imported."""
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(ImportedFile.__table__).on_conflict_do_nothing(index_elements=["digest"])
+    async with engine.begin() as connection:
+        await connection.execute(statement, {"digest": digest, "name": name, "imported_at": datetime.utcnow()})
+
+
+async def count_entries() -> Dict[str, Dict[str, int]]:
+    """Count the cache entries in the database by knowledge version and by tenant."""
+    table = CachedAnalysis.__table__
+    async with engine.connect() as connection:
+        versions = await connection.execute(
+            select(table.c.knowledge_version, func.count()).group_by(table.c.knowledge_version)
+        )
+        tenants = await connection.execute(select(table.c.tenant_id, func.count()).group_by(table.c.tenant_id))
+        return {
+            "knowledge_versions": {version or "unknown": count for version, count in versions},
+            "tenants": {tenant_id: count for tenant_id, count in tenants},
+        }
+
+
+class TieredAnalysisCache:
+    """The memory tier, pending writes, and the database behind them."""
+
+    def __init__(self, max_entries: int, ttl: float, flush_delay: float):
+        self.memory = MemoryTier(max_entries, ttl)
+        self.flush_delay = flush_delay
+        # Entries not written to the database yet, by key
+        self._pending: Dict[str, CacheEntry] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Incremented by every invalidation, so a read that overlapped one isn't cached
+        self._generation = 0
+        self.db_reads = 0
+        self.db_errors = 0
+
+    def _lock(self) -> asyncio.Lock:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Get an entry from memory or the pending writes, without reading the database."""
+        return self.memory.get(key) or self._pending.get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        """Get entries from memory, reading the rest from the database in one query."""
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            entry = self.peek(key)
+            if entry is not None:
+                found[key] = entry
+            else:
+                missing.append(key)
+        if not missing:
+            return found
+
+        generation = self._generation
+        try:
+            self.db_reads += 1
+            loaded = await load_entries(missing)
+        except Exception as e:
+            self.db_errors += 1
+            print(f"⚠️  Error reading analysis cache from the database: {e}")
+            return found
+
+        if generation == self._generation:
+            for key, entry in loaded.items():
+                # A write made while reading is newer than what was read
+                if key not in self._pending:
+                    self.memory.put(key, entry)
+        found.update(loaded)
+        return found
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return (await self.get_many([key])).get(key)
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """Cache an entry in memory now and in the database shortly after."""
+        self.memory.put(key, entry)
+        self._pending[key] = entry
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None:
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                # No event loop (e.g. a script); written by the next flush()
+                pass
+
+    async def _flush_loop(self) -> None:
+        try:
+            while self._pending:
+                await asyncio.sleep(self.flush_delay)
+                if not await self.flush():
+                    await asyncio.sleep(FLUSH_RETRY_DELAY)
+        finally:
+            self._flush_task = None
+
+    async def flush(self) -> bool:
+        """
+        Write pending entries to the database.
+
+        Returns:
+            False if the write failed; the entries stay pending
+        """
+        async with self._lock():
+            batch, self._pending = self._pending, {}
+            try:
+                await write_entries(batch)
+            except Exception as e:
+                self.db_errors += 1
+                print(f"⚠️  Error writing {len(batch)} analyses to the database: {e}")
+                for key, entry in batch.items():
+                    self._pending.setdefault(key, entry)
+                return False
+        if batch:
+            await publish("analysis_stored", {"keys": list(batch)})
+        return True
+
+    async def invalidate(self, selection: Selection) -> int:
+        """
+        Remove the selected entries from every tier.
+
+        Returns:
+            Number of analyses removed (from the database, plus any not yet written)
+
+        Raises:
+            The database error if the delete failed; the entries are out of
+            this worker's memory by then, but the database still has them
+        """
+        self._generation += 1
+        self.memory.remove(selection.matches)
+        async with self._lock():
+            unwritten = [key for key, entry in self._pending.items() if selection.matches(entry)]
+            for key in unwritten:
+                del self._pending[key]
+            try:
+                removed = await delete_entries(selection)
+            except Exception as e:
+                self.db_errors += 1
+                print(f"⚠️  Error deleting analyses from the database: {e}")
+                raise
+        await publish("analysis_invalidated", selection.to_dict())
+        return removed + len(unwritten)
+
+    def forget(self, keys: Iterable[str]) -> int:
+        """
+        Drop entries another worker wrote from the memory tier, so the next
+        read gets them from the database. Local unwritten entries are kept.
+        """
+        self._generation += 1
+        return sum(1 for key in keys if key not in self._pending and self.memory.discard(key))
+
+    def invalidate_local(self, selection: Selection) -> int:
+        """Remove the selected entries from memory only, after another worker invalidated them."""
+        self._generation += 1
+        return self.memory.remove(selection.matches)
+
+    async def warm(self, limit: Optional[int] = None) -> int:
+        """Fill the memory tier with the most recently cached entries."""
+        entries = await load_recent_entries(limit or self.memory.max_entries)
+        for key, entry in entries.items():
+            self.memory.put(key, entry)
+        return len(entries)
+
+    def stats(self) -> Dict:
+        return {
+            "memory": self.memory.stats(),
+            "pending_writes": len(self._pending),
+            "db_reads": self.db_reads,
+            "db_errors": self.db_errors,
+        }
@@ -4,143 +4,505 @@ Auto-analysis service for press releases.
 Automatically analyzes new press releases and caches results.
 """
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+from dataclasses import replace
 from datetime import datetime
+import asyncio
+import hashlib
 import json
+import time
 from pathlib import Path
 
-# Cache file location
+from app.analysis_cache import (
+    TieredAnalysisCache, Selection, count_entries, is_file_imported, record_file_import
+)
+from app.config import (
+    PRE_CLASSIFIER_ENABLED, PRE_CLASSIFIER_RETRAIN_INTERVAL, TENANT_BATCH_SIZE, ANALYSIS_CACHE_PATH,
+    ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL, ANALYSIS_CACHE_FLUSH_DELAY, ANALYSIS_MODE
+)
+from app.events import register_handler
+from app.filelock import async_file_lock
+from app.jobs import enqueue_changes
+from app.knowledge import DEFAULT_TENANT
+from app.llm_budget import BudgetExceeded
+from app.metrics import cache_requests, cache_evictions, analyses_total, register_collector, gauge_lines
+from app.pre_classifier import classify_change, get_change_text
+from app.profiling import register_size_probe
+from app.records import CacheEntry, entries_from_storage, clear_obligation_table, get_obligation_table
+from app.tracing import span
+
+# Cache file from before the database tier, imported once at startup
 CACHE_DIR = Path(__file__).parent.parent / "data"
-ANALYSIS_CACHE_FILE = CACHE_DIR / "analysis_cache.json"
+ANALYSIS_CACHE_FILE = Path(ANALYSIS_CACHE_PATH) if ANALYSIS_CACHE_PATH else CACHE_DIR / "analysis_cache.json"
 
-# In-memory cache
-_analysis_cache = {}
-_cache_loaded = False
+# In-memory LRU tier in front of the analysis_cache table
+_analysis_cache = TieredAnalysisCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL, ANALYSIS_CACHE_FLUSH_DELAY)
 
+# Evaluations in progress, so concurrent requests for a change share one Gemini call
+_in_flight: Dict[str, asyncio.Future] = {}
 
-def load_cache():
-    """Load analysis cache from file."""
-    global _analysis_cache, _cache_loaded
-    
-    if _cache_loaded:
+# Incremented when the pre-classifier should retrain on the memory tier
+_training_version = 0
+_training_version_at = float("-inf")
+
+
+class AnalysisSkipped(Exception):
+    """The pre-classifier ruled a change out, so it isn't sent to Gemini."""
+
+    def __init__(self, prediction: Dict):
+        super().__init__("The pre-classifier ruled the change out")
+        self.prediction = prediction
+
+
+def _training_data_changed(rate_limited: bool = False):
+    """
+    Have the pre-classifier retrain before its next prediction.
+
+    Each retrain goes over the whole memory tier, so newly cached analyses
+    (rate_limited) only trigger one every PRE_CLASSIFIER_RETRAIN_INTERVAL.
+    """
+    global _training_version, _training_version_at
+
+    now = time.monotonic()
+    if rate_limited and now - _training_version_at < PRE_CLASSIFIER_RETRAIN_INTERVAL:
         return
+    _training_version += 1
+    _training_version_at = now
+
+
+def _read_cache_file() -> Tuple[str, Dict[str, CacheEntry]]:
+    data = ANALYSIS_CACHE_FILE.read_bytes()
+    return hashlib.sha256(data).hexdigest(), entries_from_storage(json.loads(data))
+
+
+async def import_cache_file() -> int:
+    """
+    Import the analysis cache file into the database, once.
+    
+    The import is recorded in the database by the file's digest, so the
+    file stays where it is and is only imported again if it changes.
+    Workers starting together take turns, so only the first one imports.
+    
+    Returns:
+        Number of analyses imported
+    """
+    if not ANALYSIS_CACHE_FILE.exists():
+        return 0
+    
+    from app.knowledge import get_tenant_knowledge_version
     
+    async with async_file_lock(ANALYSIS_CACHE_FILE):
+        digest, entries = await asyncio.to_thread(_read_cache_file)
+        if await is_file_imported(digest):
+            return 0
+        for key, entry in entries.items():
+            # The file's keys have no version; analyses from before versions were recorded count as current
+            if entry.knowledge_version is None:
+                entry = replace(entry, knowledge_version=get_tenant_knowledge_version(entry.tenant_id))
+            _analysis_cache.put(f"{key}@{entry.knowledge_version}", entry)
+        if not await _analysis_cache.flush():
+            return 0
+        await record_file_import(digest, ANALYSIS_CACHE_FILE.name)
+    print(f"✓ Imported {len(entries)} cached analyses from {ANALYSIS_CACHE_FILE.name}")
+    return len(entries)
+
+
+async def load_cache_async():
+    """Import the old cache file if there is one, then warm the memory tier from the database."""
     try:
-        if ANALYSIS_CACHE_FILE.exists():
-            with open(ANALYSIS_CACHE_FILE, 'r', encoding='utf-8') as f:
-                _analysis_cache = json.load(f)
-            print(f"✓ Loaded {len(_analysis_cache)} cached analyses")
-        else:
-            _analysis_cache = {}
-            print("ℹ No analysis cache found, starting fresh")
+        await import_cache_file()
+        loaded = await _analysis_cache.warm()
+        _training_data_changed()
+        print(f"✓ Loaded {loaded} cached analyses into memory")
     except Exception as e:
         print(f"⚠️  Error loading analysis cache: {e}")
-        _analysis_cache = {}
+
+
+async def _on_analysis_stored(event: Dict):
+    """Another worker wrote analyses; drop any older copies kept in memory."""
+    _analysis_cache.forget(event["keys"])
+    _training_data_changed(rate_limited=True)
+
+
+async def _on_analysis_invalidated(event: Dict):
+    """Another worker invalidated analyses; remove them from memory too."""
+    removed = _analysis_cache.invalidate_local(Selection(**event))
+    if not event:
+        clear_obligation_table()
+    _training_data_changed()
+    cache_evictions.inc(removed, cache="analysis")
+
+
+register_handler("analysis_stored", _on_analysis_stored)
+register_handler("analysis_invalidated", _on_analysis_invalidated)
+
+
+async def flush_cache() -> bool:
+    """
+    Write analyses not yet in the database (e.g. at shutdown).
     
-    _cache_loaded = True
+    Returns:
+        False if the write failed
+    """
+    return await _analysis_cache.flush()
 
 
-def save_cache():
-    """Save analysis cache to file."""
-    try:
-        CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        with open(ANALYSIS_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(_analysis_cache, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"⚠️  Error saving analysis cache: {e}")
+def get_cache_key(change_id: str, tenant_id: str = DEFAULT_TENANT, knowledge_version: Optional[str] = None) -> str:
+    """
+    Build the cache key for a change and tenant under a knowledge version
+    (by default the tenant's current one), so analyses made with an older
+    knowledge base are never served.
+    
+    The default tenant's keys start with the plain change ID.
+    """
+    if knowledge_version is None:
+        from app.knowledge import get_tenant_knowledge_version
+        knowledge_version = get_tenant_knowledge_version(tenant_id)
+    if tenant_id == DEFAULT_TENANT:
+        return f"{change_id}@{knowledge_version}"
+    return f"{tenant_id}:{change_id}@{knowledge_version}"
+
+
+async def get_cached_entries(change_ids: List[str], tenant_id: str = DEFAULT_TENANT) -> Dict[str, CacheEntry]:
+    """Get the cache entry records for several changes, by change ID, reading the database once."""
+    from app.knowledge import get_tenant_knowledge_version
+    
+    version = get_tenant_knowledge_version(tenant_id)
+    keys = {get_cache_key(change_id, tenant_id, version): change_id for change_id in change_ids}
+    entries = await _analysis_cache.get_many(keys)
+    return {keys[key]: entry for key, entry in entries.items()}
 
 
-def get_cached_analysis(change_id: str) -> Optional[Dict]:
+async def get_cached_entry(change_id: str, tenant_id: str = DEFAULT_TENANT) -> Optional[CacheEntry]:
+    """Get the cache entry record for a change, without building the full analysis."""
+    return await _analysis_cache.get(get_cache_key(change_id, tenant_id))
+
+
+async def get_cached_analysis(change_id: str, tenant_id: str = DEFAULT_TENANT) -> Optional[Dict]:
     """Get cached analysis for a change."""
-    load_cache()
-    return _analysis_cache.get(change_id)
+    cached = await get_cached_entry(change_id, tenant_id)
+    cache_requests.inc(cache="analysis", result="hit" if cached else "miss")
+    return cached.to_dict() if cached else None
 
 
-def cache_analysis(change_id: str, analysis: Dict):
-    """Cache an analysis result."""
-    load_cache()
-    
-    _analysis_cache[change_id] = {
+def _store_analysis(change_id: str, analysis: Dict, update_text: Optional[str],
+                    knowledge_version: Optional[str], tenant_id: str):
+    """Put an analysis into the memory tier; it is written to the database shortly after."""
+    knowledge_version = knowledge_version or analysis.get('knowledge_version')
+    key = get_cache_key(change_id, tenant_id, knowledge_version)
+    _training_data_changed(rate_limited=True)
+    # Keep the analyzed text so the pre-classifier can learn from it
+    _analysis_cache.put(key, CacheEntry.from_dict({
         "analysis": analysis,
         "cached_at": datetime.now().isoformat(),
-        "change_id": change_id
-    }
-    
-    save_cache()
+        "change_id": change_id,
+        "tenant_id": tenant_id,
+        "knowledge_version": knowledge_version,
+        "update_text": update_text,
+    }))
+
+
+async def cache_analysis(change_id: str, analysis: Dict, update_text: Optional[str] = None,
+                         knowledge_version: Optional[str] = None, tenant_id: str = DEFAULT_TENANT):
+    """Cache an analysis result and write it to the database."""
+    _store_analysis(change_id, analysis, update_text, knowledge_version, tenant_id)
+    await flush_cache()
 
 
-def should_analyze(change: Dict) -> bool:
-    """Determine if a change should be auto-analyzed."""
+def get_skip_reason(change: Dict, entries: Optional[Dict[str, CacheEntry]] = None) -> Optional[str]:
+    """
+    Determine why a change shouldn't be auto-analyzed, if it shouldn't.
+
+    The pre-classifier may retrain on the memory tier first; from the event
+    loop, call this in a thread with a copy of the tier as `entries`.
+
+    Returns:
+        "risk_level" for changes below high risk, "pre_classifier" for
+        changes the pre-classifier rules out, or None to analyze the change
+    """
     # Only auto-analyze high and critical risk items
     risk_level = change.get('riskLevel', '').lower()
-    return risk_level in ['high', 'critical']
+    if risk_level not in ['high', 'critical']:
+        return "risk_level"
+    
+    # Skip the LLM when the local classifier is confident it is not applicable
+    if PRE_CLASSIFIER_ENABLED and not pre_classify(change, entries)['send_to_llm']:
+        return "pre_classifier"
+    return None
+
 
+def should_analyze(change: Dict, entries: Optional[Dict[str, CacheEntry]] = None) -> bool:
+    """Determine if a change should be auto-analyzed (see get_skip_reason)."""
+    return get_skip_reason(change, entries) is None
 
-def auto_analyze_change(change: Dict) -> Optional[Dict]:
+
+def pre_classify(change: Dict, entries: Optional[Dict[str, CacheEntry]] = None) -> Dict:
     """
-    Auto-analyze a change if not already cached.
+    Local prediction of whether a change is applicable, without calling Gemini.
     
-    Returns cached or new analysis, or None if not analyzed.
+    The classifier learns from the analyses in the memory tier (or `entries`,
+    a copy of it), of every tenant, and the prediction applies to all of them.
     """
-    change_id = change.get('id')
-    
-    if not change_id:
-        return None
+    if entries is None:
+        entries = _analysis_cache.memory.entries()
+    return classify_change(change, entries, _training_version)
+
+
+async def pre_classify_async(change: Dict) -> Dict:
+    """pre_classify in a worker thread, as (re)training can take a while."""
+    entries = _analysis_cache.memory.entries()
+    return await asyncio.to_thread(pre_classify, change, entries)
+
+
+async def _analyze_tenant_batch(snapshot, tenant_ids: List[str], update_text: str, obligation: Dict,
+                                source: str) -> Dict[str, Dict]:
+    """
+    Run one Gemini call for a batch of tenants.
     
-    # Check cache first
-    cached = get_cached_analysis(change_id)
-    if cached:
-        return cached.get('analysis')
+    Raises BudgetExceeded if the call doesn't fit the token budget.
     
-    # Check if should analyze
-    if not should_analyze(change):
-        return None
+    Returns:
+        Dictionary of tenant ID to analysis for the tenants that succeeded,
+        each with the per-stage timings of the batch
+    """
+    from app.rag_agent import (
+        construct_prompt, construct_multi_profile_prompt, split_multi_profile_result, call_gemini_api_async
+    )
     
-    # Perform analysis
-    try:
-        from app.rag_agent import retrieve_relevant_obligation, construct_prompt, call_gemini_api
-        from app.knowledge import get_cached_company_profile, get_cached_compliance_knowledge
-        
-        profile = get_cached_company_profile()
-        knowledge = get_cached_compliance_knowledge()
-        
-        if not profile or not knowledge:
-            return None
+    with span("batch", tenants=len(tenant_ids)) as batch_span:
+        # A single tenant keeps the original single-profile prompt
+        with span("prompt"):
+            if len(tenant_ids) == 1:
+                prompt = construct_prompt(snapshot.company_profiles[tenant_ids[0]], update_text, obligation)
+            else:
+                profiles = {tenant_id: snapshot.company_profiles[tenant_id] for tenant_id in tenant_ids}
+                prompt = construct_multi_profile_prompt(profiles, update_text, obligation)
         
-        # Get the full text for analysis
-        update_text = change.get('changeSummary', '')
-        if change.get('content'):
-            update_text += "\n\n" + change.get('content', '')
-        
-        # Retrieve obligation and analyze
-        obligation = retrieve_relevant_obligation(update_text, knowledge)
-        prompt = construct_prompt(profile, update_text, obligation)
-        result = call_gemini_api(prompt)
-        
-        # Check for errors
+        result = await call_gemini_api_async(prompt, source, tenant_ids)
         if "error" in result or "raw_response" in result:
-            return None
-        
-        # Add retrieved obligation
-        result['retrieved_obligation'] = obligation
-        
-        # Cache the result
-        cache_analysis(change_id, result)
-        
-        print(f"✓ Auto-analyzed change {change_id}: {result.get('risk_level')} risk")
+            batch_span.set_attribute("analysis.failed", True)
+            return {}
+        results = {tenant_ids[0]: result} if len(tenant_ids) == 1 else split_multi_profile_result(result, tenant_ids)
+    
+    for tenant_result in results.values():
+        tenant_result['timings_ms'] = batch_span.timings()
+    return results
+
+
+def _check_analyzed(change_id: str, pending: List[str], results: Dict[str, Dict], error: Optional[Exception] = None):
+    """Raise if some of the pending tenants weren't analyzed."""
+    missing = [tenant_id for tenant_id in pending if tenant_id not in results]
+    if missing:
+        reason = f": {error}" if error else ""
+        raise RuntimeError(f"Analysis of change {change_id} failed for {len(missing)} of {len(pending)} tenants{reason}")
+
+
+async def evaluate_change_for_tenants(change: Dict, tenant_ids: Optional[List[str]] = None,
+                                      strict: bool = False) -> Dict[str, Dict]:
+    """
+    Evaluate a change against several tenant profiles in one pass.
+    
+    Obligation retrieval runs once for the change, and tenants without a
+    cached analysis are batched TENANT_BATCH_SIZE at a time into
+    multi-profile prompts, so cost grows with the number of batches rather
+    than the number of tenants.
+    
+    Args:
+        change: Change dictionary
+        tenant_ids: Tenants to evaluate; defaults to all loaded tenants
+        strict: Raise if a tenant needing analysis couldn't be analyzed,
+            instead of leaving it out (for job workers, which retry);
+            BudgetExceeded if that was because of the token budget, and
+            AnalysisSkipped if the pre-classifier ruled the change out
         
-        return result
+    New analyses carry `timings_ms`, the milliseconds spent in each stage
+    (retrieval, prompt, gemini, parse) and in total.
+    
+    Returns:
+        Dictionary of tenant ID to analysis (cached or new)
+    """
+    return (await _evaluate_change(change, tenant_ids, strict))[0]
+
+
+async def _evaluate_change(change: Dict, tenant_ids: Optional[List[str]],
+                           strict: bool) -> Tuple[Dict[str, Dict], Optional[BudgetExceeded]]:
+    """evaluate_change_for_tenants, also returning the token budget refusal if tenants were left out for it."""
+    from app.knowledge import get_knowledge_snapshot
+    
+    change_id = change.get('id')
+    if not change_id:
+        return {}, None
+    
+    # Use one snapshot throughout so a concurrent reload can't mix versions
+    snapshot = get_knowledge_snapshot()
+    if tenant_ids is None:
+        tenant_ids = list(snapshot.company_profiles)
+    
+    analyses = {}
+    pending = []
+    keys = {
+        get_cache_key(change_id, tenant_id, snapshot.tenant_version(tenant_id)): tenant_id
+        for tenant_id in tenant_ids
+    }
+    cached = await _analysis_cache.get_many(keys)
+    for key, tenant_id in keys.items():
+        if key in cached:
+            cache_requests.inc(cache="analysis", result="hit")
+            analyses[tenant_id] = cached[key].analysis.to_dict(cached[key].knowledge_version)
+        else:
+            cache_requests.inc(cache="analysis", result="miss")
+            if tenant_id in snapshot.company_profiles:
+                pending.append(tenant_id)
+    
+    if not pending or not snapshot.compliance_knowledge:
+        if pending and strict:
+            raise RuntimeError("Compliance knowledge is not loaded")
+        return analyses, None
+    # The change is ruled in or out for every tenant at once
+    entries = _analysis_cache.memory.entries()
+    skip_reason = await asyncio.to_thread(get_skip_reason, change, entries)
+    if skip_reason:
+        analyses_total.inc(outcome=f"skipped_{skip_reason}")
+        if strict:
+            raise AnalysisSkipped(await asyncio.to_thread(pre_classify, change, entries))
+        return analyses, None
+    
+    # Another request is already analyzing this change; wait for its results
+    in_flight = _in_flight.get(change_id)
+    if in_flight is not None:
+        analyses_total.inc(outcome="shared")
+        results, over_budget = await asyncio.shield(in_flight)
+        analyses.update({tenant_id: results[tenant_id] for tenant_id in pending if tenant_id in results})
+        if strict:
+            _check_analyzed(change_id, pending, results)
+        return analyses, over_budget
+    
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[change_id] = future
+    results = {}
+    error = None
+    over_budget = None
+    
+    try:
+        from app.rag_agent import retrieve_relevant_obligation
         
+        with span("analysis", change_id=str(change_id), tenants=len(pending)) as analysis_span:
+            update_text = get_change_text(change)
+            
+            # Retrieval is shared by every tenant
+            with span("retrieval") as retrieval_span:
+                obligation = retrieve_relevant_obligation(update_text, snapshot.compliance_knowledge)
+            
+            batches = [pending[start:start + TENANT_BATCH_SIZE] for start in range(0, len(pending), TENANT_BATCH_SIZE)]
+            source = change.get('sourceId') or "unknown"
+            batch_results = await asyncio.gather(
+                *(_analyze_tenant_batch(snapshot, batch, update_text, obligation, source) for batch in batches),
+                return_exceptions=True
+            )
+            
+            for batch_result in batch_results:
+                # Batches over the token budget are left for later; the others are kept
+                if isinstance(batch_result, BudgetExceeded):
+                    over_budget = batch_result
+                    continue
+                if isinstance(batch_result, BaseException):
+                    raise batch_result
+                for tenant_id, result in batch_result.items():
+                    # Add retrieved obligation and the knowledge version that produced it
+                    result['retrieved_obligation'] = obligation
+                    result['knowledge_version'] = snapshot.tenant_version(tenant_id)
+                    result['timings_ms'] = {"retrieval": retrieval_span.elapsed_ms(), **result['timings_ms']}
+                    _store_analysis(change_id, result, update_text, result['knowledge_version'], tenant_id)
+                    results[tenant_id] = result
+                    print(f"✓ Auto-analyzed change {change_id} for {tenant_id}: {result.get('risk_level')} risk")
+            
+            analyses_total.inc(outcome="analyzed" if results else "over_budget" if over_budget else "failed")
+            if over_budget:
+                print(f"⚠️  Change {change_id} not analyzed for {len(pending) - len(results)} tenants: {over_budget}")
+            for result in results.values():
+                result['timings_ms']['total'] = analysis_span.elapsed_ms()
     except Exception as e:
+        error = e
+        analyses_total.inc(outcome="error")
         print(f"⚠️  Error auto-analyzing change {change_id}: {e}")
-        return None
+    finally:
+        del _in_flight[change_id]
+        future.set_result((results, over_budget))
+    
+    analyses.update(results)
+    if strict and over_budget:
+        raise over_budget
+    if strict:
+        _check_analyzed(change_id, pending, results, error)
+    return analyses, over_budget
 
 
-def get_analysis_for_change(change: Dict) -> Optional[Dict]:
+async def auto_analyze_change(change: Dict, tenant_id: str = DEFAULT_TENANT) -> Optional[Dict]:
+    """
+    Auto-analyze a change if not already cached.
+    
+    The change is evaluated for every tenant in the same pass, so later
+    requests for other tenants are served from the cache.
+    
+    Returns cached or new analysis for the tenant, or None if not analyzed.
+    Raises BudgetExceeded if the tenant's analysis didn't fit the token budget.
+    """
+    analyses, over_budget = await _evaluate_change(change, None, False)
+    if tenant_id not in analyses and over_budget:
+        raise over_budget
+    return analyses.get(tenant_id)
+
+
+async def enqueue_analyses(changes: List[Dict], demanded: bool = False) -> int:
+    """
+    Queue analysis jobs for the changes that should be auto-analyzed.
+    
+    Args:
+        changes: Change dictionaries
+        demanded: Someone is viewing the changes, so their jobs are ranked higher
+    
+    Returns:
+        Number of jobs queued
+    """
+    entries = _analysis_cache.memory.entries()
+    selected = await asyncio.to_thread(lambda: [change for change in changes if should_analyze(change, entries=entries)])
+    return await enqueue_changes(selected, demanded)
+
+
+async def run_analysis_job(change: Dict) -> int:
+    """
+    Analyze a queued change for every tenant (used by analysis workers).
+    
+    This worker's in-memory copies are dropped first, so the database
+    decides which tenants still need an analysis. Raises if a tenant
+    couldn't be analyzed or the analyses couldn't be written, so the job
+    is retried (BudgetExceeded if Gemini calls didn't fit the token budget),
+    and AnalysisSkipped if the pre-classifier rules the change out.
+    
+    Returns:
+        Number of tenants with an analysis
+    """
+    from app.knowledge import get_knowledge_snapshot
+    
+    snapshot = get_knowledge_snapshot()
+    tenant_ids = list(snapshot.company_profiles)
+    _analysis_cache.forget([
+        get_cache_key(change['id'], tenant_id, snapshot.tenant_version(tenant_id)) for tenant_id in tenant_ids
+    ])
+    analyses = await evaluate_change_for_tenants(change, tenant_ids, strict=True)
+    if not await flush_cache():
+        raise RuntimeError("Could not write the analyses to the database")
+    return len(analyses)
+
+
+async def get_analysis_for_change(change: Dict, tenant_id: str = DEFAULT_TENANT) -> Optional[Dict]:
     """
     Get analysis for a change (from cache or by analyzing).
     
-    This is the main function to call when you need analysis.
+    This is the main function to call when you need analysis. With
+    ANALYSIS_MODE=queue, a missing analysis is queued for the analysis
+    workers, ahead of changes nobody is viewing, and None is returned.
+    Raises BudgetExceeded if analyzing it didn't fit the token budget.
     """
     change_id = change.get('id')
     
@@ -148,33 +510,106 @@ def get_analysis_for_change(change: Dict) -> Optional[Dict]:
         return None
     
     # Try cache first
-    cached = get_cached_analysis(change_id)
+    cached = await get_cached_analysis(change_id, tenant_id)
     if cached:
         return cached.get('analysis')
     
+    if ANALYSIS_MODE == "queue":
+        await enqueue_analyses([change], demanded=True)
+        return None
+    
     # Auto-analyze if appropriate
-    return auto_analyze_change(change)
+    return await auto_analyze_change(change, tenant_id)
 
 
-def clear_cache():
-    """Clear the analysis cache."""
-    global _analysis_cache
-    _analysis_cache = {}
+async def clear_cache(stale_only: bool = False, knowledge_version: Optional[str] = None,
+                      change_id: Optional[str] = None, obligation_id: Optional[str] = None,
+                      tenant_id: Optional[str] = None) -> int:
+    """
+    Clear the analysis cache, entirely or selectively.
     
+    With no arguments every analysis is removed; otherwise only analyses
+    matching all of the given criteria are.
+    
+    Args:
+        stale_only: Only remove analyses made with an older version of their tenant's knowledge
+        knowledge_version: Only remove analyses made with this knowledge version
+        change_id: Only remove analyses of this change
+        obligation_id: Only remove analyses that retrieved this obligation
+        tenant_id: Only remove this tenant's analyses
+        
+    Returns:
+        Number of cached analyses removed
+
+    Raises:
+        The database error if the analyses couldn't be deleted there
+    """
+    from app.knowledge import get_knowledge_snapshot
+    
+    selection = Selection(
+        change_id=change_id,
+        obligation_id=obligation_id,
+        knowledge_version=knowledge_version,
+        current_versions=get_knowledge_snapshot().tenant_versions if stale_only and not knowledge_version else None,
+        tenant_id=tenant_id,
+    )
     try:
-        if ANALYSIS_CACHE_FILE.exists():
-            ANALYSIS_CACHE_FILE.unlink()
+        removed = await _analysis_cache.invalidate(selection)
+    finally:
+        # The entries left memory even if the database delete failed
+        _training_data_changed()
+    cache_evictions.inc(removed, cache="analysis")
+    
+    if not selection.where():
+        clear_obligation_table()
         print("✓ Analysis cache cleared")
-    except Exception as e:
-        print(f"⚠️  Error clearing cache: {e}")
+    else:
+        print(f"✓ Removed {removed} cached analyses")
+    return removed
 
 
-def get_cache_stats() -> Dict:
-    """Get statistics about the cache."""
-    load_cache()
+async def get_cache_stats() -> Dict:
+    """
+    Get statistics about the cache tiers.
     
-    return {
-        "total_cached": len(_analysis_cache),
-        "cache_file": str(ANALYSIS_CACHE_FILE),
-        "cache_exists": ANALYSIS_CACHE_FILE.exists()
+    The counts are of analyses in the database; analyses not written yet
+    are reported as pending_writes rather than flushed, so reading the
+    stats never writes.
+    """
+    from app.knowledge import get_knowledge_snapshot
+    
+    try:
+        counts = await count_entries()
+    except Exception as e:
+        print(f"⚠️  Error counting cached analyses: {e}")
+        counts = {"knowledge_versions": {}, "tenants": {}, "error": str(e) or type(e).__name__}
+    
+    snapshot = get_knowledge_snapshot()
+    versions = counts["knowledge_versions"]
+    total = sum(versions.values())
+    current = sum(versions.get(version, 0) for version in set(snapshot.tenant_versions.values()))
+    stats = {
+        "total_cached": total,
+        "knowledge_version": snapshot.version,
+        "tenant_versions": snapshot.tenant_versions,
+        "knowledge_versions": versions,
+        "tenants": counts["tenants"],
+        "stale": total - current,
+        **_analysis_cache.stats(),
     }
+    if "error" in counts:
+        stats["db_error"] = counts["error"]
+    return stats
+
+
+register_collector(lambda: gauge_lines(
+    "analysis_cache_entries", "Analyses in the in-memory cache",
+    {
+        (("cache", "analysis"),): len(_analysis_cache.memory),
+        (("cache", "pending_writes"),): _analysis_cache.stats()["pending_writes"],
+        (("cache", "in_flight"),): len(_in_flight),
+    }
+))
+
+register_size_probe("analysis_cache", lambda: len(_analysis_cache.memory))
+register_size_probe("cached_obligations", lambda: len(get_obligation_table()))
@@ -0,0 +1,129 @@
+"""
+Benchmark response encoding for large API payloads.
+
+Compares the default FastAPI path (jsonable_encoder + stdlib json, as
+rendered by JSONResponse) with orjson, and the bytes on the wire with
+gzip and brotli, for a synthetic auto-analyzed feed and analysis history.
+
+Usage:
+    python -m app.bench_responses --changes 200 --repeat 50
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+import argparse
+import gzip
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.knowledge import load_compliance_knowledge
+from app.responses import dump_json, compress, brotli, GZIP_LEVEL
+
+
+def build_feed(count: int) -> Dict:
+    """Build an auto-analyzed changes feed like /api/changes?auto_analyze=true returns."""
+    obligations = (load_compliance_knowledge() or {}).get("obligations") or [{"id": "DPDP-004"}]
+    now = datetime.utcnow()
+    changes = []
+    for i in range(count):
+        obligation = obligations[i % len(obligations)]
+        changes.append({
+            "id": str(100000 + i),
+            "sourceName": "MeitY Press Releases",
+            "sourceId": "meity",
+            "changeSummary": f"Advisory {i} on personal data breach reporting by data fiduciaries",
+            "detectedAt": (now - timedelta(hours=i)).isoformat() + 'Z',
+            "riskLevel": ("critical", "high", "medium", "low")[i % 4],
+            "affectedSector": "Technology",
+            "link": f"https://www.meity.gov.in/press-release/{i}",
+            "content": "The Ministry has issued directions on breach notification and consent. " * 8,
+            "matchedKeywords": ["data protection", "breach", "consent"],
+            "ai_analysis": {
+                "applicable": True,
+                "risk_level": "high",
+                "summary": "Update tightens breach reporting timelines for data fiduciaries. " * 2,
+                "required_actions": [f"Action {n} for the compliance team" for n in range(5)],
+                "deadline": "30 days",
+                "retrieved_obligation": obligation,
+                "knowledge_version": "0123456789ab",
+            },
+        })
+    return {"changes": changes, "total": count, "page": 1, "totalPages": 1}
+
+
+def build_history(count: int) -> Dict:
+    """Build an analysis history like /api/analysis-history returns."""
+    feed = build_feed(count)["changes"]
+    return {
+        "analyses": [
+            {
+                "id": i + 1,
+                "timestamp": datetime.now().isoformat(),
+                "update_text": change["content"],
+                "result": change["ai_analysis"],
+            }
+            for i, change in enumerate(feed)
+        ]
+    }
+
+
+def encode_default(payload) -> bytes:
+    """Encode the way FastAPI's default JSONResponse path does."""
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_encoder(encoder: Callable, payload, repeat: int) -> float:
+    """Best-of-`repeat` encode time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoder(payload)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run_benchmark(changes: int, repeat: int) -> Dict:
+    """Measure encode time and response sizes for each payload."""
+    results = {}
+    for name, payload in (("feed", build_feed(changes)), ("history", build_history(changes))):
+        body = dump_json(payload)
+        sizes = {
+            "raw": len(body),
+            "gzip": len(gzip.compress(body, compresslevel=GZIP_LEVEL)),
+        }
+        if brotli is not None:
+            sizes["br"] = len(compress(body, "br"))
+
+        results[name] = {
+            "default_ms": round(time_encoder(encode_default, payload, repeat), 3),
+            "orjson_ms": round(time_encoder(dump_json, payload, repeat), 3),
+            "bytes": sizes,
+            "compress_gzip_ms": round(time_encoder(lambda b: gzip.compress(b, compresslevel=GZIP_LEVEL), body, repeat), 3),
+        }
+        if brotli is not None:
+            results[name]["compress_br_ms"] = round(time_encoder(lambda b: compress(b, "br"), body, repeat), 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API response encoding")
+    parser.add_argument("--changes", type=int, default=200, help="Changes (and history entries) per payload")
+    parser.add_argument("--repeat", type=int, default=50, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.changes, args.repeat)
+    for name, stats in results.items():
+        speedup = stats["default_ms"] / stats["orjson_ms"] if stats["orjson_ms"] else 0
+        print(f"{name} ({args.changes} items)")
+        print(f"  encode: default {stats['default_ms']} ms, orjson {stats['orjson_ms']} ms ({speedup:.1f}x)")
+        print("  bytes:  " + ", ".join(f"{encoding} {size}" for encoding, size in stats["bytes"].items()))
+        print(f"  compress: gzip {stats['compress_gzip_ms']} ms"
+              + (f", br {stats['compress_br_ms']} ms" if "compress_br_ms" in stats else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,36 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy import text
-from app.config import DATABASE_URL
+from datetime import datetime
+from typing import Dict
+import asyncio
+import hashlib
+from app.metrics import register_collector, gauge_lines
+from app.config import (
+    DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE,
+    DB_POOL_TIMEOUT, HEALTH_CHECK_TIMEOUT
+)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def _engine_options() -> Dict:
+    """Engine options from config; SQLite's pools don't take sizing options."""
+    options = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if not DATABASE_URL.startswith("sqlite"):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+engine = create_async_engine(DATABASE_URL, **_engine_options())
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Last database health check result, refreshed in the background
+_health_status = {"connected": False, "checked_at": None, "error": None}
+
 async def get_db():
     async with async_session_maker() as session:
         yield session
@@ -13,3 +39,155 @@ async def test_db_connection():
     async with async_session_maker() as session:
         result = await session.execute(text("SELECT 1"))
         return result.scalar() == 1
+
+async def refresh_health_status() -> Dict:
+    """Check the database connection and update the cached health status."""
+    try:
+        connected = await asyncio.wait_for(test_db_connection(), timeout=HEALTH_CHECK_TIMEOUT)
+        error = None
+    except Exception as e:
+        connected = False
+        error = str(e) or type(e).__name__
+
+    _health_status.update(connected=connected, checked_at=datetime.now().isoformat(), error=error)
+    return _health_status
+
+async def run_health_check_loop(interval: float):
+    """Refresh the cached health status every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        await refresh_health_status()
+
+def get_health_status() -> Dict:
+    """Get the cached database health status without touching the database."""
+    return dict(_health_status)
+
+def get_pool_stats() -> Dict:
+    """Get connection pool usage."""
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+def is_sqlite() -> bool:
+    """Whether the database is the local SQLite fallback."""
+    return engine.dialect.name == "sqlite"
+
+async def create_local_schema():
+    """
+    Create tables and the search index for local SQLite runs.
+
+    Postgres schemas are managed by Alembic migrations instead. Workers
+    sharing a database file take turns, so only the first creates tables.
+    """
+    if not is_sqlite():
+        return
+
+    from app.filelock import async_file_lock
+    from app.models import Base
+    from app.search import create_sqlite_search_index
+
+    def create_all(sync_connection):
+        Base.metadata.create_all(sync_connection)
+        # create_all skips existing tables, so add indexes introduced later
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(sync_connection, checkfirst=True)
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(create_all)
+            await create_sqlite_search_index(connection)
+
+    database = engine.url.database
+    if database and database != ":memory:":
+        async with async_file_lock(database):
+            await create()
+    else:
+        await create()
+
+
+class LeaderLock:
+    """
+    A lock at most one process sharing the database holds, for work only
+    one worker should do (e.g. polling the sources).
+
+    On Postgres it is a session advisory lock on a connection kept for it,
+    so it is released when the holder's connection or process dies; on
+    SQLite, a lock on a file next to the database.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = int.from_bytes(hashlib.sha256(name.encode("utf-8")).digest()[:8], "big", signed=True)
+        self._connection = None
+        self._file = None
+
+    async def acquire(self) -> bool:
+        """
+        Take the lock if no other process holds it, without waiting.
+
+        Returns:
+            Whether this process holds the lock
+        """
+        if not is_sqlite():
+            if self._connection is not None:
+                try:
+                    await self._connection.execute(text("SELECT 1"))
+                    return True
+                except Exception:
+                    # The session, and the lock with it, is gone
+                    await self.release()
+            connection = await engine.connect()
+            try:
+                # The lock is kept for the session; don't keep a transaction open with it
+                await connection.execution_options(isolation_level="AUTOCOMMIT")
+                acquired = (await connection.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+                )).scalar()
+            except BaseException:
+                await connection.close()
+                raise
+            if not acquired:
+                await connection.close()
+                return False
+            self._connection = connection
+            return True
+
+        database = engine.url.database
+        if not database or database == ":memory:":
+            # Only this process can see the database
+            return True
+        if self._file is None:
+            from app.filelock import try_file_lock
+
+            self._file = try_file_lock(f"{database}.{self.name}")
+        return self._file is not None
+
+    async def release(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            except Exception:
+                # Don't return a connection that may still hold the lock to the pool
+                await connection.invalidate()
+            await connection.close()
+        lock_file, self._file = self._file, None
+        if lock_file is not None:
+            lock_file.close()
+
+
+def _pool_metrics():
+    """Connection pool and health gauges for /metrics."""
+    stats = get_pool_stats()
+    samples = {(("state", name),): stats[name] for name in ("size", "checkedin", "checkedout", "overflow")
+               if name in stats}
+    return (gauge_lines("db_pool_connections", "Database connection pool usage", samples)
+            + gauge_lines("db_up", "Whether the last database health check succeeded",
+                          {(): int(bool(_health_status.get("connected")))}))
+
+register_collector(_pool_metrics)
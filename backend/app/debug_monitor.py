@@ -1,10 +1,45 @@
-import requests
+"""
+Inspect the structure of the MeitY press releases page.
+
+Fetches the page through the shared fetch layer, saves it prettified for
+inspection and prints candidate selectors. With --record the page is also
+captured in the fixture archive, and --replay inspects the recorded page
+offline (see app.fixtures).
+
+Usage:
+    python -m app.debug_monitor [--record | --replay]
+"""
+
+import argparse
+import asyncio
+
 from bs4 import BeautifulSoup
 
+from app.fetch import fetch, set_fetch_mode, close_client
+
 PRESS_RELEASES_URL = "https://www.meity.gov.in/content/press-releases"
 
-response = requests.get(PRESS_RELEASES_URL, timeout=10)
-soup = BeautifulSoup(response.content, "lxml")
+
+async def fetch_page() -> bytes:
+    try:
+        response = await fetch(PRESS_RELEASES_URL, source="meity_html")
+        return response.content
+    finally:
+        await close_client()
+
+
+parser = argparse.ArgumentParser(description="Inspect the MeitY press releases page")
+mode = parser.add_mutually_exclusive_group()
+mode.add_argument("--record", action="store_true", help="Also store the page in the fixture archive")
+mode.add_argument("--replay", action="store_true", help="Use the page from the fixture archive")
+args = parser.parse_args()
+
+if args.record:
+    set_fetch_mode("record")
+elif args.replay:
+    set_fetch_mode("replay")
+
+soup = BeautifulSoup(asyncio.run(fetch_page()), "lxml")
 
 # Save HTML for inspection
 with open("page_structure.html", "w", encoding="utf-8") as f:
@@ -0,0 +1,215 @@
+"""
+Cross-process notifications for state kept in memory by each worker.
+
+With several API workers (uvicorn --workers N, or several hosts), each
+one keeps its own memory tier of the analysis cache and its own knowledge
+snapshot. A worker that changes shared state records an event in the
+`cache_events` table; the other workers read new events and apply them
+to their in-memory copies (e.g. dropping invalidated analyses).
+
+Every worker polls the table every CACHE_EVENT_POLL_INTERVAL seconds. On
+Postgres, an event also sends a NOTIFY, so listening workers read it at
+once instead of at the next poll. Event IDs are assigned before commit,
+so an event can commit after one with a higher ID; IDs skipped by a read
+are read again for GAP_TIMEOUT seconds, until they show up or are taken
+to belong to a rolled-back transaction. Events older than CACHE_EVENT_RETENTION
+seconds are deleted; a worker that starts later begins from the newest
+event and loads everything else from the database anyway.
+"""
+
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import os
+import socket
+import time
+
+from sqlalchemy import delete, func, insert, or_, select, text
+
+from app.config import CACHE_EVENT_POLL_INTERVAL, CACHE_EVENT_RETENTION
+from app.db import engine
+from app.models import CacheEvent
+
+# Identifies this worker process across hosts
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Postgres NOTIFY channel
+CHANNEL = "cache_events"
+
+# Polls between deletions of old events
+PRUNE_EVERY = 60
+
+# Seconds skipped event IDs are read again, and how many of them are tracked
+GAP_TIMEOUT = 60.0
+MAX_GAPS = 500
+
+EventHandler = Callable[[Dict], Awaitable[None]]
+
+_handlers: Dict[str, EventHandler] = {}
+_last_event_id: Optional[int] = None
+# Skipped event IDs below _last_event_id, until they are given up
+_gaps: Dict[int, float] = {}
+_wakeup: Optional[asyncio.Event] = None
+_listener_task: Optional[asyncio.Task] = None
+_stats = {"published": 0, "applied": 0, "errors": 0}
+
+
+def register_handler(kind: str, handler: EventHandler) -> None:
+    """Apply events of a kind from other workers with an async handler."""
+    _handlers[kind] = handler
+
+
+async def publish(kind: str, payload: Dict) -> None:
+    """
+    Record an event for the other workers.
+
+    Errors are logged rather than raised: the change itself already
+    happened, and other workers catch up when their memory tier expires.
+    """
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(insert(CacheEvent.__table__).values(
+                created_at=datetime.utcnow(), source=WORKER_ID, kind=kind, payload=json.dumps(payload)
+            ))
+            if engine.dialect.name == "postgresql":
+                await connection.execute(text("SELECT pg_notify(:channel, :kind)"), {"channel": CHANNEL, "kind": kind})
+        _stats["published"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        print(f"⚠️  Could not publish {kind} event: {e}")
+
+
+async def _latest_event_id() -> int:
+    async with engine.connect() as connection:
+        return (await connection.execute(select(func.max(CacheEvent.__table__.c.id)))).scalar() or 0
+
+
+async def apply_new_events() -> int:
+    """
+    Apply events from other workers recorded since the last call.
+
+    Returns:
+        Number of events applied
+    """
+    global _last_event_id
+
+    if _last_event_id is None:
+        _last_event_id = await _latest_event_id()
+        return 0
+
+    now = time.monotonic()
+    for event_id in [event_id for event_id, deadline in _gaps.items() if deadline < now]:
+        del _gaps[event_id]
+
+    table = CacheEvent.__table__
+    condition = table.c.id > _last_event_id
+    if _gaps:
+        condition = or_(condition, table.c.id.in_(list(_gaps)))
+    async with engine.connect() as connection:
+        rows = (await connection.execute(
+            select(table.c.id, table.c.source, table.c.kind, table.c.payload)
+            .where(condition).order_by(table.c.id)
+        )).all()
+
+    applied = 0
+    for event_id, source, kind, payload in rows:
+        if event_id in _gaps:
+            del _gaps[event_id]
+        elif event_id > _last_event_id:
+            # The skipped IDs may belong to transactions that haven't committed yet
+            for missing in range(max(_last_event_id + 1, event_id - MAX_GAPS), event_id):
+                _gaps[missing] = now + GAP_TIMEOUT
+            _last_event_id = event_id
+        else:
+            continue
+        handler = _handlers.get(kind)
+        if source == WORKER_ID or handler is None:
+            continue
+        try:
+            await handler(json.loads(payload))
+            applied += 1
+        except Exception as e:
+            _stats["errors"] += 1
+            print(f"⚠️  Error applying {kind} event {event_id}: {e}")
+    # Give up the oldest gaps first
+    for event_id in sorted(_gaps)[:max(0, len(_gaps) - MAX_GAPS)]:
+        del _gaps[event_id]
+    _stats["applied"] += applied
+    return applied
+
+
+async def prune_events(retention: float = CACHE_EVENT_RETENTION) -> None:
+    """Delete events older than the retention period."""
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    async with engine.begin() as connection:
+        await connection.execute(delete(CacheEvent.__table__).where(CacheEvent.__table__.c.created_at < cutoff))
+
+
+async def _listen(wakeup: asyncio.Event) -> None:
+    """Wake the event loop below on Postgres NOTIFY; reconnects if the connection drops."""
+    def notified(*args):
+        wakeup.set()
+
+    while True:
+        try:
+            async with engine.connect() as connection:
+                driver = (await connection.get_raw_connection()).driver_connection
+                await driver.add_listener(CHANNEL, notified)
+                print(f"✓ Listening for cache events on {CHANNEL}")
+                while not driver.is_closed():
+                    await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️  Cache event listener stopped ({e}); falling back to polling")
+        await asyncio.sleep(CACHE_EVENT_POLL_INTERVAL or 5)
+
+
+async def run_event_loop(poll_interval: float = CACHE_EVENT_POLL_INTERVAL) -> None:
+    """Apply events from other workers as they arrive, until cancelled."""
+    global _wakeup
+
+    _wakeup = asyncio.Event()
+    listener = None
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg":
+        listener = asyncio.create_task(_listen(_wakeup))
+
+    polls = 0
+    try:
+        while True:
+            try:
+                await apply_new_events()
+                polls += 1
+                if polls % PRUNE_EVERY == 0:
+                    await prune_events()
+            except Exception as e:
+                _stats["errors"] += 1
+                print(f"⚠️  Error reading cache events: {e}")
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+    finally:
+        if listener is not None:
+            listener.cancel()
+
+
+def start_event_loop() -> None:
+    global _listener_task
+
+    if _listener_task is None and CACHE_EVENT_POLL_INTERVAL > 0:
+        _listener_task = asyncio.create_task(run_event_loop())
+
+
+def stop_event_loop() -> None:
+    global _listener_task
+
+    if _listener_task is not None:
+        _listener_task.cancel()
+        _listener_task = None
+
+
+def get_event_stats() -> Dict:
+    return {"worker_id": WORKER_ID, "last_event_id": _last_event_id, "gaps": len(_gaps), **_stats}
@@ -0,0 +1,87 @@
+"""
+Local stand-in for the Gemini model, for load tests.
+
+Enabled with GEMINI_BACKEND=fake. Answers every prompt after
+FAKE_GEMINI_DELAY seconds with an analysis matching the output schema of
+the prompt it was given (single profile, or one result per tenant for
+multi-profile prompts), so the whole analysis pipeline runs without
+network access or API costs.
+"""
+
+from typing import List
+import asyncio
+import hashlib
+import json
+import re
+import time
+
+from app.config import FAKE_GEMINI_DELAY
+
+RISK_LEVELS = ["Low", "Medium", "High", "Critical"]
+DEADLINE_DAYS = {"Critical": 3, "High": 7, "Medium": 14, "Low": 30}
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        # Roughly four characters per token
+        self.usage_metadata = FakeUsage(len(prompt) // 4, len(text) // 4)
+
+
+def _analysis(prompt: str, obligation_id: str, salt: str = "") -> dict:
+    digest = hashlib.sha256((salt + prompt).encode("utf-8")).digest()
+    risk_level = RISK_LEVELS[digest[0] % len(RISK_LEVELS)]
+    return {
+        "applicable": digest[1] % 4 != 0,
+        "risk_level": risk_level,
+        "affected_obligation_id": obligation_id,
+        "summary": f"Simulated {risk_level.lower()} impact assessment",
+        "tasks": [
+            {"title": "Review affected processes", "priority": "High", "deadline_days": DEADLINE_DAYS[risk_level]},
+            {"title": "Update internal policy", "priority": "Medium", "deadline_days": DEADLINE_DAYS[risk_level] * 2},
+        ],
+        "reasoning_steps": [
+            "Step 1: Compared the update with the retrieved obligation",
+            "Step 2: Assessed the company profile against it",
+        ],
+    }
+
+
+def _tenant_ids(prompt: str) -> List[str]:
+    return re.findall(r"^TENANT (.+):$", prompt, flags=re.MULTILINE)
+
+
+def build_response_text(prompt: str) -> str:
+    """Build a deterministic, schema-valid answer for a prompt."""
+    match = re.search(r'"affected_obligation_id": "([^"]*)"', prompt)
+    obligation_id = match.group(1) if match else ""
+
+    tenant_ids = _tenant_ids(prompt)
+    if tenant_ids:
+        payload = {"results": [
+            {"tenant_id": tenant_id, **_analysis(prompt, obligation_id, tenant_id)} for tenant_id in tenant_ids
+        ]}
+    else:
+        payload = _analysis(prompt, obligation_id)
+    return json.dumps(payload)
+
+
+class FakeGeminiModel:
+    """Answers like genai.GenerativeModel, after a configurable delay."""
+
+    def __init__(self, delay: float = None):
+        self.delay = FAKE_GEMINI_DELAY if delay is None else delay
+
+    def generate_content(self, prompt: str, generation_config=None) -> FakeResponse:
+        time.sleep(self.delay)
+        return FakeResponse(build_response_text(prompt), prompt)
+
+    async def generate_content_async(self, prompt: str, generation_config=None) -> FakeResponse:
+        await asyncio.sleep(self.delay)
+        return FakeResponse(build_response_text(prompt), prompt)
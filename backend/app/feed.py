@@ -0,0 +1,185 @@
+"""
+Keyset-paginated changes feed.
+
+Pages through the ingested `changes` table newest first on
+(detected_at, id), using the composite index on those columns. A cursor
+encodes the position of the first or last change of a page, so every
+page is one index range scan no matter how deep it is, and paging stays
+stable while new changes are inserted in front.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import base64
+import json
+
+from sqlalchemy import select, func, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Change
+
+DIRECTIONS = {"next", "prev"}
+
+
+def encode_cursor(change: Change) -> str:
+    """Encode the feed position of a change as an opaque cursor."""
+    position = [change.detected_at.isoformat(), change.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor into a (detected_at, id) position.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        detected_at, change_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(detected_at), str(change_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _filter_conditions(risk_level: Optional[str], source: Optional[str]) -> List:
+    conditions = []
+    if risk_level:
+        conditions.append(Change.risk_level == risk_level.lower())
+    if source:
+        conditions.append(Change.source_id == source)
+    return conditions
+
+
+async def count_changes(session: AsyncSession, risk_level: Optional[str] = None,
+                        source: Optional[str] = None) -> Dict:
+    """
+    Count the changes in the feed.
+
+    On Postgres the planner's row estimate is used instead of a full count,
+    so the cost doesn't grow with the table; SQLite counts exactly.
+
+    Returns:
+        Dictionary with the total and whether it is approximate
+    """
+    conditions = _filter_conditions(risk_level, source)
+    count_query = select(func.count()).select_from(Change).where(*conditions)
+
+    if session.bind.dialect.name != "postgresql":
+        total = (await session.execute(count_query)).scalar_one()
+        return {"total": total, "approximate": False}
+
+    rows_query = select(Change.id).where(*conditions)
+    compiled = rows_query.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {"total": int(plan[0]["Plan"]["Plan Rows"]), "approximate": True}
+
+
+async def list_changes(
+    session: AsyncSession,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    direction: str = "next",
+    risk_level: Optional[str] = None,
+    source: Optional[str] = None,
+    include_total: bool = False
+) -> Dict:
+    """
+    Get one page of the changes feed, newest first.
+
+    Args:
+        session: Database session
+        limit: Changes per page
+        cursor: nextCursor or prevCursor of a previous page; omitted for the first page
+        direction: "next" for older changes after the cursor, "prev" for newer ones before it
+        risk_level: Only return changes with this risk level
+        source: Only return changes from this source ID
+        include_total: Also return an (approximate on Postgres) total count
+
+    Returns:
+        Dictionary with the changes and the cursors of the adjacent pages
+
+    Raises:
+        ValueError: If the cursor or direction is invalid
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction '{direction}', expected 'next' or 'prev'")
+
+    position = tuple_(Change.detected_at, Change.id)
+    query = select(Change).where(*_filter_conditions(risk_level, source))
+    backward = cursor is not None and direction == "prev"
+
+    if cursor is not None:
+        detected_at, change_id = decode_cursor(cursor)
+        if backward:
+            query = query.where(position > tuple_(detected_at, change_id))
+        else:
+            query = query.where(position < tuple_(detected_at, change_id))
+
+    if backward:
+        query = query.order_by(Change.detected_at.asc(), Change.id.asc())
+    else:
+        query = query.order_by(Change.detected_at.desc(), Change.id.desc())
+
+    # One extra row tells whether there is another page in this direction
+    rows = list((await session.execute(query.limit(limit + 1))).scalars())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+
+    if backward:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    result = {
+        "changes": [row.to_dict() for row in rows],
+        "limit": limit,
+        "nextCursor": encode_cursor(rows[-1]) if rows and has_next else None,
+        "prevCursor": encode_cursor(rows[0]) if rows and has_prev else None,
+        "hasNext": bool(rows) and has_next,
+        "hasPrev": bool(rows) and has_prev,
+    }
+
+    if include_total:
+        counted = await count_changes(session, risk_level, source)
+        result["total"] = counted["total"]
+        result["totalIsApproximate"] = counted["approximate"]
+
+    return result
+
+
+async def get_change(session: AsyncSession, change_id: str) -> Optional[Dict]:
+    """Get one ingested change by ID, or None if it hasn't been ingested."""
+    row = await session.get(Change, change_id)
+    return row.to_dict() if row else None
+
+
+async def get_change_stats(session: AsyncSession) -> Optional[Dict]:
+    """
+    Dashboard statistics over the changes detected this month.
+
+    Returns:
+        Dictionary of counts, or None if nothing has been ingested yet
+    """
+    if (await session.execute(select(Change.id).limit(1))).first() is None:
+        return None
+
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    result = await session.execute(
+        select(Change.risk_level, func.count())
+        .where(Change.detected_at >= month_start)
+        .group_by(Change.risk_level)
+    )
+    counts = dict(result.all())
+    sources = (await session.execute(select(func.count(func.distinct(Change.source_id))))).scalar_one()
+    return {
+        "sourcesMonitored": sources,
+        "totalSources": sources,
+        "changesThisMonth": sum(counts.values()),
+        "highRiskAlerts": counts.get("high", 0) + counts.get("critical", 0),
+        "criticalAlerts": counts.get("critical", 0),
+    }
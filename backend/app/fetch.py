@@ -0,0 +1,130 @@
+"""
+Shared HTTP fetch layer for monitored sources.
+
+All upstream requests go through one pooled async HTTP client, so source
+services don't block the event loop or open a new connection per call.
+
+FETCH_MODE=record stores every upstream response in a fixture archive
+(see app.fixtures), and FETCH_MODE=replay answers from the archive
+without network access.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+import asyncio
+
+import httpx
+
+from app.config import FETCH_TIMEOUT, FETCH_MAX_CONNECTIONS, FETCH_MODE
+from app.metrics import fetch_duration, fetch_errors
+
+FETCH_MODES = {"live", "record", "replay"}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+_client: Optional[httpx.AsyncClient] = None
+
+_mode = FETCH_MODE
+_archive = None
+
+
+def set_fetch_mode(mode: str, archive_path: Optional[Path] = None) -> None:
+    """
+    Switch between live fetches, recording and replaying.
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    global _mode, _archive
+
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode '{mode}', expected one of: {', '.join(sorted(FETCH_MODES))}")
+    _mode = mode
+    _archive = None
+    if archive_path is not None:
+        from app.fixtures import FixtureArchive
+        _archive = FixtureArchive(archive_path)
+
+
+def get_archive():
+    """Get the fixture archive used for recording and replaying."""
+    global _archive
+
+    if _archive is None:
+        from app.fixtures import FixtureArchive
+        _archive = FixtureArchive()
+    return _archive
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=FETCH_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS),
+        )
+    return _client
+
+
+async def fetch(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                source: str = "unknown") -> httpx.Response:
+    """
+    Fetch a URL with the shared client.
+
+    Args:
+        url: URL to fetch
+        params: Query parameters
+        headers: Extra request headers
+        source: Source ID the request is made for
+
+    Returns:
+        The HTTP response
+
+    Raises:
+        httpx.HTTPError: On connection errors and non-2xx responses
+    """
+    try:
+        with fetch_duration.time(source=source):
+            if _mode == "replay":
+                response = get_archive().replay_response("GET", url, params)
+            else:
+                response = await get_client().get(url, params=params, headers=headers)
+        if _mode == "record":
+            await asyncio.to_thread(
+                get_archive().store, "GET", url, params, response.status_code, dict(response.headers), response.content
+            )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        fetch_errors.inc(source=source, kind=f"http_{e.response.status_code}")
+        raise
+    except httpx.TimeoutException:
+        fetch_errors.inc(source=source, kind="timeout")
+        raise
+    except httpx.HTTPError:
+        fetch_errors.inc(source=source, kind="connection")
+        raise
+    return response
+
+
+async def fetch_json(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                     source: str = "unknown"):
+    """Fetch a URL and parse the response body as JSON."""
+    response = await fetch(url, params=params, headers={'Accept': 'application/json', **(headers or {})},
+                           source=source)
+    return response.json()
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
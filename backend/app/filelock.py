@@ -0,0 +1,100 @@
+"""
+File writes that are safe with several worker processes.
+
+- file_lock: an exclusive lock on a sidecar "<name>.lock" file, held across
+  a read-modify-write or an append, so workers take turns (async_file_lock
+  waits for it without blocking the event loop); try_file_lock takes it
+  without waiting, for locks held as long as a process runs.
+- atomic_write_bytes/atomic_write_text: write to a uniquely named temporary
+  file in the same directory, then rename it over the target, so readers
+  see the old or the new file and never a partial one.
+"""
+
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterator, Optional, Union
+import asyncio
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: Union[str, Path]) -> Iterator[None]:
+    """Hold an exclusive inter-process lock for a file while the block runs."""
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def try_file_lock(path: Union[str, Path]) -> Optional[BinaryIO]:
+    """
+    Take file_lock's lock without waiting.
+
+    Returns:
+        The open lock file, which holds the lock until it is closed, or
+        None if another process holds it
+    """
+    lock_path = Path(f"{path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(lock_path, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+@asynccontextmanager
+async def async_file_lock(path: Union[str, Path]) -> AsyncIterator[None]:
+    """file_lock for async code: waits for the lock in a worker thread."""
+    lock = file_lock(path)
+    await asyncio.to_thread(lock.__enter__)
+    try:
+        yield
+    finally:
+        lock.__exit__(None, None, None)
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """Replace a file's contents in one rename."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+
+def atomic_write_text(path: Union[str, Path], text: str, encoding: str = "utf-8") -> None:
+    atomic_write_bytes(path, text.encode(encoding))
@@ -0,0 +1,171 @@
+"""
+Record/replay fixture archives for upstream sources.
+
+In record mode the shared fetch layer stores every upstream response it
+receives; in replay mode it answers from the archive without touching the
+network, so parsers and ingestion can be benchmarked and regression-tested
+deterministically offline.
+
+An archive is a directory with an index of requests and content-addressed,
+gzip-compressed response bodies:
+    index.json                 request key -> URL, params, status, content type, body hash
+    blobs/<sha256>.gz          one file per distinct body, shared by identical responses
+
+Usage:
+    python -m app.fixtures record --pages 5 --pib --url https://www.meity.gov.in/...pdf
+    python -m app.fixtures list
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+from urllib.parse import urlencode
+
+import httpx
+
+from app.config import FETCH_FIXTURES_DIR
+from app.filelock import file_lock, atomic_write_bytes, atomic_write_text
+
+DEFAULT_ARCHIVE = Path(FETCH_FIXTURES_DIR) if FETCH_FIXTURES_DIR else Path(__file__).parent.parent / "data" / "fixtures"
+
+# Headers kept with a recorded response; bodies are stored decoded, so not Content-Encoding
+RECORDED_HEADERS = ("content-type", "last-modified", "etag")
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None) -> str:
+    """Identify a request by its method, URL and sorted query parameters."""
+    query = urlencode(sorted((str(key), str(value)) for key, value in (params or {}).items()))
+    return hashlib.sha256(f"{method.upper()} {url}?{query}".encode("utf-8")).hexdigest()
+
+
+class FixtureArchive:
+    """A directory of recorded upstream responses."""
+
+    def __init__(self, path: Path = DEFAULT_ARCHIVE):
+        self.path = Path(path)
+        self._index: Optional[Dict[str, Dict]] = None
+        self._bodies: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def _read_index(self) -> Dict[str, Dict]:
+        index_file = self.path / "index.json"
+        return json.loads(index_file.read_text(encoding="utf-8")) if index_file.exists() else {}
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.path / "blobs" / f"{digest}.gz"
+
+    def store(self, method: str, url: str, params: Optional[Dict], status: int,
+              headers: Dict[str, str], body: bytes) -> str:
+        """
+        Record a response.
+
+        Returns:
+            The SHA-256 of the body, which names its blob
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        # Other processes may be recording into the same archive
+        with self._lock, file_lock(self.path / "index.json"):
+            blob = self._blob_path(digest)
+            if not blob.exists():
+                atomic_write_bytes(blob, gzip.compress(body, mtime=0))
+
+            self._index = self._read_index()
+            self._index[request_key(method, url, params)] = {
+                "method": method.upper(),
+                "url": url,
+                "params": {str(key): str(value) for key, value in (params or {}).items()},
+                "status": status,
+                "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+                "body": digest,
+                "size": len(body),
+                "recorded_at": datetime.now().isoformat(),
+            }
+            atomic_write_text(self.path / "index.json", json.dumps(self._index, indent=2, sort_keys=True))
+        return digest
+
+    def lookup(self, method: str, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Get the recorded entry and body for a request, or None if it wasn't recorded."""
+        entry = self.index.get(request_key(method, url, params))
+        if entry is None:
+            return None
+
+        digest = entry["body"]
+        body = self._bodies.get(digest)
+        if body is None:
+            body = self._bodies[digest] = gzip.decompress(self._blob_path(digest).read_bytes())
+        return {**entry, "content": body}
+
+    def replay_response(self, method: str, url: str, params: Optional[Dict] = None) -> httpx.Response:
+        """
+        Build an httpx response from the archive.
+
+        Raises:
+            httpx.ConnectError: If the request wasn't recorded
+        """
+        request = httpx.Request(method, url, params=params)
+        recorded = self.lookup(method, url, params)
+        if recorded is None:
+            raise httpx.ConnectError(f"No recorded fixture for {request.url}", request=request)
+        return httpx.Response(recorded["status"], headers=recorded["headers"], content=recorded["content"],
+                              request=request)
+
+
+async def record_sources(archive: Path, pages: int, pib: bool, urls) -> None:
+    """Fetch upstream sources in record mode."""
+    from app.fetch import fetch, set_fetch_mode, close_client
+    from app.meity_service import fetch_press_releases
+
+    set_fetch_mode("record", archive)
+    try:
+        for page in range(1, pages + 1):
+            data = await fetch_press_releases(page, 10)
+            print(f"✓ MeitY page {page}: {len(data.get('posts', []))} posts")
+        if pib:
+            from app.monitor_alternative import PIB_RELEASES_URL, PIB_PARAMS
+            response = await fetch(PIB_RELEASES_URL, params=PIB_PARAMS, source="pib")
+            print(f"✓ PIB releases: {len(response.content)} bytes")
+        for url in urls:
+            response = await fetch(url, source="attachment")
+            print(f"✓ {url}: {len(response.content)} bytes")
+    finally:
+        await close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and inspect upstream fixture archives")
+    parser.add_argument("--archive", default=str(DEFAULT_ARCHIVE), help="Archive directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Record upstream responses")
+    record_parser.add_argument("--pages", type=int, default=3, help="MeitY API pages to record")
+    record_parser.add_argument("--pib", action="store_true", help="Also record the PIB releases page")
+    record_parser.add_argument("--url", action="append", default=[], help="Extra URL to record (e.g. an attachment)")
+
+    subparsers.add_parser("list", help="List recorded requests")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_sources(Path(args.archive), args.pages, args.pib, args.url))
+    else:
+        archive = FixtureArchive(Path(args.archive))
+        blobs = {entry["body"] for entry in archive.index.values()}
+        for entry in sorted(archive.index.values(), key=lambda entry: (entry["url"], sorted(entry["params"].items()))):
+            query = f"?{urlencode(entry['params'])}" if entry["params"] else ""
+            print(f"{entry['status']}  {entry['size']:>9}  {entry['url']}{query}")
+        print(f"\n{len(archive.index)} requests, {len(blobs)} distinct bodies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+History of ad-hoc analyses made with /api/analyze-update.
+
+Kept in the `analysis_history` table so every worker process records to,
+and reads from, the same history.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+import json
+
+from sqlalchemy import func, insert, select
+
+from app.db import async_session_maker, engine
+from app.models import AnalysisHistory
+
+
+async def add_history_entry(update_text: str, result: Dict) -> int:
+    """
+    Record an analysis.
+
+    Returns:
+        ID of the history entry
+    """
+    async with engine.begin() as connection:
+        inserted = await connection.execute(
+            insert(AnalysisHistory.__table__)
+            .values(created_at=datetime.now(), update_text=update_text, result=json.dumps(result, ensure_ascii=False))
+            .returning(AnalysisHistory.__table__.c.id)
+        )
+        return inserted.scalar_one()
+
+
+async def get_history(limit: int = 100) -> List[Dict]:
+    """Get the most recent analyses, most recent first."""
+    async with async_session_maker() as session:
+        result = await session.execute(select(AnalysisHistory).order_by(AnalysisHistory.id.desc()).limit(limit))
+        return [entry.to_dict() for entry in result.scalars()]
+
+
+async def count_history() -> int:
+    async with engine.connect() as connection:
+        return (await connection.execute(select(func.count()).select_from(AnalysisHistory.__table__))).scalar_one()
@@ -0,0 +1,446 @@
+"""
+Ingestion of monitored changes into the database.
+
+Periodically polls the sources, and upserts the relevant changes (with
+the summary of any cached analysis) into the `changes` table that backs
+search. With several workers, only the one holding the ingestion lock
+polls; the others take over if it stops. Writes go through a bulk path:
+asyncpg COPY into a staging table plus one INSERT ... ON CONFLICT merge
+on Postgres, and batched executemany upserts elsewhere.
+
+Run a backfill of older press releases, or compare write batch sizes, with:
+    python -m app.ingestion backfill --pages 100 --batch-size 1000
+    python -m app.ingestion tune --pages 10
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import hashlib
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.config import INGEST_BATCH_SIZE, ANALYSIS_MODE
+from app.db import LeaderLock, engine
+from app.metrics import ingest_polls, ingest_changes_stored, ingest_last_poll
+from app.models import Change
+
+# Column order used for COPY and the merge statement
+CHANGE_COLUMNS = [column.name for column in Change.__table__.columns]
+
+# Sequence number of this worker's last write; each write takes the next
+# number after the highest in the database, so readers in any worker can
+# tell when the data changed
+_ingest_seq = 0
+
+# Fingerprint of the changes stored by the last poll
+_last_poll_fingerprint: Optional[str] = None
+
+
+def parse_detected_at(value: str) -> datetime:
+    """Parse a change's detectedAt string, falling back to the current time."""
+    try:
+        return datetime.fromisoformat(value.rstrip('Z'))
+    except (AttributeError, ValueError):
+        return datetime.utcnow()
+
+
+def change_to_row(change: Dict, analysis_summary: str = None) -> Dict:
+    """
+    Convert a change dictionary into a `changes` table row.
+
+    Args:
+        change: Change dictionary as returned by the source service
+        analysis_summary: Summary of the change's analysis, if any
+
+    Returns:
+        Dictionary of column values
+    """
+    return {
+        "id": change["id"],
+        "source_id": change.get("sourceId", ""),
+        "source_name": change.get("sourceName", ""),
+        "change_summary": change.get("changeSummary", ""),
+        "detected_at": parse_detected_at(change.get("detectedAt")),
+        "risk_level": change.get("riskLevel", "low"),
+        "affected_sector": change.get("affectedSector"),
+        "link": change.get("link"),
+        "content": change.get("content", ""),
+        "matched_keywords": " ".join(change.get("matchedKeywords", [])),
+        "analysis_summary": analysis_summary,
+        "ingest_seq": _ingest_seq,
+        "ingested_at": datetime.utcnow(),
+    }
+
+
+def get_ingest_sequence() -> int:
+    """Get the sequence number of this worker's last write."""
+    return _ingest_seq
+
+
+async def next_ingest_sequence() -> int:
+    """Take the sequence number for a write: one past the highest stored by any worker."""
+    global _ingest_seq
+
+    async with engine.connect() as connection:
+        stored = (await connection.execute(select(func.max(Change.__table__.c.ingest_seq)))).scalar() or 0
+    _ingest_seq = max(_ingest_seq, stored) + 1
+    return _ingest_seq
+
+
+def _postgres_merge_sql() -> str:
+    """INSERT ... ON CONFLICT statement merging the staging table into `changes`."""
+    columns = ", ".join(CHANGE_COLUMNS)
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in CHANGE_COLUMNS if name != "id")
+    return (
+        f"INSERT INTO changes ({columns}) SELECT {columns} FROM changes_staging "
+        f"ON CONFLICT (id) DO UPDATE SET {updates}"
+    )
+
+
+async def _copy_upsert(rows: List[Dict], batch_size: int) -> None:
+    """Upsert rows on Postgres with COPY into a staging table and one merge per batch."""
+    columns = ", ".join(CHANGE_COLUMNS)
+    merge_sql = _postgres_merge_sql()
+
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver = raw_connection.driver_connection
+
+        async with driver.transaction():
+            await driver.execute(
+                f"CREATE TEMP TABLE changes_staging ON COMMIT DROP AS "
+                f"SELECT {columns} FROM changes WITH NO DATA"
+            )
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                records = [tuple(row[name] for name in CHANGE_COLUMNS) for row in batch]
+                await driver.copy_records_to_table("changes_staging", records=records, columns=CHANGE_COLUMNS)
+                await driver.execute(merge_sql)
+                await driver.execute("TRUNCATE changes_staging")
+
+
+async def _executemany_upsert(rows: List[Dict], batch_size: int) -> None:
+    """Upsert rows with one batched executemany INSERT ... ON CONFLICT per batch."""
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(Change.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=["id"],
+        set_={name: statement.excluded[name] for name in CHANGE_COLUMNS if name != "id"}
+    )
+
+    async with engine.begin() as connection:
+        for start in range(0, len(rows), batch_size):
+            await connection.execute(statement, rows[start:start + batch_size])
+
+
+async def bulk_upsert_rows(rows: List[Dict], batch_size: int = INGEST_BATCH_SIZE) -> Dict:
+    """
+    Insert or update many `changes` rows using the fastest path for the database.
+
+    Args:
+        rows: Rows as produced by change_to_row
+        batch_size: Rows per COPY/merge or executemany batch
+
+    Returns:
+        Dictionary with rows written, elapsed seconds and rows per second
+    """
+    started = time.perf_counter()
+
+    # A row can't be upserted twice in one statement, so the last duplicate wins
+    rows = list({row["id"]: row for row in rows}.values())
+
+    if rows:
+        if engine.dialect.name == "postgresql" and engine.dialect.driver == "asyncpg":
+            await _copy_upsert(rows, batch_size)
+        else:
+            await _executemany_upsert(rows, batch_size)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": len(rows),
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(rows) / elapsed, 1) if rows and elapsed else 0.0,
+    }
+
+
+async def upsert_changes(changes: List[Dict], batch_size: int = INGEST_BATCH_SIZE) -> Dict:
+    """
+    Insert new changes and update existing ones.
+
+    Args:
+        changes: Change dictionaries to store
+        batch_size: Rows per write batch
+
+    Returns:
+        Throughput statistics from bulk_upsert_rows
+    """
+    if changes:
+        await next_ingest_sequence()
+
+    summaries = await get_analysis_summaries(changes)
+    rows = [change_to_row(change, summaries.get(change["id"])) for change in changes]
+
+    stats = await bulk_upsert_rows(rows, batch_size)
+    ingest_changes_stored.inc(stats["rows"])
+
+    # Analysis workers pick up new changes without waiting for someone to view them
+    if ANALYSIS_MODE == "queue":
+        from app.auto_analyzer import enqueue_analyses
+
+        try:
+            await enqueue_analyses([change for change in changes if change["id"] not in summaries])
+        except Exception as e:
+            print(f"⚠️  Error queueing analyses: {e}")
+    return stats
+
+
+async def get_analysis_summaries(changes: List[Dict]) -> Dict[str, str]:
+    """Get the summaries of the cached analyses of changes, by change ID."""
+    from app.auto_analyzer import get_cached_entries
+
+    entries = await get_cached_entries([change["id"] for change in changes])
+    return {change_id: entry.analysis.summary for change_id, entry in entries.items()}
+
+
+def get_changes_fingerprint(changes: List[Dict], summaries: Dict[str, str]) -> str:
+    """
+    Fingerprint the stored content of a list of changes.
+
+    Detection times are left out, since demo changes get a fresh one on
+    every fetch.
+
+    Args:
+        changes: Change dictionaries
+        summaries: Analysis summaries by change ID, from get_analysis_summaries
+    """
+    digest = hashlib.sha256()
+    for change in changes:
+        summary = summaries.get(change["id"])
+        for value in (change["id"], change.get("changeSummary"), change.get("riskLevel"),
+                      change.get("content"), summary):
+            digest.update(str(value).encode("utf-8"))
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def poll_sources() -> Dict:
+    """
+    Fetch the latest changes from the sources and store them.
+
+    Polls that return the same changes as the last one are not written,
+    so the ingest sequence only moves when the data does. The demo changes
+    are left out: their detection times move with the clock, which would
+    shift their feed position on every stored poll.
+
+    Returns:
+        Dictionary with the number of changes fetched and stored
+    """
+    global _last_poll_fingerprint
+
+    from app.meity_service import get_all_changes, get_dummy_changes
+
+    result = await get_all_changes(1, 10)
+    dummy_ids = {change["id"] for change in get_dummy_changes()}
+    changes = [change for change in result["changes"] if change["id"] not in dummy_ids]
+
+    ingest_last_poll.set(len(changes), stage="fetched")
+
+    fingerprint = get_changes_fingerprint(changes, await get_analysis_summaries(changes))
+    if fingerprint == _last_poll_fingerprint:
+        ingest_polls.inc(outcome="unchanged")
+        ingest_last_poll.set(0, stage="stored")
+        return {"fetched": len(changes), "stored": 0, "rows_per_sec": 0.0, "ingest_seq": _ingest_seq}
+
+    stats = await upsert_changes(changes)
+    _last_poll_fingerprint = fingerprint
+    ingest_polls.inc(outcome="stored")
+    ingest_last_poll.set(stats["rows"], stage="stored")
+
+    return {
+        "fetched": len(changes),
+        "stored": stats["rows"],
+        "rows_per_sec": stats["rows_per_sec"],
+        "ingest_seq": _ingest_seq
+    }
+
+
+async def backfill(pages: int, page_size: int = 100, batch_size: int = INGEST_BATCH_SIZE,
+                   start_page: int = 1) -> Dict:
+    """
+    Ingest older press releases page by page.
+
+    Fetching and writing overlap: the next page is fetched while the
+    current batch of changes is written.
+
+    Args:
+        pages: Number of source pages to fetch
+        page_size: Press releases per source page
+        batch_size: Rows per write batch
+        start_page: First source page to fetch
+
+    Returns:
+        Dictionary with counts and write throughput
+    """
+    from app.meity_service import fetch_press_releases, process_press_releases_async
+
+    async def fetch_page(page: int) -> List[Dict]:
+        data = await fetch_press_releases(page, page_size)
+        return await process_press_releases_async(data.get("posts", []))
+
+    fetched = written = 0
+    write_seconds = 0.0
+    pending_write: Optional[asyncio.Task] = None
+    next_fetch = asyncio.create_task(fetch_page(start_page))
+
+    try:
+        for page in range(start_page, start_page + pages):
+            changes = await next_fetch
+            if page + 1 < start_page + pages:
+                next_fetch = asyncio.create_task(fetch_page(page + 1))
+
+            if pending_write:
+                stats = await pending_write
+                written += stats["rows"]
+                write_seconds += stats["seconds"]
+
+            fetched += len(changes)
+            pending_write = asyncio.create_task(upsert_changes(changes, batch_size)) if changes else None
+
+            if not changes:
+                print(f"ℹ No relevant changes on page {page}")
+
+        if pending_write:
+            stats = await pending_write
+            written += stats["rows"]
+            write_seconds += stats["seconds"]
+    finally:
+        # After a failed fetch or write, don't leave the other task running
+        for task in (next_fetch, pending_write):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+    return {
+        "pages": pages,
+        "fetched": fetched,
+        "written": written,
+        "batch_size": batch_size,
+        "write_seconds": round(write_seconds, 3),
+        "rows_per_sec": round(written / write_seconds, 1) if write_seconds else 0.0,
+    }
+
+
+async def tune_batch_size(rows: List[Dict], candidates: List[int]) -> Dict:
+    """
+    Measure write throughput of the same rows at several batch sizes.
+
+    Upserts are idempotent, so the rows are simply rewritten for each size.
+
+    Args:
+        rows: Rows as produced by change_to_row
+        candidates: Batch sizes to try
+
+    Returns:
+        Dictionary with per-size results and the fastest batch size
+    """
+    results = [await bulk_upsert_rows(rows, batch_size) for batch_size in candidates]
+    best = max(results, key=lambda result: result["rows_per_sec"])
+    return {"results": results, "best_batch_size": best["batch_size"]}
+
+
+async def run_ingestion_loop(interval: float) -> None:
+    """
+    Poll the sources forever, every `interval` seconds.
+
+    Every API worker runs this loop, but only the one holding the
+    ingestion lock polls; the others try to take the lock every
+    `interval` seconds, so polling goes on if that worker stops.
+
+    Args:
+        interval: Seconds between polls
+    """
+    lock = LeaderLock("ingestion")
+    leader = False
+    try:
+        while True:
+            try:
+                if await lock.acquire():
+                    if not leader:
+                        print("✓ Polling sources in this worker")
+                    leader = True
+                    result = await poll_sources()
+                    print(f"✓ Ingested {result['stored']} changes (seq {result['ingest_seq']}, "
+                          f"{result['rows_per_sec']} rows/sec)")
+                else:
+                    leader = False
+            except Exception as e:
+                ingest_polls.inc(outcome="error")
+                print(f"⚠️  Error ingesting changes: {e}")
+            await asyncio.sleep(interval)
+    finally:
+        await lock.release()
+
+
+def main():
+    """Command line entry point for backfills."""
+    parser = argparse.ArgumentParser(description="Ingest changes into the database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = subparsers.add_parser("backfill", help="Ingest older press releases")
+    backfill_parser.add_argument("--pages", type=int, default=10, help="Number of source pages to fetch")
+    backfill_parser.add_argument("--page-size", type=int, default=100, help="Press releases per source page")
+    backfill_parser.add_argument("--start-page", type=int, default=1, help="First source page")
+    backfill_parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Rows per write batch")
+
+    tune_parser = subparsers.add_parser("tune", help="Compare write throughput across batch sizes")
+    tune_parser.add_argument("--pages", type=int, default=5, help="Number of source pages to fetch as sample data")
+    tune_parser.add_argument("--page-size", type=int, default=100, help="Press releases per source page")
+    tune_parser.add_argument("--sizes", default="50,200,1000,5000", help="Comma-separated batch sizes to try")
+
+    args = parser.parse_args()
+
+    async def run_backfill():
+        result = await backfill(args.pages, args.page_size, args.batch_size, args.start_page)
+        print(f"✓ Backfilled {result['written']} of {result['fetched']} changes from {result['pages']} pages")
+        print(f"✓ Write throughput: {result['rows_per_sec']} rows/sec "
+              f"({result['write_seconds']}s, batch size {result['batch_size']})")
+
+    async def run_tune():
+        from app.meity_service import fetch_press_releases, process_press_releases_async
+
+        changes = []
+        for page in range(1, args.pages + 1):
+            data = await fetch_press_releases(page, args.page_size)
+            changes.extend(await process_press_releases_async(data.get("posts", [])))
+
+        rows = [change_to_row(change) for change in changes]
+        result = await tune_batch_size(rows, [int(size) for size in args.sizes.split(",")])
+        for stats in result["results"]:
+            print(f"  batch size {stats['batch_size']:>6}: {stats['rows_per_sec']} rows/sec ({stats['seconds']}s)")
+        print(f"✓ Fastest batch size for {len(rows)} rows: {result['best_batch_size']}")
+
+    async def run():
+        from app.db import create_local_schema
+
+        await create_local_schema()
+        from app.fetch import close_client
+
+        try:
+            await (run_backfill() if args.command == "backfill" else run_tune())
+        finally:
+            await close_client()
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
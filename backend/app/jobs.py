@@ -0,0 +1,468 @@
+"""
+Database-backed queue of analysis jobs.
+
+With ANALYSIS_MODE=queue, the API records a job per change to analyze in
+the `analysis_jobs` table instead of calling Gemini itself, and analysis
+workers (app.worker) run them. The database is the only infrastructure:
+- Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED (on
+  SQLite, writes are serialized anyway), so concurrent workers never
+  block on, or take, each other's jobs.
+- A claimed job is leased to its worker for JOB_LEASE_SECONDS and the
+  worker's heartbeats extend the lease. A job whose worker died is claimed
+  again once its lease expires.
+- A failed attempt is retried after an exponential backoff with jitter;
+  after JOB_MAX_ATTEMPTS attempts the job is dead-lettered (status "dead")
+  until it is retried by hand.
+- Jobs are claimed in order of their rank time: the time they were queued
+  minus credits for risk level, freshness, source and someone viewing the
+  change. Since credits are fixed, a job that waited longer than the
+  difference in credits is ahead of newly queued higher-priority jobs
+  (aging), and each risk level may only use its JOB_RISK_QUOTAS share of
+  a worker's concurrency, so a backlog can't take every slot.
+- A worker whose pre-classifier rules the change out marks its job
+  "skipped" with the prediction, which the API then serves; skipped jobs
+  aren't queued again.
+- A job whose Gemini calls don't fit the token budget (app.llm_budget)
+  goes back in the queue until the budget has room, keeping its attempt.
+- The attempt number fences each lease: a worker can only complete or fail
+  the attempt it claimed, so a worker that lost its lease can't overwrite
+  the outcome of the attempt that replaced it. Analyses are stored by
+  cache key, so running an attempt twice only rewrites the same entries.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import json
+import random
+
+from sqlalchemy import and_, bindparam, func, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.config import (
+    JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY, JOB_RETRY_MAX_DELAY, JOB_RISK_CREDITS, JOB_FRESHNESS_CREDIT,
+    JOB_FRESHNESS_WINDOW, JOB_DEMAND_CREDIT, JOB_SOURCE_WEIGHTS
+)
+from app.db import engine
+from app.events import WORKER_ID
+from app.ingestion import parse_detected_at
+from app.models import AnalysisJob
+
+# Rows per enqueue statement
+ENQUEUE_BATCH_SIZE = 500
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+SKIPPED = "skipped"
+DEAD = "dead"
+
+
+@dataclass(slots=True)
+class Job:
+    """A job claimed by this worker."""
+
+    id: int
+    change_id: str
+    change: Dict
+    # Attempt number of this lease
+    attempt: int
+    risk_level: str
+
+
+def get_risk_level(change: Dict) -> str:
+    return (change.get("riskLevel") or "low").lower()
+
+
+def priority_credit(change: Dict, now: datetime, demanded: bool = False) -> float:
+    """
+    Seconds a change's job is ranked ahead of the time it was queued.
+
+    Args:
+        change: Change dictionary
+        now: Current UTC time
+        demanded: Someone is viewing the change
+    """
+    age = (now - parse_detected_at(change.get("detectedAt"))).total_seconds()
+    freshness = JOB_FRESHNESS_CREDIT * min(1.0, max(0.0, 1 - age / JOB_FRESHNESS_WINDOW))
+    weight = JOB_SOURCE_WEIGHTS.get((change.get("sourceId") or "").lower(), 1.0)
+    credit = (JOB_RISK_CREDITS.get(get_risk_level(change), 0.0) + freshness) * weight
+    return credit + (JOB_DEMAND_CREDIT if demanded else 0.0)
+
+
+def rank_change(change: Dict, now: datetime, demanded: bool = False) -> datetime:
+    """Rank time of a job for a change queued now."""
+    return now - timedelta(seconds=priority_credit(change, now, demanded))
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds to wait before retrying a job after its `attempt`-th attempt failed."""
+    delay = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_DELAY * 2 ** (attempt - 1))
+    # Jitter, so jobs that failed together aren't all retried together
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def enqueue_changes(changes: List[Dict], demanded: bool = False) -> int:
+    """
+    Queue analysis jobs for changes.
+
+    Changes that already have a queued, running, skipped or dead job are
+    left alone.
+    A finished job is queued again, since its change is only enqueued when
+    it has no cached analysis (e.g. after the cache was cleared).
+
+    Args:
+        changes: Change dictionaries
+        demanded: Someone is viewing the changes; their queued jobs are moved up
+
+    Returns:
+        Number of jobs queued
+    """
+    # A row can't be upserted twice in one statement, so the last duplicate wins
+    changes = list({change["id"]: change for change in changes if change.get("id")}.values())
+    if not changes:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [{
+        "change_id": change["id"],
+        "change": json.dumps(change, ensure_ascii=False),
+        "status": QUEUED,
+        "risk_level": get_risk_level(change),
+        "rank_at": rank_change(change, now, demanded),
+        "attempts": 0,
+        "run_after": now,
+        "created_at": now,
+        "updated_at": now,
+    } for change in changes]
+
+    table = AnalysisJob.__table__
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["change_id"],
+        set_={
+            "change": statement.excluded.change, "status": QUEUED, "risk_level": statement.excluded.risk_level,
+            "rank_at": statement.excluded.rank_at, "attempts": 0, "run_after": statement.excluded.run_after,
+            "worker_id": None, "lease_expires_at": None, "last_error": None, "result": None,
+            "updated_at": statement.excluded.updated_at,
+        },
+        where=table.c.status == DONE,
+    ).returning(table.c.id)
+
+    queued = 0
+    async with engine.begin() as connection:
+        for start in range(0, len(rows), ENQUEUE_BATCH_SIZE):
+            result = await connection.execute(statement.values(rows[start:start + ENQUEUE_BATCH_SIZE]))
+            queued += len(result.all())
+        if demanded:
+            # Jobs already waiting keep their retry delay but move up
+            await connection.execute(
+                update(table).where(
+                    table.c.change_id == bindparam("job_change_id"), table.c.status == QUEUED,
+                    table.c.rank_at > bindparam("job_rank_at"),
+                ).values(rank_at=bindparam("job_rank_at")),
+                [{"job_change_id": row["change_id"], "job_rank_at": row["rank_at"]} for row in rows]
+            )
+    return queued
+
+
+async def claim_jobs(limit: int, lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS,
+                     quotas: Optional[Dict[str, int]] = None) -> List[Job]:
+    """
+    Lease up to `limit` due jobs to this worker, highest ranked first.
+
+    Due jobs are queued jobs whose retry delay has passed, and running jobs
+    whose lease expired with attempts left.
+
+    Args:
+        limit: Maximum number of jobs to claim
+        lease_seconds: Lease length
+        max_attempts: Attempts after which a job is no longer claimed
+        quotas: Maximum number of jobs to claim per risk level; levels
+            not listed are only limited by `limit`
+    """
+    if limit <= 0:
+        return []
+
+    now = datetime.utcnow()
+    table = AnalysisJob.__table__
+    conditions = [
+        table.c.attempts < max_attempts,
+        or_(
+            and_(table.c.status == QUEUED, table.c.run_after <= now),
+            and_(table.c.status == RUNNING, table.c.lease_expires_at < now),
+        ),
+    ]
+    due = and_(*conditions)
+
+    def candidates(*where, count: int):
+        return select(table.c.id, table.c.rank_at).where(due, *where) \
+            .order_by(table.c.rank_at, table.c.id).limit(count).with_for_update(skip_locked=True)
+
+    if quotas:
+        # Each level takes at most its quota, from the jobs no other worker has locked
+        queries = [
+            candidates(table.c.risk_level == level, count=min(slots, limit))
+            for level, slots in quotas.items() if slots > 0
+        ]
+        queries.append(candidates(table.c.risk_level.not_in(list(quotas)), count=limit))
+    else:
+        queries = [candidates(count=limit)]
+
+    async with engine.begin() as connection:
+        found = []
+        for query in queries:
+            found.extend((await connection.execute(query)).all())
+        found.sort(key=lambda row: (row.rank_at, row.id))
+        ids = [row.id for row in found[:limit]]
+        if not ids:
+            return []
+
+        # Still due: on SQLite nothing is locked, so another worker may have claimed one since
+        statement = update(table).where(table.c.id.in_(ids), due).values(
+            status=RUNNING,
+            attempts=table.c.attempts + 1,
+            worker_id=WORKER_ID,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            updated_at=now,
+        ).returning(table.c.id, table.c.change_id, table.c.change, table.c.attempts, table.c.risk_level, table.c.rank_at)
+        rows = (await connection.execute(statement)).all()
+    rows.sort(key=lambda row: (row.rank_at, row.id))
+    return [Job(row.id, row.change_id, json.loads(row.change), row.attempts, row.risk_level) for row in rows]
+
+
+def _leased(jobs: Iterable[Job]):
+    """Condition matching the current leases of this worker's jobs."""
+    table = AnalysisJob.__table__
+    return and_(
+        tuple_(table.c.id, table.c.attempts).in_([(job.id, job.attempt) for job in jobs]),
+        table.c.status == RUNNING,
+        table.c.worker_id == WORKER_ID,
+    )
+
+
+async def extend_leases(jobs: List[Job], lease_seconds: float = JOB_LEASE_SECONDS) -> List[int]:
+    """
+    Heartbeat: extend the leases of jobs this worker is running.
+
+    Returns:
+        IDs of the jobs whose leases were extended; the others were lost
+    """
+    if not jobs:
+        return []
+
+    now = datetime.utcnow()
+    table = AnalysisJob.__table__
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(table).where(_leased(jobs))
+            .values(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now)
+            .returning(table.c.id)
+        )
+        return [row.id for row in result]
+
+
+async def complete_job(job: Job) -> bool:
+    """
+    Mark a job done.
+
+    Returns:
+        False if the worker no longer held the job's lease
+    """
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(AnalysisJob.__table__).where(_leased([job])).values(
+                status=DONE, worker_id=None, lease_expires_at=None, last_error=None, updated_at=datetime.utcnow()
+            )
+        )
+    return result.rowcount == 1
+
+
+async def fail_job(job: Job, error: str, max_attempts: int = JOB_MAX_ATTEMPTS) -> Optional[str]:
+    """
+    Record a failed attempt: retry the job after a backoff, or dead-letter it
+    once it has used all its attempts.
+
+    Returns:
+        The job's new status, or None if the worker no longer held its lease
+    """
+    now = datetime.utcnow()
+    status = DEAD if job.attempt >= max_attempts else QUEUED
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(AnalysisJob.__table__).where(_leased([job])).values(
+                status=status,
+                run_after=now + timedelta(seconds=retry_delay(job.attempt)) if status == QUEUED else now,
+                worker_id=None,
+                lease_expires_at=None,
+                last_error=error,
+                updated_at=now,
+            )
+        )
+    return status if result.rowcount == 1 else None
+
+
+async def skip_job(job: Job, prediction: Dict) -> bool:
+    """
+    Mark a job skipped: the worker's pre-classifier ruled its change out.
+
+    Returns:
+        False if the worker no longer held the job's lease
+    """
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(AnalysisJob.__table__).where(_leased([job])).values(
+                status=SKIPPED, worker_id=None, lease_expires_at=None, last_error=None,
+                result=json.dumps(prediction), updated_at=datetime.utcnow()
+            )
+        )
+    return result.rowcount == 1
+
+
+async def get_job(change_id: str) -> Optional[Dict]:
+    """Get the status of a change's job, with the pre-classification of a skipped one."""
+    table = AnalysisJob.__table__
+    async with engine.connect() as connection:
+        row = (await connection.execute(
+            select(table.c.status, table.c.attempts, table.c.last_error, table.c.result)
+            .where(table.c.change_id == change_id)
+        )).first()
+    if row is None:
+        return None
+    return {
+        "status": row.status,
+        "attempts": row.attempts,
+        "error": row.last_error,
+        "pre_classification": json.loads(row.result) if row.result else None,
+    }
+
+
+async def defer_job(job: Job, delay: float) -> bool:
+    """
+    Put a job back in the queue for `delay` seconds without using up its
+    attempt (e.g. Gemini calls don't fit the token budget).
+
+    Returns:
+        False if the worker no longer held the job's lease
+    """
+    now = datetime.utcnow()
+    table = AnalysisJob.__table__
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(table).where(_leased([job])).values(
+                status=QUEUED,
+                attempts=table.c.attempts - 1,
+                run_after=now + timedelta(seconds=delay),
+                worker_id=None,
+                lease_expires_at=None,
+                updated_at=now,
+            )
+        )
+    return result.rowcount == 1
+
+
+async def dead_letter_abandoned(max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+    """
+    Dead-letter jobs whose lease expired on their last attempt (e.g. the
+    change crashes workers).
+
+    Returns:
+        Number of jobs dead-lettered
+    """
+    now = datetime.utcnow()
+    table = AnalysisJob.__table__
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(table).where(
+                table.c.status == RUNNING, table.c.lease_expires_at < now, table.c.attempts >= max_attempts
+            ).values(
+                status=DEAD, worker_id=None, lease_expires_at=None, updated_at=now,
+                last_error=func.coalesce(table.c.last_error, "Lease expired on the last attempt"),
+            )
+        )
+    return result.rowcount
+
+
+async def retry_dead_jobs(change_id: Optional[str] = None) -> int:
+    """
+    Queue dead-lettered jobs again, with all their attempts.
+
+    Args:
+        change_id: Only retry this change's job
+
+    Returns:
+        Number of jobs queued
+    """
+    now = datetime.utcnow()
+    table = AnalysisJob.__table__
+    conditions = [table.c.status == DEAD]
+    if change_id:
+        conditions.append(table.c.change_id == change_id)
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            update(table).where(*conditions).values(status=QUEUED, attempts=0, run_after=now, updated_at=now)
+        )
+    return result.rowcount
+
+
+async def count_unfinished_jobs() -> int:
+    """Count jobs that are queued (including those waiting to retry) or running."""
+    table = AnalysisJob.__table__
+    async with engine.connect() as connection:
+        return (await connection.execute(
+            select(func.count()).select_from(table).where(table.c.status.in_([QUEUED, RUNNING]))
+        )).scalar_one()
+
+
+async def get_job_stats(dead_limit: int = 20, next_limit: int = 10) -> Dict:
+    """
+    Get job counts by status, the queue by risk level, running jobs by
+    worker, the next jobs to run and the latest dead jobs.
+    """
+    now = datetime.utcnow()
+    table = AnalysisJob.__table__
+    due = and_(table.c.status == QUEUED, table.c.run_after <= now)
+    async with engine.connect() as connection:
+        counts = dict((await connection.execute(select(table.c.status, func.count()).group_by(table.c.status))).all())
+        levels = (await connection.execute(
+            select(table.c.risk_level, func.count(), func.min(table.c.run_after)).where(due).group_by(table.c.risk_level)
+        )).all()
+        running = (await connection.execute(
+            select(table.c.worker_id, table.c.risk_level, func.count()).where(table.c.status == RUNNING)
+            .group_by(table.c.worker_id, table.c.risk_level)
+        )).all()
+        upcoming = (await connection.execute(
+            select(table.c.change_id, table.c.risk_level, table.c.rank_at)
+            .where(due).order_by(table.c.rank_at, table.c.id).limit(next_limit)
+        )).all()
+        dead = (await connection.execute(
+            select(table.c.change_id, table.c.attempts, table.c.last_error, table.c.updated_at)
+            .where(table.c.status == DEAD).order_by(table.c.updated_at.desc()).limit(dead_limit)
+        )).all()
+
+    # How long the oldest due job of each risk level has been waiting for a worker
+    queued_by_risk = {
+        level: {"due": count, "lag_seconds": round((now - oldest).total_seconds(), 3)}
+        for level, count, oldest in levels
+    }
+    workers: Dict[str, Dict[str, int]] = {}
+    for worker_id, level, count in running:
+        workers.setdefault(worker_id, {})[level] = count
+
+    return {
+        "counts": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, SKIPPED, DEAD)},
+        "lag_seconds": max((level["lag_seconds"] for level in queued_by_risk.values()), default=0.0),
+        "queued_by_risk": queued_by_risk,
+        "running_by_worker": workers,
+        "next": [
+            {"change_id": row.change_id, "risk_level": row.risk_level, "rank_at": row.rank_at.isoformat()}
+            for row in upcoming
+        ],
+        "dead": [
+            {"change_id": row.change_id, "attempts": row.attempts, "error": row.last_error,
+             "failed_at": row.updated_at.isoformat()}
+            for row in dead
+        ],
+    }
@@ -3,17 +3,39 @@ Knowledge loading module for compliance data.
 
 This module handles loading JSON files from the data directory
 and provides clean access to company profile and compliance knowledge.
+
+The loaded data is held in an immutable, versioned snapshot that can be
+hot reloaded (via file watching or an endpoint) without blocking requests
+that are still using the previous snapshot.
 """
 
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
+import hashlib
 import json
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.obligation_registry import ObligationRegistry
 
 
 # Resolve the backend root directory
 # This file is in backend/app/, so we go up one level to get backend/
 BACKEND_ROOT = Path(__file__).parent.parent
 DATA_DIR = BACKEND_ROOT / "data"
+COMPANY_PROFILE_FILE = DATA_DIR / "company_profile.json"
+COMPLIANCE_KNOWLEDGE_FILE = DATA_DIR / "compliance_knowledge.json"
+
+# Additional business unit profiles, one JSON file per tenant
+COMPANY_PROFILES_DIR = DATA_DIR / "company_profiles"
+
+# Additional compliance frameworks, one JSON file per framework
+FRAMEWORKS_DIR = DATA_DIR / "frameworks"
+
+# Tenant ID of the profile in company_profile.json
+DEFAULT_TENANT = "default"
 
 
 def load_json_file(file_path: Path) -> Optional[Dict]:
@@ -47,8 +69,7 @@ def load_company_profile() -> Dict:
     Returns:
         Dictionary containing company profile data, or empty dict if not found
     """
-    file_path = DATA_DIR / "company_profile.json"
-    data = load_json_file(file_path)
+    data = load_json_file(COMPANY_PROFILE_FILE)
     
     if data is None:
         print("⚠️  Warning: Company profile not loaded, using empty profile")
@@ -64,8 +85,7 @@ def load_compliance_knowledge() -> Dict:
     Returns:
         Dictionary containing compliance knowledge, or empty dict if not found
     """
-    file_path = DATA_DIR / "compliance_knowledge.json"
-    data = load_json_file(file_path)
+    data = load_json_file(COMPLIANCE_KNOWLEDGE_FILE)
     
     if data is None:
         print("⚠️  Warning: Compliance knowledge not loaded, using empty knowledge base")
@@ -98,6 +118,13 @@ def get_obligation_by_id(compliance_data: Dict, obligation_id: str) -> Optional[
     Returns:
         Obligation dictionary or None if not found
     """
+    # The loaded knowledge base has an ID index (of every framework, so keep this one's); other data is scanned
+    if compliance_data is _snapshot.compliance_knowledge:
+        obligation = _snapshot.registry.get(obligation_id)
+        if obligation and obligation.get("framework_id") == compliance_data.get("framework_id"):
+            return obligation
+        return None
+    
     obligations = get_obligations(compliance_data)
     for obligation in obligations:
         if obligation.get("id") == obligation_id:
@@ -119,9 +146,142 @@ def get_critical_obligations(compliance_data: Dict) -> List[Dict]:
     return [o for o in obligations if o.get("severity") == "critical"]
 
 
-# Module-level cache for loaded data
-_company_profile_cache: Optional[Dict] = None
-_compliance_knowledge_cache: Optional[Dict] = None
+@dataclass(frozen=True)
+class KnowledgeSnapshot:
+    """
+    Immutable view of the knowledge base at one point in time.
+
+    Snapshots are swapped as a whole on reload, so a request that grabbed a
+    snapshot keeps a consistent view until it finishes. The dictionaries
+    inside are shared and must be treated as read-only.
+    """
+    version: str
+    loaded_at: str
+    company_profile: Dict = field(default_factory=dict)
+    compliance_knowledge: Dict = field(default_factory=dict)
+    company_profiles: Dict[str, Dict] = field(default_factory=dict)
+    registry: ObligationRegistry = field(default_factory=lambda: ObligationRegistry([]))
+    # Version of the files each tenant's analyses are made from, by tenant ID
+    tenant_versions: Dict[str, str] = field(default_factory=dict)
+
+    def tenant_version(self, tenant_id: str) -> str:
+        """
+        Get the knowledge version a tenant's analyses depend on.
+
+        Analyses are made from the compliance knowledge and the tenant's
+        profile only, so editing another tenant's profile or a framework
+        file leaves the tenant's version, and its cached analyses, as is.
+        """
+        return self.tenant_versions.get(tenant_id, self.version)
+
+
+def compute_knowledge_version(*contents: bytes) -> str:
+    """
+    Compute a short content hash identifying a knowledge base version.
+    
+    Args:
+        contents: Raw bytes of each knowledge file, in a fixed order
+        
+    Returns:
+        12-character hex version hash
+    """
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()[:12]
+
+
+def _read_bytes(file_path: Path) -> bytes:
+    """Read a file's raw bytes, returning empty bytes if it is missing."""
+    try:
+        return file_path.read_bytes()
+    except OSError:
+        return b""
+
+
+def _parse_knowledge_file(file_path: Path, content: bytes) -> Dict:
+    """Parse a knowledge file read by _read_bytes; it must hold a JSON object."""
+    if not content:
+        raise ValueError(f"{file_path.name} is missing or empty")
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"{file_path.name} is not valid JSON ({e})") from e
+    if not isinstance(data, dict):
+        raise ValueError(f"{file_path.name} does not hold a JSON object")
+    return data
+
+
+def get_tenant_profile_files() -> List[Path]:
+    """List the tenant profile files in a stable order."""
+    if not COMPANY_PROFILES_DIR.is_dir():
+        return []
+    return sorted(COMPANY_PROFILES_DIR.glob("*.json"))
+
+
+def get_framework_files() -> List[Path]:
+    """List the additional framework files in a stable order."""
+    if not FRAMEWORKS_DIR.is_dir():
+        return []
+    return sorted(FRAMEWORKS_DIR.glob("*.json"))
+
+
+def build_knowledge_snapshot() -> Optional[KnowledgeSnapshot]:
+    """
+    Load the knowledge files and build a pre-indexed snapshot.
+    
+    Returns:
+        New snapshot, or None if any file is missing or invalid
+    """
+    profile_bytes = _read_bytes(COMPANY_PROFILE_FILE)
+    knowledge_bytes = _read_bytes(COMPLIANCE_KNOWLEDGE_FILE)
+    tenant_files = get_tenant_profile_files()
+    tenant_bytes = [_read_bytes(file_path) for file_path in tenant_files]
+    framework_files = get_framework_files()
+    framework_bytes = [_read_bytes(file_path) for file_path in framework_files]
+    
+    try:
+        company_profile = _parse_knowledge_file(COMPANY_PROFILE_FILE, profile_bytes)
+        compliance_knowledge = _parse_knowledge_file(COMPLIANCE_KNOWLEDGE_FILE, knowledge_bytes)
+        
+        # The default tenant comes first, then one tenant per profile file
+        company_profiles = {DEFAULT_TENANT: company_profile}
+        tenant_versions = {DEFAULT_TENANT: compute_knowledge_version(knowledge_bytes, profile_bytes)}
+        for file_path, content in zip(tenant_files, tenant_bytes):
+            company_profiles[file_path.stem] = _parse_knowledge_file(file_path, content)
+            tenant_versions[file_path.stem] = compute_knowledge_version(knowledge_bytes, content)
+        
+        # The main compliance knowledge is the first framework
+        frameworks = [{"framework_id": "DPDP", **compliance_knowledge}]
+        for file_path, content in zip(framework_files, framework_bytes):
+            framework = _parse_knowledge_file(file_path, content)
+            framework.setdefault("framework_id", file_path.stem.upper())
+            frameworks.append(framework)
+    except ValueError as e:
+        print(f"❌ Error: Invalid knowledge base files: {e}")
+        return None
+    
+    # File names are part of the version so adding a tenant or framework changes it
+    file_names = "\n".join(file_path.name for file_path in tenant_files + framework_files).encode()
+    
+    return KnowledgeSnapshot(
+        version=compute_knowledge_version(
+            profile_bytes, knowledge_bytes, file_names, *tenant_bytes, *framework_bytes
+        ),
+        loaded_at=datetime.now().isoformat(),
+        company_profile=company_profile,
+        compliance_knowledge=compliance_knowledge,
+        company_profiles=company_profiles,
+        registry=ObligationRegistry(frameworks),
+        tenant_versions=tenant_versions,
+    )
+
+
+# Current snapshot; replaced atomically on reload
+_EMPTY_SNAPSHOT = KnowledgeSnapshot(version="empty", loaded_at="")
+_snapshot: KnowledgeSnapshot = _EMPTY_SNAPSHOT
+_reload_lock = threading.Lock()
+_watcher_thread: Optional[threading.Thread] = None
 
 
 def initialize_knowledge_base() -> tuple[Dict, Dict]:
@@ -132,32 +292,122 @@ def initialize_knowledge_base() -> tuple[Dict, Dict]:
     Returns:
         Tuple of (company_profile, compliance_knowledge)
     """
-    global _company_profile_cache, _compliance_knowledge_cache
-    
     print("📚 Loading knowledge base...")
     
-    # Load company profile
-    _company_profile_cache = load_company_profile()
-    if _company_profile_cache:
-        company_name = _company_profile_cache.get("company_name", "Unknown")
+    snapshot, _ = reload_knowledge_base()
+    
+    if snapshot.company_profile:
+        company_name = snapshot.company_profile.get("company_name", "Unknown")
         print(f"✓ Company profile loaded successfully: {company_name}")
+    else:
+        print("⚠️  Warning: Company profile not loaded, using empty profile")
     
-    # Load compliance knowledge
-    _compliance_knowledge_cache = load_compliance_knowledge()
-    if _compliance_knowledge_cache:
-        obligations = get_obligations(_compliance_knowledge_cache)
-        framework = _compliance_knowledge_cache.get("framework", "Unknown")
+    if len(snapshot.company_profiles) > 1:
+        print(f"✓ Loaded {len(snapshot.company_profiles)} tenant profiles")
+    
+    if snapshot.compliance_knowledge:
+        framework = snapshot.compliance_knowledge.get("framework", "Unknown")
         print(f"✓ Compliance knowledge loaded successfully: {framework}")
-        print(f"✓ Loaded {len(obligations)} obligations")
+        print(f"✓ Loaded {len(snapshot.registry)} obligations from {len(snapshot.registry.frameworks)} frameworks")
+    else:
+        print("⚠️  Warning: Compliance knowledge not loaded, using empty knowledge base")
     
-    return _company_profile_cache, _compliance_knowledge_cache
+    return snapshot.company_profile, snapshot.compliance_knowledge
+
+
+def reload_knowledge_base() -> Tuple[KnowledgeSnapshot, bool]:
+    """
+    Reload the knowledge files and swap in a new snapshot if they changed.
+    
+    The previous snapshot is kept if the files cannot be parsed, so a
+    half-saved edit never empties the knowledge base.
+    
+    Returns:
+        Tuple of (current snapshot, whether a new version was installed)
+    """
+    global _snapshot
+    
+    with _reload_lock:
+        snapshot = build_knowledge_snapshot()
+        
+        if snapshot is None:
+            print("⚠️  Warning: Keeping knowledge base version " + _snapshot.version)
+            return _snapshot, False
+        
+        if snapshot.version == _snapshot.version:
+            return _snapshot, False
+        
+        _snapshot = snapshot
+        print(f"✓ Knowledge base version {snapshot.version} installed")
+        return snapshot, True
+
+
+def _knowledge_files_signature() -> Tuple:
+    """Names, modification times and sizes of the knowledge files."""
+    signature = []
+    files = (COMPANY_PROFILE_FILE, COMPLIANCE_KNOWLEDGE_FILE, *get_tenant_profile_files(), *get_framework_files())
+    for file_path in files:
+        try:
+            stat = file_path.stat()
+            signature.append((file_path.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def start_knowledge_watcher(interval: float) -> None:
+    """
+    Start a background thread that reloads the knowledge base on file changes.
+    
+    Args:
+        interval: Polling interval in seconds; 0 disables watching
+    """
+    global _watcher_thread
+    
+    if interval <= 0 or (_watcher_thread and _watcher_thread.is_alive()):
+        return
+    
+    def watch():
+        last_signature = _knowledge_files_signature()
+        while True:
+            time.sleep(interval)
+            signature = _knowledge_files_signature()
+            if signature != last_signature:
+                last_signature = signature
+                try:
+                    reload_knowledge_base()
+                except Exception as e:
+                    print(f"⚠️  Error reloading knowledge base: {e}")
+    
+    _watcher_thread = threading.Thread(target=watch, name="knowledge-watcher", daemon=True)
+    _watcher_thread.start()
+
+
+def get_knowledge_snapshot() -> KnowledgeSnapshot:
+    """Get the current knowledge snapshot."""
+    return _snapshot
+
+
+def get_knowledge_version() -> str:
+    """Get the version hash of the current knowledge snapshot."""
+    return _snapshot.version
+
+
+def get_tenant_knowledge_version(tenant_id: str) -> str:
+    """Get the version of the current knowledge a tenant's analyses depend on."""
+    return _snapshot.tenant_version(tenant_id)
 
 
 def get_cached_company_profile() -> Dict:
     """Get the cached company profile."""
-    return _company_profile_cache or {}
+    return _snapshot.company_profile or {}
+
+
+def get_tenant_profile(tenant_id: str) -> Optional[Dict]:
+    """Get the company profile of a tenant."""
+    return _snapshot.company_profiles.get(tenant_id)
 
 
 def get_cached_compliance_knowledge() -> Dict:
     """Get the cached compliance knowledge."""
-    return _compliance_knowledge_cache or {}
+    return _snapshot.compliance_knowledge or {}
@@ -0,0 +1,347 @@
+"""
+Token accounting and budgets for Gemini calls.
+
+Every Gemini call is accounted for: the prompt and output tokens it used
+are added to per-minute buckets by source and tenant (the tokens of a
+multi-profile call are split between its tenants), which each worker
+writes to the `llm_usage` table shared by every API and analysis worker.
+
+Before a call, the tokens it will use (its prompt, plus
+LLM_OUTPUT_TOKEN_ESTIMATE output tokens per tenant) must fit the rolling
+budgets of LLM_TOKENS_PER_MINUTE and LLM_TOKENS_PER_DAY, counted across
+all workers. A call that doesn't fit raises BudgetExceeded with the
+seconds until it would, and callers degrade instead of calling Gemini:
+- analysis workers put the job back in the queue without using one of
+  its attempts, and stop claiming jobs until then;
+- the API answers 429 with the local pre-classification of the change.
+
+Each worker keeps the usage of the last day in memory, plus its own new
+usage and the calls it is running, and exchanges it with the table every
+LLM_USAGE_SYNC_INTERVAL seconds; other workers' calls count against the
+budget after at most that long. The per-minute window slides: the
+previous minute counts for the part of it still within the last 60
+seconds.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import time
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.config import (
+    LLM_TOKENS_PER_MINUTE, LLM_TOKENS_PER_DAY, LLM_OUTPUT_TOKEN_ESTIMATE, LLM_USAGE_SYNC_INTERVAL,
+    LLM_USAGE_RETENTION_DAYS
+)
+from app.db import engine
+from app.events import WORKER_ID
+from app.metrics import gauge_lines, llm_budget_rejections, register_collector
+from app.models import LlmUsage
+
+# Source recorded for analyses of free text (/api/analyze-update)
+AD_HOC_SOURCE = "ad-hoc"
+
+# Syncs between deletions of usage older than LLM_USAGE_RETENTION_DAYS
+PRUNE_EVERY = 300
+
+MINUTE = timedelta(minutes=1)
+DAY = timedelta(days=1)
+
+# Tenant calls, Gemini calls, prompt tokens and output tokens by (minute, source, tenant)
+UsageBuckets = Dict[Tuple[datetime, str, str], List[int]]
+
+_sync_task: Optional[asyncio.Task] = None
+
+
+class BudgetExceeded(Exception):
+    """A Gemini call doesn't fit a token budget."""
+
+    def __init__(self, window: str, retry_after: float):
+        super().__init__(f"Gemini token budget per {window} exceeded; retry in {retry_after:.0f}s")
+        self.window = window
+        self.retry_after = retry_after
+
+
+def estimate_tokens(prompt: str, tenants: int = 1) -> int:
+    """Tokens a call will use: roughly four characters per prompt token, plus its expected output."""
+    return len(prompt) // 4 + LLM_OUTPUT_TOKEN_ESTIMATE * max(1, tenants)
+
+
+def _minute(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+def _add_usage(buckets: UsageBuckets, key: Tuple[datetime, str, str], usage: List[int]) -> None:
+    total = buckets.setdefault(key, [0] * len(usage))
+    for index, value in enumerate(usage):
+        total[index] += value
+
+
+class TokenBudget:
+    """Rolling per-minute and per-day token budgets (0 = unlimited), shared through the llm_usage table."""
+
+    def __init__(self, per_minute: int = LLM_TOKENS_PER_MINUTE, per_day: int = LLM_TOKENS_PER_DAY):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        # Tokens by minute of the last day, as last read from the table
+        self._shared: Dict[datetime, int] = {}
+        # This worker's usage not yet in _shared: not written yet, and being written
+        self._unsynced: UsageBuckets = {}
+        self._syncing: UsageBuckets = {}
+        # Estimated tokens of the calls this worker is running
+        self._reserved = 0
+        self._blocked_until = 0.0
+        self._synced_at: Optional[datetime] = None
+
+    def _tokens_by_minute(self) -> Dict[datetime, int]:
+        tokens = dict(self._shared)
+        for buckets in (self._unsynced, self._syncing):
+            for (minute, _, _), (_, _, prompt_tokens, output_tokens) in buckets.items():
+                tokens[minute] = tokens.get(minute, 0) + prompt_tokens + output_tokens
+        return tokens
+
+    def _usage(self, now: datetime) -> Tuple[float, int, Dict[datetime, int]]:
+        """Tokens used in the rolling minute and day, counting the calls running."""
+        tokens = self._tokens_by_minute()
+        minute = _minute(now)
+        elapsed = (now - minute).total_seconds() / 60
+        used_minute = tokens.get(minute, 0) + tokens.get(minute - MINUTE, 0) * (1 - elapsed) + self._reserved
+        used_day = sum(count for start, count in tokens.items() if start > now - DAY) + self._reserved
+        return used_minute, used_day, tokens
+
+    def _minute_wait(self, tokens: Dict[datetime, int], now: datetime, needed: int) -> float:
+        """Seconds until `needed` tokens fit the per-minute budget."""
+        minute = _minute(now)
+        elapsed = (now - minute).total_seconds() / 60
+        current = tokens.get(minute, 0) + self._reserved
+        previous = tokens.get(minute - MINUTE, 0)
+        available = self.per_minute - needed
+        if current + previous * (1 - elapsed) <= available:
+            return 0.0
+        if current <= available:
+            # Fits once enough of the previous minute has slid out of the window
+            return (1 - (available - current) / previous - elapsed) * 60
+        # The current minute has to slide out as well
+        return (1 - elapsed) * 60 + (1 - available / current) * 60
+
+    def _day_wait(self, tokens: Dict[datetime, int], now: datetime, used: int, needed: int) -> float:
+        """Seconds until `needed` tokens fit the per-day budget."""
+        excess = used + needed - self.per_day
+        if excess <= 0:
+            return 0.0
+        freed = 0
+        for start in sorted(start for start in tokens if start > now - DAY):
+            freed += tokens[start]
+            if freed >= excess:
+                return (start + DAY - now).total_seconds()
+        # Only the calls running are in the way
+        return 60.0
+
+    def check(self, tokens: int) -> None:
+        """
+        Raise BudgetExceeded if a call using `tokens` doesn't fit a budget.
+
+        A call larger than a whole budget runs once that window is empty.
+        """
+        if not self.per_minute and not self.per_day:
+            return
+        now = datetime.utcnow()
+        _, used_day, by_minute = self._usage(now)
+        waits = {}
+        if self.per_minute:
+            waits["minute"] = self._minute_wait(by_minute, now, min(tokens, self.per_minute))
+        if self.per_day:
+            waits["day"] = self._day_wait(by_minute, now, used_day, min(tokens, self.per_day))
+        window = max(waits, key=waits.get)
+        if waits[window] > 0:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + waits[window])
+            llm_budget_rejections.inc(window=window)
+            raise BudgetExceeded(window, waits[window])
+
+    @contextmanager
+    def reserve(self, tokens: int):
+        """Hold `tokens` of the budget while a call runs; raises BudgetExceeded if they don't fit."""
+        self.check(tokens)
+        self._reserved += tokens
+        try:
+            yield
+        finally:
+            self._reserved -= tokens
+
+    def record(self, prompt_tokens: int, output_tokens: int, source: str, tenant_ids: Iterable[str]) -> None:
+        """
+        Account for a call: one call for its source, and its tokens split
+        evenly between the tenants it analyzed.
+        """
+        minute = _minute(datetime.utcnow())
+        tenant_ids = list(tenant_ids)
+        count = len(tenant_ids)
+        for index, tenant_id in enumerate(tenant_ids):
+            # The first tenant takes the remainder, so the shares add up, and the request
+            extra = 0 if index else 1
+            _add_usage(self._unsynced, (minute, source or "unknown", tenant_id), [
+                1,
+                extra,
+                prompt_tokens // count + extra * (prompt_tokens % count),
+                output_tokens // count + extra * (output_tokens % count),
+            ])
+
+    def retry_after(self) -> float:
+        """Seconds until the call last refused by the budget would fit (0 if none is waiting)."""
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    async def sync(self) -> None:
+        """Write this worker's new usage to the table and read every worker's usage of the last day."""
+        now = datetime.utcnow()
+        self._syncing, self._unsynced = self._unsynced, {}
+        try:
+            table = LlmUsage.__table__
+            async with engine.begin() as connection:
+                if self._syncing:
+                    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+                    statement = dialect.insert(table)
+                    statement = statement.on_conflict_do_update(
+                        index_elements=["minute", "source", "tenant_id"],
+                        set_={
+                            "calls": table.c.calls + statement.excluded.calls,
+                            "requests": table.c.requests + statement.excluded.requests,
+                            "prompt_tokens": table.c.prompt_tokens + statement.excluded.prompt_tokens,
+                            "output_tokens": table.c.output_tokens + statement.excluded.output_tokens,
+                        },
+                    )
+                    # In key order, so workers writing the same buckets can't deadlock
+                    await connection.execute(statement, [
+                        {"minute": minute, "source": source, "tenant_id": tenant_id, "calls": calls,
+                         "requests": requests, "prompt_tokens": prompt_tokens, "output_tokens": output_tokens}
+                        for (minute, source, tenant_id), (calls, requests, prompt_tokens, output_tokens)
+                        in sorted(self._syncing.items())
+                    ])
+                rows = (await connection.execute(
+                    select(table.c.minute, func.sum(table.c.prompt_tokens + table.c.output_tokens))
+                    .where(table.c.minute > _minute(now) - DAY).group_by(table.c.minute)
+                )).all()
+        except Exception:
+            for key, usage in self._syncing.items():
+                _add_usage(self._unsynced, key, usage)
+            self._syncing = {}
+            raise
+        self._shared = {minute: int(tokens) for minute, tokens in rows}
+        self._syncing = {}
+        self._synced_at = now
+
+    async def prune(self, retention_days: int = LLM_USAGE_RETENTION_DAYS) -> int:
+        """Delete usage older than `retention_days`."""
+        table = LlmUsage.__table__
+        async with engine.begin() as connection:
+            result = await connection.execute(
+                delete(table).where(table.c.minute < datetime.utcnow() - timedelta(days=retention_days))
+            )
+        return result.rowcount
+
+    def status(self) -> Dict:
+        """Budgets, tokens used in each window (by every worker, as of the last sync) and what is left."""
+        now = datetime.utcnow()
+        used_minute, used_day, _ = self._usage(now)
+        used = {"minute": round(used_minute), "day": used_day}
+        limits = {"minute": self.per_minute or None, "day": self.per_day or None}
+        return {
+            "limits": limits,
+            "used": used,
+            "remaining": {window: max(0, limit - used[window]) if limit else None for window, limit in limits.items()},
+            "reserved": self._reserved,
+            "retry_after": round(self.retry_after(), 3),
+            "worker_id": WORKER_ID,
+            "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+        }
+
+    async def get_usage(self, hours: float = 24) -> Dict:
+        """
+        Calls and tokens of the last `hours` by source and by tenant.
+
+        Source call counts are Gemini calls; a multi-profile call counts as
+        a call for each of its tenants in the tenant counts.
+        """
+        since = _minute(datetime.utcnow() - timedelta(hours=hours))
+        table = LlmUsage.__table__
+        totals = {"source": {}, "tenant_id": {}}
+        calls = {"source": table.c.requests, "tenant_id": table.c.calls}
+        async with engine.connect() as connection:
+            for column in totals:
+                rows = (await connection.execute(
+                    select(table.c[column], func.sum(calls[column]), func.sum(table.c.prompt_tokens),
+                           func.sum(table.c.output_tokens))
+                    .where(table.c.minute >= since).group_by(table.c[column])
+                )).all()
+                for key, *usage in rows:
+                    _add_usage(totals[column], key, [int(value) for value in usage])
+
+        # This worker's usage that isn't in the table yet
+        for buckets in (self._unsynced, self._syncing):
+            for (minute, source, tenant_id), (calls, requests, prompt_tokens, output_tokens) in buckets.items():
+                if minute >= since:
+                    _add_usage(totals["source"], source, [requests, prompt_tokens, output_tokens])
+                    _add_usage(totals["tenant_id"], tenant_id, [calls, prompt_tokens, output_tokens])
+
+        def report(usage: Dict[str, List[int]]) -> Dict[str, Dict[str, int]]:
+            return {
+                key: {"calls": calls, "prompt_tokens": prompt_tokens, "output_tokens": output_tokens}
+                for key, (calls, prompt_tokens, output_tokens)
+                in sorted(usage.items(), key=lambda item: -(item[1][1] + item[1][2]))
+            }
+
+        return {"hours": hours, "by_source": report(totals["source"]), "by_tenant": report(totals["tenant_id"])}
+
+
+llm_budget = TokenBudget()
+
+
+async def run_usage_sync_loop(interval: float = LLM_USAGE_SYNC_INTERVAL) -> None:
+    """Exchange token usage with the other workers every `interval` seconds, until cancelled."""
+    syncs = 0
+    while True:
+        try:
+            await llm_budget.sync()
+            syncs += 1
+            if syncs % PRUNE_EVERY == 0:
+                await llm_budget.prune()
+        except Exception as e:
+            print(f"⚠️  Error syncing token usage: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_usage_sync() -> None:
+    global _sync_task
+
+    if _sync_task is None:
+        _sync_task = asyncio.create_task(run_usage_sync_loop())
+
+
+async def stop_usage_sync() -> None:
+    """Stop the sync loop and write the usage recorded since the last sync."""
+    global _sync_task
+
+    if _sync_task is not None:
+        _sync_task.cancel()
+        # Let a sync in progress stop before the final one
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+    try:
+        await llm_budget.sync()
+    except Exception as e:
+        print(f"⚠️  Could not write token usage: {e}")
+
+
+register_collector(lambda: gauge_lines(
+    "llm_tokens_used", "Gemini tokens used in the rolling window by every worker, as of the last sync",
+    {(("window", window),): used for window, used in llm_budget.status()["used"].items()}
+))
+register_collector(lambda: gauge_lines(
+    "llm_token_budget", "Gemini token budget per rolling window (0 = unlimited)",
+    {(("window", "minute"),): llm_budget.per_minute, (("window", "day"),): llm_budget.per_day}
+))
@@ -0,0 +1,217 @@
+"""
+Load test the API against local stand-ins for MeitY and Gemini.
+
+Drives /api/changes, /api/stats, /api/changes/{id}/analysis and
+/api/analyze-update concurrently for a fixed duration, and reports
+throughput and p50/p95/p99 latency per endpoint.
+
+With --spawn, starts app.mock_meity and an API worker wired to it (with
+GEMINI_BACKEND=fake, a throwaway SQLite database and analysis cache), so
+nothing reaches meity.gov.in or the Gemini API:
+    python -m app.loadtest --spawn --concurrency 20 --duration 30 --gemini-delay 0.5
+
+Without --spawn, targets an API that is already running:
+    python -m app.loadtest --target http://localhost:8000 --mix changes=4,stats=2,analysis=3,analyze_update=1
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+DEFAULT_MIX = {"changes": 4, "stats": 2, "analysis": 3, "analyze_update": 1}
+
+UPDATE_TEXTS = [
+    "Organizations must notify the Data Protection Board within 72 hours of a personal data breach.",
+    "Consent managers must register with the Board and maintain consent records for seven years.",
+    "Data fiduciaries must erase personal data once the specified purpose is no longer served.",
+    "Cross-border transfers of personal data are restricted to notified countries.",
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parse a scenario mix like "changes=4,stats=2"."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario '{name}', expected one of: {', '.join(DEFAULT_MIX)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+class LoadTest:
+    """Runs the scenario mix from concurrent workers and collects latencies."""
+
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, int], change_ids: List[str]):
+        self.client = client
+        self.scenarios = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.scenarios]
+        self.change_ids = change_ids or ["demo-001"]
+        self.latencies: Dict[str, List[float]] = {name: [] for name in self.scenarios}
+        self.errors: Dict[str, int] = {name: 0 for name in self.scenarios}
+
+    async def request(self, scenario: str, rng: random.Random) -> httpx.Response:
+        if scenario == "changes":
+            return await self.client.get("/api/changes", params={"limit": 10, "view": "compact"})
+        if scenario == "stats":
+            return await self.client.get("/api/stats")
+        if scenario == "analysis":
+            return await self.client.get(f"/api/changes/{rng.choice(self.change_ids)}/analysis")
+        return await self.client.post("/api/analyze-update", json={"update_text": rng.choice(UPDATE_TEXTS)})
+
+    async def worker(self, seed: int, deadline: float) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(self.scenarios, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await self.request(scenario, rng)
+                # A change without an analysis (e.g. low risk) is a valid answer
+                failed = response.status_code >= 500 or (response.status_code >= 400 and scenario != "analysis")
+            except httpx.HTTPError:
+                failed = True
+            self.latencies[scenario].append(time.perf_counter() - started)
+            if failed:
+                self.errors[scenario] += 1
+
+    async def run(self, concurrency: int, duration: float) -> Dict:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(self.worker(seed, deadline) for seed in range(concurrency)))
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict:
+        def summarize(latencies: List[float], errors: int) -> Dict:
+            ordered = sorted(latencies)
+            return {
+                "requests": len(ordered),
+                "errors": errors,
+                "rps": round(len(ordered) / elapsed, 1) if elapsed else 0,
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+            }
+
+        endpoints = {name: summarize(self.latencies[name], self.errors[name]) for name in self.scenarios}
+        all_latencies = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            "seconds": round(elapsed, 1),
+            "total": summarize(all_latencies, sum(self.errors.values())),
+            "endpoints": endpoints,
+        }
+
+
+async def wait_until_ready(url: str, timeout: float = 60) -> None:
+    """Poll a URL until it answers 200."""
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def spawn_stack(args, workdir: str) -> List[subprocess.Popen]:
+    """Start the mock MeitY API and an API worker using it."""
+    mock = subprocess.Popen([
+        sys.executable, "-m", "app.mock_meity", "--port", str(args.mock_port),
+        "--latency", str(args.mock_latency), "--jitter", str(args.mock_jitter),
+        "--pages", str(args.mock_pages), "--error-rate", str(args.mock_error_rate),
+    ])
+    env = dict(
+        os.environ,
+        MEITY_API_URL=f"http://127.0.0.1:{args.mock_port}/cms/wp-json/document/documents",
+        GEMINI_BACKEND="fake",
+        FAKE_GEMINI_DELAY=str(args.gemini_delay),
+        DATABASE_URL=args.database_url or f"sqlite+aiosqlite:///{workdir}/loadtest.db",
+        ANALYSIS_CACHE_PATH=os.path.join(workdir, "analysis_cache.json"),
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port), "--log-level", "warning"],
+        env=env,
+    )
+    return [mock, api]
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'endpoint':<16}{'requests':>10}{'errors':>8}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, stats in rows:
+        print(f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"\n{report['total']['requests']} requests in {report['seconds']}s")
+
+
+async def run(args, target: str) -> Dict:
+    async with httpx.AsyncClient(base_url=target, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        feed = (await client.get("/api/changes", params={"limit": 50, "fields": "id"})).json()
+        change_ids = [change["id"] for change in feed.get("changes", [])]
+        return await LoadTest(client, parse_mix(args.mix), change_ids).run(args.concurrency, args.duration)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test the API")
+    parser.add_argument("--target", default="http://localhost:8000", help="API base URL (ignored with --spawn)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="Test duration (seconds)")
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout (seconds)")
+    parser.add_argument("--mix", default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+                        help="Scenario weights")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--spawn", action="store_true", help="Start the mock MeitY API and an API worker")
+    parser.add_argument("--api-port", type=int, default=8100)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--mock-latency", type=float, default=0.1, help="Mock MeitY mean latency (seconds)")
+    parser.add_argument("--mock-jitter", type=float, default=0.05, help="Mock MeitY latency jitter (seconds)")
+    parser.add_argument("--mock-pages", type=int, default=20, help="Mock MeitY pages of press releases")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="Mock MeitY error fraction")
+    parser.add_argument("--gemini-delay", type=float, default=0.5, help="Fake Gemini response delay (seconds)")
+    parser.add_argument("--database-url", default="", help="Database for the spawned API (default: temporary SQLite)")
+    args = parser.parse_args(argv)
+
+    if not args.spawn:
+        report = asyncio.run(run(args, args.target))
+    else:
+        with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+            processes = spawn_stack(args, workdir)
+            try:
+                target = f"http://127.0.0.1:{args.api_port}"
+                asyncio.run(wait_until_ready(f"{target}/health/ready"))
+                report = asyncio.run(run(args, target))
+            finally:
+                for process in processes:
+                    process.terminate()
+                for process in processes:
+                    process.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,63 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from datetime import datetime
-from app.db import test_db_connection
+from typing import Optional, Set
+import asyncio
+import math
+import secrets
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.startup import startup_phase, mark_ready, is_ready, get_uptime, get_startup_report
+from app.db import (
+    get_db, create_local_schema, refresh_health_status, run_health_check_loop, get_health_status,
+    get_pool_stats
+)
 from app.meity_service import get_all_changes, get_change_by_id, get_stats
-from app.knowledge import initialize_knowledge_base, get_cached_company_profile, get_cached_compliance_knowledge
-from app.rag_agent import retrieve_relevant_obligation, construct_prompt, call_gemini_api
-from app.auto_analyzer import get_analysis_for_change, get_cache_stats, clear_cache
+from app.config import (
+    KNOWLEDGE_WATCH_INTERVAL, INGEST_POLL_INTERVAL, HEALTH_CHECK_INTERVAL, ANALYSIS_CONCURRENCY, GEMINI_PREWARM,
+    GEMINI_BACKEND, ADMIN_TOKEN, LOOP_LAG_THRESHOLD_MS, ANALYSIS_MODE
+)
+from app.fetch import close_client
+from app.ingestion import run_ingestion_loop
+from app.search import search_changes
+from app.knowledge import (
+    initialize_knowledge_base, get_cached_company_profile, get_cached_compliance_knowledge,
+    get_knowledge_snapshot, reload_knowledge_base, start_knowledge_watcher, get_tenant_profile,
+    DEFAULT_TENANT
+)
+from app.rag_agent import retrieve_relevant_obligation, construct_prompt, call_gemini_api_async, get_genai
+from app.auto_analyzer import (
+    get_analysis_for_change, get_cached_analysis, get_cached_entries, get_cache_stats, clear_cache, load_cache_async,
+    flush_cache, enqueue_analyses, pre_classify_async
+)
+from app.pre_classifier import get_pre_classifier_stats
+from app.response_cache import ResponseCacheMiddleware, response_cache
+from app.responses import FastJSONResponse, FastJSONRoute, CompressionMiddleware
+from app.projection import parse_fields, project_change, project_changes
+from app.feed import list_changes, get_change as get_stored_change, get_change_stats
+from app.metrics import MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics, analysis_queue_depth
+from app.tracing import span
+from app.profiling import (
+    profiler, LoopLagMonitor, take_memory_snapshot, diff_memory_snapshot, stop_memory_tracing
+)
+from app.history import add_history_entry, get_history
+from app.events import start_event_loop, stop_event_loop, get_event_stats, publish, register_handler
+from app.jobs import QUEUED, RUNNING, SKIPPED, get_job, get_job_stats, retry_dead_jobs
+from app.llm_budget import BudgetExceeded, llm_budget, start_usage_sync, stop_usage_sync
 
-app = FastAPI(title="Compliance Monitoring API")
+app = FastAPI(title="Compliance Monitoring API", default_response_class=FastJSONResponse)
+app.router.route_class = FastJSONRoute
 
-# Global variables for knowledge base
-company_profile = {}
-compliance_knowledge = {}
+loop_monitor = LoopLagMonitor(LOOP_LAG_THRESHOLD_MS / 1000) if LOOP_LAG_THRESHOLD_MS > 0 else None
 
-# Analysis history (in-memory for now)
-analysis_history = []
+# Background tasks; the event loop only keeps weak references, so they are held here until done
+_background_tasks: Set[asyncio.Task] = set()
+
+# Innermost first: bodies are compressed once and cached compressed, and
+# 304s and cached bodies still get CORS headers
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ResponseCacheMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,92 +67,376 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so request latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Pydantic models for RAG agent
 class AnalyzeRequest(BaseModel):
     update_text: str
 
-@app.on_event("startup")
-async def startup():
-    global company_profile, compliance_knowledge
+async def over_budget_response(retry_after: float, change: dict, **fields) -> FastJSONResponse:
+    """429 for an analysis the token budget can't pay for yet, with the local pre-classification instead."""
+    return FastJSONResponse(
+        {"status": "over_budget", **fields, "retry_after": round(retry_after, 3),
+         "pre_classification": await pre_classify_async(change)},
+        status_code=429,
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+def run_in_background(coro) -> asyncio.Task:
+    """Run a coroutine as a task that isn't garbage collected before it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def attach_analyses(changes: list, tenant_id: str = DEFAULT_TENANT, auto_analyze: bool = True):
+    """
+    Add the analysis of each change as `ai_analysis`.
     
-    # Load knowledge base
-    company_profile, compliance_knowledge = initialize_knowledge_base()
+    With auto_analyze, changes without a cached analysis are analyzed
+    concurrently, at most ANALYSIS_CONCURRENCY at a time. With
+    ANALYSIS_MODE=queue they are queued for the analysis workers instead,
+    and get their analysis on a later request.
+    """
+    semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+    queue = auto_analyze and ANALYSIS_MODE == "queue"
+    auto_analyze = auto_analyze and not queue
     
-    # Test database connection
-    try:
-        connected = await test_db_connection()
-        if connected:
-            print("✓ Database connection successful")
+    # Cached analyses for the whole page in one database read
+    cached = {} if auto_analyze else await get_cached_entries([change['id'] for change in changes], tenant_id)
+    if queue:
+        try:
+            await enqueue_analyses([change for change in changes if change['id'] not in cached])
+        except Exception as e:
+            print(f"⚠️  Error queueing analyses: {e}")
+    
+    async def attach(change: dict):
+        if auto_analyze:
+            waiting = True
+            analysis_queue_depth.inc(state="waiting")
+            try:
+                async with semaphore:
+                    analysis_queue_depth.dec(state="waiting")
+                    waiting = False
+                    with analysis_queue_depth.track(state="running"):
+                        analysis = await get_analysis_for_change(change, tenant_id)
+            except BudgetExceeded:
+                # Left out of this page; analyzed once the budget has room
+                analysis = None
+            finally:
+                if waiting:
+                    analysis_queue_depth.dec(state="waiting")
         else:
-            print("✗ Database connection failed")
+            entry = cached.get(change['id'])
+            analysis = entry.analysis.to_dict(entry.knowledge_version) if entry else None
+        if analysis:
+            change['ai_analysis'] = analysis
+    
+    await asyncio.gather(*(attach(change) for change in changes))
+
+async def background_startup():
+    """
+    Startup work that doesn't have to finish before the server accepts
+    connections. The worker reports ready once the required phases are done.
+    """
+    # Test database connection, then keep the health status fresh in the background
+    with startup_phase("database"):
+        status = await refresh_health_status()
+    if status["connected"]:
+        print("✓ Database connection successful")
+    else:
+        print(f"✗ Database connection failed: {status['error']}")
+    run_in_background(run_health_check_loop(HEALTH_CHECK_INTERVAL))
+    
+    # Create the local SQLite schema and start polling sources into the database
+    try:
+        with startup_phase("schema"):
+            await create_local_schema()
+        # The analysis cache's durable tier is in the database
+        with startup_phase("analysis_cache"):
+            await load_cache_async()
+        # Apply cache invalidations and reloads made by other workers
+        start_event_loop()
+        # Count Gemini tokens used by every worker against the budgets
+        start_usage_sync()
+        if INGEST_POLL_INTERVAL > 0:
+            run_in_background(run_ingestion_loop(INGEST_POLL_INTERVAL))
     except Exception as e:
-        print(f"✗ Database connection error: {e}")
+        print(f"✗ Ingestion setup error: {e}")
+    
+    mark_ready()
+    print(f"✓ Ready after {get_startup_report()['seconds_to_ready']}s")
+    
+    # Import the Gemini SDK now rather than on the first analysis
+    if GEMINI_PREWARM and GEMINI_BACKEND == "gemini":
+        try:
+            with startup_phase("gemini_sdk"):
+                await asyncio.to_thread(get_genai)
+        except Exception as e:
+            print(f"⚠️  Gemini SDK warm-up failed: {e}")
+
+@app.on_event("startup")
+async def startup():
+    # Must-have: the knowledge base every endpoint reads, then watch its files for edits
+    with startup_phase("knowledge"):
+        await asyncio.to_thread(initialize_knowledge_base)
+    start_knowledge_watcher(KNOWLEDGE_WATCH_INTERVAL)
+    if loop_monitor is not None:
+        loop_monitor.start()
+    
+    # Everything else runs after the server starts accepting connections
+    run_in_background(background_startup())
+
+@app.on_event("shutdown")
+async def shutdown():
+    if loop_monitor is not None:
+        loop_monitor.stop()
+    profiler.stop()
+    stop_event_loop()
+    await flush_cache()
+    await stop_usage_sync()
+    await close_client()
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Compliance Monitoring API", "version": "1.0.0"}
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive", "uptime": get_uptime()}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: startup finished and the database is reachable.
+    
+    Returns 503 until then, with the startup report showing what is pending.
+    """
+    report = get_startup_report()
+    connected = get_health_status()["connected"]
+    ready = is_ready() and connected
+    body = {"status": "ready" if ready else "not_ready", "database": "connected" if connected else "disconnected",
+            **report}
+    return FastJSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for the API, ingestion, analysis and caches."""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/startup-report")
+async def startup_report():
+    """Get the startup phase and import timings of this worker."""
+    return get_startup_report()
+
 @app.get("/health")
 async def health():
+    """
+    Health status for load balancer probes.
+    
+    Served from the status cached by the background health check, so
+    probes never open a database connection.
+    """
     try:
-        connected = await test_db_connection()
+        db_status = get_health_status()
+        connected = db_status["connected"]
+        snapshot = get_knowledge_snapshot()
         return {
             "status": "healthy" if connected else "unhealthy",
             "database": "connected" if connected else "disconnected",
+            "database_checked_at": db_status["checked_at"],
+            "pool": get_pool_stats(),
             "knowledge_base": {
-                "company_profile_loaded": bool(company_profile),
-                "compliance_knowledge_loaded": bool(compliance_knowledge),
-                "obligations_count": len(compliance_knowledge.get("obligations", []))
+                "company_profile_loaded": bool(snapshot.company_profile),
+                "compliance_knowledge_loaded": bool(snapshot.compliance_knowledge),
+                "obligations_count": len(snapshot.registry),
+                "frameworks_count": len(snapshot.registry.frameworks),
+                "version": snapshot.version
             }
         }
     except Exception as e:
         return {"status": "unhealthy", "database": "error", "error": str(e)}
 
+def get_projection(fields: Optional[str], view: str):
+    """Parse the fields/view parameters, rejecting unknown views."""
+    try:
+        return parse_fields(fields, view)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def load_changes_page(
+    session: AsyncSession,
+    page: int,
+    limit: int,
+    cursor: Optional[str],
+    direction: str,
+    risk_level: Optional[str] = None,
+    source: Optional[str] = None,
+    include_total: bool = False
+) -> dict:
+    """
+    Get a page of changes from the ingested changes table, or live from
+    MeitY until anything has been ingested or while the database is down.
+    """
+    limit = min(max(limit, 1), 100)
+    if cursor is not None and page != 1:
+        raise HTTPException(status_code=400, detail="Use either page or cursor, not both")
+    try:
+        result = await list_changes(
+            session, limit=limit, cursor=cursor, direction=direction,
+            risk_level=risk_level, source=source, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (SQLAlchemyError, OSError) as e:
+        # Cursors point into the database, so only the live feed can stand in
+        if cursor is not None:
+            raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+        print(f"⚠️  Database unavailable, fetching changes live: {e}")
+        result = await get_all_changes(page, limit)
+        result['changes'] = [
+            change for change in result['changes']
+            if (not risk_level or change.get('riskLevel', '').lower() == risk_level.lower())
+            and (not source or change.get('sourceId') == source)
+        ]
+    else:
+        if not result['changes'] and cursor is None and not (risk_level or source):
+            result = await get_all_changes(page, limit)
+    return result
+
 @app.get("/api/changes")
-def get_changes(page: int = 1, limit: int = 10, auto_analyze: bool = False):
+async def get_changes(
+    page: int = 1,
+    limit: int = 10,
+    auto_analyze: bool = False,
+    fields: Optional[str] = None,
+    view: str = "full",
+    cursor: Optional[str] = None,
+    direction: str = "next",
+    risk_level: Optional[str] = None,
+    source: Optional[str] = None,
+    include_total: bool = False,
+    session: AsyncSession = Depends(get_db)
+):
     """
-    Get all compliance changes from MeitY press releases.
+    Get compliance changes, newest first.
+    
+    Changes are served from the ingested changes table with keyset
+    pagination: pass a page's nextCursor (direction=next) or prevCursor
+    (direction=prev) to move through the feed. include_total=true adds a
+    total count, approximate on Postgres. Until anything has been ingested,
+    or while the database is unavailable, changes are fetched live from
+    MeitY press releases instead; `page` only applies to that live fetch
+    and can't be combined with a cursor.
     
     If auto_analyze=true, automatically analyzes high/critical risk items
     and includes cached analysis results.
+    
+    view=compact returns only what list views show (without content and
+    with just the analysis verdict); fields= selects exact fields, e.g.
+    "id,changeSummary,ai_analysis.risk_level". Full changes are available
+    from /api/changes/{id}.
     """
+    projection = get_projection(fields, view)
     try:
-        result = get_all_changes(page, limit)
+        result = await load_changes_page(
+            session, page, limit, cursor, direction, risk_level, source, include_total
+        )
         
         # If auto_analyze is enabled, add analysis to changes
         if auto_analyze:
-            for change in result['changes']:
-                analysis = get_analysis_for_change(change)
-                if analysis:
-                    change['ai_analysis'] = analysis
+            await attach_analyses(result['changes'])
         
+        result['changes'] = project_changes(result['changes'], projection)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def find_change(session: AsyncSession, change_id: str) -> Optional[dict]:
+    """Get a change from the ingested changes table, or live if it isn't there."""
+    try:
+        change = await get_stored_change(session, change_id)
+    except (SQLAlchemyError, OSError) as e:
+        print(f"⚠️  Database unavailable, fetching change live: {e}")
+        change = None
+    return change or await get_change_by_id(change_id)
+
 @app.get("/api/changes/{change_id}")
-def get_change(change_id: str):
-    """Get a specific change by ID."""
+async def get_change(
+    change_id: str,
+    include_analysis: bool = False,
+    tenant_id: str = DEFAULT_TENANT,
+    fields: Optional[str] = None,
+    session: AsyncSession = Depends(get_db)
+):
+    """
+    Get a specific change by ID.
+    
+    With include_analysis=true, the tenant's cached analysis is added as
+    `ai_analysis` (no new analysis is run; use /api/changes/{id}/analysis).
+    """
+    projection = get_projection(fields, "full")
     try:
-        change = get_change_by_id(change_id)
+        change = await find_change(session, change_id)
         if not change:
             raise HTTPException(status_code=404, detail="Change not found")
-        return change
+        
+        if include_analysis:
+            cached = await get_cached_analysis(change_id, tenant_id)
+            if cached:
+                change = {**change, 'ai_analysis': cached.get('analysis')}
+        
+        return project_change(change, projection)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/search")
+async def search(
+    q: str,
+    risk_level: Optional[str] = None,
+    source: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0,
+    session: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search over ingested changes and their analysis summaries.
+    
+    Results are ranked by relevance and include highlighted matches.
+    """
+    try:
+        return await search_changes(
+            session, q,
+            risk_level=risk_level, source=source,
+            date_from=date_from, date_to=date_to,
+            limit=min(max(limit, 1), 100), offset=max(offset, 0)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/stats")
-def get_dashboard_stats():
-    """Get dashboard statistics."""
+async def get_dashboard_stats(session: AsyncSession = Depends(get_db)):
+    """Get dashboard statistics, from the ingested changes once there are any."""
     try:
-        return get_stats()
+        try:
+            stats = await get_change_stats(session)
+        except (SQLAlchemyError, OSError) as e:
+            print(f"⚠️  Database unavailable, computing stats live: {e}")
+            stats = None
+        return stats or await get_stats()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sources")
-def get_sources():
+async def get_sources():
     """Get list of monitored sources."""
     return {
         "sources": [
@@ -127,70 +453,188 @@ def get_sources():
     }
 
 @app.get("/api/knowledge/company-profile")
-def get_company_profile():
+async def get_company_profile():
     """Get the company profile."""
     return get_cached_company_profile()
 
+@app.get("/api/tenants")
+async def get_tenants():
+    """Get the company profiles (tenants) changes are evaluated against."""
+    profiles = get_knowledge_snapshot().company_profiles
+    return {
+        "tenants": [
+            {
+                "id": tenant_id,
+                "company_name": profile.get("company_name", "Unknown"),
+                "industry": profile.get("industry"),
+                "sector": profile.get("sector")
+            }
+            for tenant_id, profile in profiles.items()
+        ],
+        "total": len(profiles)
+    }
+
+@app.get("/api/tenants/{tenant_id}/profile")
+async def get_tenant_company_profile(tenant_id: str):
+    """Get the company profile of a tenant."""
+    profile = get_tenant_profile(tenant_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return profile
+
+@app.get("/api/tenants/{tenant_id}/changes")
+async def get_tenant_changes(
+    tenant_id: str,
+    page: int = 1,
+    limit: int = 10,
+    auto_analyze: bool = False,
+    fields: Optional[str] = None,
+    view: str = "full",
+    cursor: Optional[str] = None,
+    direction: str = "next",
+    session: AsyncSession = Depends(get_db)
+):
+    """
+    Get compliance changes with the analyses for one tenant.
+    
+    Pages through the same feed as /api/changes (cursor/direction), with
+    the tenant's cached analyses joined in; with auto_analyze=true, changes
+    without one are evaluated for all tenants in a single pass. Supports
+    the same view/fields projection as /api/changes.
+    """
+    if not get_tenant_profile(tenant_id):
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    
+    projection = get_projection(fields, view)
+    try:
+        result = await load_changes_page(session, page, limit, cursor, direction)
+        await attach_analyses(result['changes'], tenant_id, auto_analyze)
+        result['changes'] = project_changes(result['changes'], projection)
+        
+        result['tenant_id'] = tenant_id
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/knowledge/compliance")
-def get_compliance():
+async def get_compliance():
     """Get compliance knowledge base."""
     return get_cached_compliance_knowledge()
 
+@app.get("/api/knowledge/frameworks")
+async def get_frameworks():
+    """Get the loaded compliance frameworks."""
+    frameworks = list(get_knowledge_snapshot().registry.frameworks.values())
+    return {"frameworks": frameworks, "total": len(frameworks)}
+
 @app.get("/api/knowledge/obligations")
-def get_obligations():
-    """Get all compliance obligations."""
-    knowledge = get_cached_compliance_knowledge()
+async def get_obligations(
+    framework: Optional[str] = None,
+    severity: Optional[str] = None,
+    category: Optional[str] = None,
+    section: Optional[str] = None
+):
+    """
+    Get compliance obligations, optionally filtered.
+    
+    Filters are served from indexes built when the knowledge base is loaded.
+    Without a framework filter, obligations of all frameworks are returned.
+    """
+    registry = get_knowledge_snapshot().registry
+    obligations = registry.query(framework=framework, severity=severity, category=category, section=section)
+    
+    if framework:
+        framework_info = registry.frameworks.get(framework.strip().lower())
+        framework_name = framework_info["name"] if framework_info else "Unknown"
+    else:
+        # Name the frameworks the obligations come from
+        framework_ids = {obligation["framework_id"] for obligation in obligations}
+        framework_name = ", ".join(
+            info["name"] for info in registry.frameworks.values() if info["id"] in framework_ids
+        ) or "Unknown"
+    
     return {
-        "framework": knowledge.get("framework", "Unknown"),
-        "obligations": knowledge.get("obligations", []),
-        "total": len(knowledge.get("obligations", []))
+        "framework": framework_name,
+        "obligations": obligations,
+        "total": len(obligations)
     }
 
 @app.get("/api/knowledge/obligations/{obligation_id}")
-def get_obligation(obligation_id: str):
+async def get_obligation(obligation_id: str):
     """Get a specific obligation by ID."""
-    knowledge = get_cached_compliance_knowledge()
-    obligations = knowledge.get("obligations", [])
+    obligation = get_knowledge_snapshot().registry.get(obligation_id)
+    if not obligation:
+        raise HTTPException(status_code=404, detail="Obligation not found")
     
-    for obligation in obligations:
-        if obligation.get("id") == obligation_id:
-            return obligation
+    return obligation
+
+@app.get("/api/knowledge/version")
+async def get_knowledge_version_info():
+    """Get the version of the currently loaded knowledge base."""
+    snapshot = get_knowledge_snapshot()
+    return {"version": snapshot.version, "loaded_at": snapshot.loaded_at, "tenant_versions": snapshot.tenant_versions}
+
+async def _on_knowledge_reloaded(event: dict):
+    """Another worker reloaded the knowledge base; reload it here too."""
+    await asyncio.to_thread(reload_knowledge_base)
+
+register_handler("knowledge_reloaded", _on_knowledge_reloaded)
+
+@app.post("/api/knowledge/reload")
+async def reload_knowledge():
+    """
+    Reload the knowledge base files and install a new snapshot if they changed.
     
-    raise HTTPException(status_code=404, detail="Obligation not found")
+    The other workers reload too.
+    """
+    try:
+        snapshot, changed = await asyncio.to_thread(reload_knowledge_base)
+        await publish("knowledge_reloaded", {"version": snapshot.version})
+        return {"version": snapshot.version, "loaded_at": snapshot.loaded_at, "changed": changed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/analyze-update")
-def analyze_update(request: AnalyzeRequest):
+async def analyze_update(request: AnalyzeRequest):
     """Analyze a regulatory update using RAG agent."""
     try:
-        # Get knowledge base
-        knowledge = get_cached_compliance_knowledge()
-        profile = get_cached_company_profile()
+        # Get knowledge base (one snapshot for the whole request)
+        snapshot = get_knowledge_snapshot()
+        knowledge = snapshot.compliance_knowledge
+        profile = snapshot.company_profile
         
         if not knowledge or not profile:
             raise HTTPException(status_code=500, detail="Knowledge base not loaded")
         
-        # Retrieve relevant obligation
-        obligation = retrieve_relevant_obligation(request.update_text, knowledge)
-        
-        # Construct prompt and call Gemini
-        prompt = construct_prompt(profile, request.update_text, obligation)
-        result = call_gemini_api(prompt)
-        
-        # Check for errors
-        if "error" in result:
-            raise HTTPException(status_code=500, detail=result["error"])
+        with span("analyze_update") as request_span:
+            # Retrieve relevant obligation
+            with span("retrieval"):
+                obligation = retrieve_relevant_obligation(request.update_text, knowledge)
+            
+            # Construct prompt and call Gemini
+            with span("prompt"):
+                prompt = construct_prompt(profile, request.update_text, obligation)
+            try:
+                result = await call_gemini_api_async(prompt)
+            except BudgetExceeded as e:
+                return await over_budget_response(e.retry_after, {"changeSummary": request.update_text})
+            
+            # Check for errors
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=result["error"])
         
-        # Add retrieved obligation to response
+        # Add retrieved obligation, knowledge version and stage timings to response
         result['retrieved_obligation'] = obligation
+        result['knowledge_version'] = snapshot.tenant_version(DEFAULT_TENANT)
+        result['timings_ms'] = {**request_span.timings(), "total": request_span.elapsed_ms()}
         
-        # Save to history
-        analysis_entry = {
-            "id": len(analysis_history) + 1,
-            "timestamp": datetime.now().isoformat(),
-            "update_text": request.update_text,
-            "result": result
-        }
-        analysis_history.append(analysis_entry)
+        # Save to history (shared by every worker)
+        try:
+            await add_history_entry(request.update_text, result)
+        except Exception as e:
+            print(f"⚠️  Could not save analysis to history: {e}")
         
         return result
     except HTTPException:
@@ -199,34 +643,175 @@ def analyze_update(request: AnalyzeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/analysis-history")
-def get_analysis_history():
-    """Get history of all analyses."""
-    return {"analyses": list(reversed(analysis_history))}  # Most recent first
+async def get_analysis_history(limit: int = 100):
+    """Get the history of analyses, most recent first."""
+    try:
+        return {"analyses": await get_history(max(1, min(limit, 1000)))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/cache-stats")
-def get_analysis_cache_stats():
-    """Get statistics about the analysis cache."""
-    return get_cache_stats()
+async def get_analysis_cache_stats():
+    """Get statistics about the analysis cache and the HTTP response cache."""
+    return {**await get_cache_stats(), "response_cache": response_cache.stats(), "events": get_event_stats()}
+
+@app.get("/api/pre-classifier/stats")
+async def get_pre_classifier_statistics():
+    """Get statistics about local pre-classification and LLM calls saved."""
+    return get_pre_classifier_stats()
 
 @app.post("/api/clear-cache")
-def clear_analysis_cache():
-    """Clear the analysis cache."""
+async def clear_analysis_cache(
+    stale_only: bool = False,
+    knowledge_version: Optional[str] = None,
+    change_id: Optional[str] = None,
+    obligation_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+):
+    """
+    Clear the analysis cache, in memory and in the database.
+    
+    Without parameters every analysis is removed. Otherwise only analyses
+    matching all of the given ones are: stale_only=true selects analyses
+    made with an older version of their tenant's knowledge, knowledge_version those made with
+    that version, change_id the analyses of one change, obligation_id those
+    that retrieved that obligation, and tenant_id one tenant's.
+    """
+    try:
+        removed = await clear_cache(
+            stale_only=stale_only, knowledge_version=knowledge_version, change_id=change_id,
+            obligation_id=obligation_id, tenant_id=tenant_id,
+        )
+        return {"message": "Cache cleared successfully", "removed": removed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/llm/budget")
+async def get_llm_budget(hours: float = 24):
+    """
+    Get the Gemini token budgets, tokens used by every worker in the rolling
+    minute and day, and the calls and tokens of the last `hours` by source
+    and by tenant.
+    """
+    try:
+        return {**llm_budget.status(), "usage": await llm_budget.get_usage(max(0.0, min(hours, 24 * 31)))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs")
+async def get_analysis_job_stats():
+    """Get the analysis job queue: jobs by status, queue lag, running jobs by worker and dead jobs."""
+    try:
+        return {"mode": ANALYSIS_MODE, **await get_job_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs/retry")
+async def retry_analysis_jobs(change_id: Optional[str] = None):
+    """Queue dead-lettered analysis jobs again (all of them, or one change's)."""
     try:
-        clear_cache()
-        return {"message": "Cache cleared successfully"}
+        return {"message": "Jobs queued", "queued": await retry_dead_jobs(change_id)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow a request only with the configured admin token; admin endpoints are hidden without one."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def profile_output(result: dict, format: str):
+    """Return profiler results as folded stacks (text) or JSON."""
+    if format == "folded":
+        return Response(result["folded"] + "\n", media_type="text/plain; charset=utf-8")
+    return result
+
+@app.post("/api/admin/profiling/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu(seconds: float = 10, interval_ms: float = 10, format: str = "folded"):
+    """
+    Sample all thread stacks for a number of seconds.
+    
+    Returns folded stacks (one "frame;frame;... count" line per stack) for
+    flamegraph.pl or speedscope, or JSON with format=json.
+    """
+    try:
+        profiler.start(max(1, interval_ms) / 1000, seconds=min(max(seconds, 0.1), 300))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await asyncio.to_thread(profiler.wait)
+    return profile_output(profiler.stop(), format)
+
+@app.post("/api/admin/profiling/cpu/start", dependencies=[Depends(require_admin)])
+async def start_cpu_profile(interval_ms: float = 10, max_seconds: float = 300):
+    """Start sampling until stopped (or max_seconds pass)."""
+    try:
+        profiler.start(max(1, interval_ms) / 1000, seconds=max_seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": "Profiler started", "interval_ms": max(1, interval_ms)}
+
+@app.post("/api/admin/profiling/cpu/stop", dependencies=[Depends(require_admin)])
+async def stop_cpu_profile(format: str = "folded"):
+    """Stop sampling and return the collected stacks."""
+    return profile_output(await asyncio.to_thread(profiler.stop), format)
+
+@app.post("/api/admin/profiling/memory/snapshot", dependencies=[Depends(require_admin)])
+async def memory_snapshot(top: int = 20, frames: int = 1):
+    """Start tracing allocations if needed and take a baseline snapshot."""
+    return await asyncio.to_thread(take_memory_snapshot, top, frames)
+
+@app.get("/api/admin/profiling/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(top: int = 20):
+    """Compare allocations with the baseline snapshot, largest growth first."""
+    try:
+        return await asyncio.to_thread(diff_memory_snapshot, top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.delete("/api/admin/profiling/memory", dependencies=[Depends(require_admin)])
+async def stop_memory_profile():
+    """Stop tracing allocations."""
+    stop_memory_tracing()
+    return {"message": "Memory tracing stopped"}
+
+@app.get("/api/admin/profiling/loop", dependencies=[Depends(require_admin)])
+async def event_loop_stats():
+    """Event loop lag and the stacks of recent stalls."""
+    if loop_monitor is None:
+        return {"running": False}
+    return loop_monitor.stats()
+
 @app.get("/api/changes/{change_id}/analysis")
-def get_change_analysis(change_id: str):
+async def get_change_analysis(
+    change_id: str,
+    tenant_id: str = DEFAULT_TENANT,
+    session: AsyncSession = Depends(get_db)
+):
     """Get AI analysis for a specific change (from cache or by analyzing)."""
     try:
-        change = get_change_by_id(change_id)
+        if not get_tenant_profile(tenant_id):
+            raise HTTPException(status_code=404, detail="Tenant not found")
+        
+        change = await find_change(session, change_id)
         if not change:
             raise HTTPException(status_code=404, detail="Change not found")
         
-        analysis = get_analysis_for_change(change)
+        try:
+            analysis = await get_analysis_for_change(change, tenant_id)
+        except BudgetExceeded as e:
+            # Not analyzed because of the token budget; ask again later
+            return await over_budget_response(e.retry_after, change, change_id=change_id)
         if not analysis:
+            if ANALYSIS_MODE == "queue":
+                # The worker's pre-classifier decides, not this process's
+                job = await get_job(change_id)
+                if job and job["status"] == SKIPPED:
+                    return {"status": "skipped", "change_id": change_id,
+                            "pre_classification": job["pre_classification"]}
+                # Queued for the analysis workers; ask again later
+                if job and job["status"] in (QUEUED, RUNNING):
+                    return FastJSONResponse({"status": "queued", "change_id": change_id}, status_code=202)
             raise HTTPException(status_code=404, detail="No analysis available for this change")
         
         return analysis
@@ -2,12 +2,16 @@
 Service for fetching and processing MeitY press releases.
 """
 
-import requests
 from typing import List, Dict, Optional
 from datetime import datetime
+import asyncio
 import re
 
-API_URL = "https://www.meity.gov.in/cms/wp-json/document/documents"
+from app.config import MEITY_API_URL
+from app.fetch import fetch_json
+from app.metrics import posts_processed
+
+API_URL = MEITY_API_URL
 BASE_URL = "https://www.meity.gov.in"
 
 # Keywords for DPDP Act filtering
@@ -17,6 +21,10 @@ KEYWORDS = [
     "board", "penalty", "dpdp", "dpdpa"
 ]
 
+def match_keywords(text: str) -> List[str]:
+    """Get the DPDP keywords that occur in a lowercased text."""
+    return [kw for kw in KEYWORDS if kw in text]
+
 def calculate_risk_level(matched_keywords: List[str], title: str, content: str) -> str:
     """Calculate risk level based on keywords and content."""
     keyword_count = len(matched_keywords)
@@ -35,7 +43,7 @@ def calculate_risk_level(matched_keywords: List[str], title: str, content: str)
     else:
         return "low"
 
-def fetch_press_releases(page: int = 1, limit: int = 10) -> Dict:
+async def fetch_press_releases(page: int = 1, limit: int = 10) -> Dict:
     """Fetch press releases from MeitY API."""
     params = {
         "type": "Press Release",
@@ -43,16 +51,8 @@ def fetch_press_releases(page: int = 1, limit: int = 10) -> Dict:
         "page": page
     }
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
-        'Accept': 'application/json',
-        'Accept-Language': 'en-US,en;q=0.9'
-    }
-    
     try:
-        response = requests.get(API_URL, params=params, headers=headers, timeout=15)
-        response.raise_for_status()
-        return response.json()
+        return await fetch_json(API_URL, params=params, source="meity")
     except Exception as e:
         print(f"Error fetching from MeitY API: {e}")
         return {"posts": [], "total_items": 0, "total_pages": 0, "current_page": page}
@@ -86,7 +86,7 @@ def process_press_release(post: Dict) -> Optional[Dict]:
         
         # Filter by keywords
         combined_text = f"{title} {content}".lower()
-        matched_keywords = [kw for kw in KEYWORDS if kw in combined_text]
+        matched_keywords = match_keywords(combined_text)
         
         # Only return if relevant (2+ keywords)
         if len(matched_keywords) < 2:
@@ -180,9 +180,22 @@ def get_dummy_changes() -> List[Dict]:
         }
     ]
 
-def get_all_changes(page: int = 1, limit: int = 10) -> Dict:
+def process_press_releases(posts: List[Dict]) -> List[Dict]:
+    """Process a batch of press releases, dropping irrelevant ones."""
+    changes = [change for change in (process_press_release(post) for post in posts) if change]
+    posts_processed.inc(len(changes), source="meity", result="relevant")
+    posts_processed.inc(len(posts) - len(changes), source="meity", result="filtered")
+    return changes
+
+async def process_press_releases_async(posts: List[Dict]) -> List[Dict]:
+    """Process press releases in a worker thread so parsing doesn't block the event loop."""
+    if not posts:
+        return []
+    return await asyncio.to_thread(process_press_releases, posts)
+
+async def get_all_changes(page: int = 1, limit: int = 10) -> Dict:
     """Get all relevant press releases with pagination."""
-    data = fetch_press_releases(page, limit)
+    data = await fetch_press_releases(page, limit)
     
     posts = data.get('posts', [])
     processed_changes = []
@@ -194,18 +207,15 @@ def get_all_changes(page: int = 1, limit: int = 10) -> Dict:
         seen_ids.add(dummy['id'])
         processed_changes.append(dummy)
     
-    # Then add real changes
+    # Then add real changes, skipping IDs we've already seen
+    new_posts = []
     for post in posts:
         post_id = str(post.get('ID', ''))
-        
-        # Skip if we've already processed this ID
-        if post_id in seen_ids:
-            continue
-            
-        processed = process_press_release(post)
-        if processed:
+        if post_id not in seen_ids:
             seen_ids.add(post_id)
-            processed_changes.append(processed)
+            new_posts.append(post)
+    
+    processed_changes.extend(await process_press_releases_async(new_posts))
     
     return {
         "changes": processed_changes,
@@ -215,7 +225,7 @@ def get_all_changes(page: int = 1, limit: int = 10) -> Dict:
         "totalPages": 1
     }
 
-def get_change_by_id(change_id: str) -> Optional[Dict]:
+async def get_change_by_id(change_id: str) -> Optional[Dict]:
     """Get a specific press release by ID."""
     # Check dummy changes first
     dummy_changes = get_dummy_changes()
@@ -223,21 +233,20 @@ def get_change_by_id(change_id: str) -> Optional[Dict]:
         if dummy['id'] == change_id:
             return dummy
     
-    # Fetch recent pages to find the specific change
-    for page in range(1, 4):  # Check first 3 pages
-        data = fetch_press_releases(page, 10)
-        posts = data.get('posts', [])
-        
-        for post in posts:
+    # Fetch the first 3 pages concurrently to find the specific change
+    pages = await asyncio.gather(*(fetch_press_releases(page, 10) for page in range(1, 4)))
+    
+    for data in pages:
+        for post in data.get('posts', []):
             if str(post.get('ID', '')) == change_id:
                 return process_press_release(post)
     
     return None
 
-def get_stats() -> Dict:
+async def get_stats() -> Dict:
     """Get statistics about monitored changes."""
     # Fetch first page to get counts
-    data = get_all_changes(1, 10)
+    data = await get_all_changes(1, 10)
     changes = data['changes']
     
     critical_count = sum(1 for c in changes if c['riskLevel'] == 'critical')
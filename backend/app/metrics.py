@@ -0,0 +1,288 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain in-memory values guarded by a
+lock per metric, so they can be updated from the event loop, worker
+threads and the knowledge watcher alike. Values that already live
+elsewhere (DB pool usage, cache sizes) are read by callbacks at scrape
+time instead of being tracked twice. Served at /metrics.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+import threading
+import time
+
+# Latency buckets in seconds, from cached responses to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: List["Metric"] = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class: a named metric with optional labels."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Gauge(Metric):
+    """Value that goes up and down."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (non-cumulative, last is +Inf), sum, count
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+
+        lines = self.header()
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> None:
+    """Register a callback returning exposition lines, evaluated at scrape time."""
+    _collectors.append(collector)
+
+
+def gauge_lines(name: str, documentation: str, samples: Dict[Tuple[Tuple[str, str], ...], float]) -> List[str]:
+    """Format gauge samples (label pairs -> value) computed by a collector."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for label_pairs, value in samples.items():
+        label_names = tuple(pair[0] for pair in label_pairs)
+        label_values = tuple(pair[1] for pair in label_pairs)
+        lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}")
+    return lines
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            lines.append(f"# collector error: {_escape(e)}")
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+
+# Sources and ingestion
+fetch_duration = Histogram("source_fetch_duration_seconds", "Upstream fetch latency by source", ["source"])
+fetch_errors = Counter("source_fetch_errors_total", "Upstream fetch errors by source and kind", ["source", "kind"])
+posts_processed = Counter(
+    "source_posts_total", "Source posts processed, by whether they were relevant or filtered out",
+    ["source", "result"]
+)
+ingest_polls = Counter("ingest_polls_total", "Source polls by outcome", ["outcome"])
+ingest_changes_stored = Counter("ingest_changes_stored_total", "Changes written to the database")
+ingest_last_poll = Gauge("ingest_last_poll_changes", "Changes fetched and stored by the last poll", ["stage"])
+
+# Analysis
+analysis_queue_depth = Gauge("analysis_queue_depth", "Changes waiting for or running auto-analysis", ["state"])
+analyses_total = Counter("analyses_total", "Auto-analysis evaluations by outcome", ["outcome"])
+analysis_jobs = Counter("analysis_jobs_total", "Analysis jobs run by this worker, by outcome", ["outcome"])
+gemini_duration = Histogram("gemini_request_duration_seconds", "Gemini call latency", ["mode"])
+gemini_requests = Counter("gemini_requests_total", "Gemini calls by outcome", ["mode", "outcome"])
+gemini_tokens = Counter("gemini_tokens_total", "Gemini tokens used", ["kind"])
+llm_budget_rejections = Counter(
+    "llm_budget_rejections_total", "Gemini calls refused by the token budget, by window", ["window"]
+)
+
+# Event loop
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "Delay of event loop heartbeats beyond their scheduled time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Caches
+cache_requests = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+cache_evictions = Counter("cache_evictions_total", "Entries evicted or cleared from a cache", ["cache"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every HTTP request by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                route_label = getattr(route, "path", scope["path"])
+            elif status < 400:
+                # Served by middleware before routing (e.g. response cache hits); paths are fixed
+                route_label = scope["path"]
+            else:
+                route_label = "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - started, method=scope["method"], route=route_label, status=str(status)
+            )
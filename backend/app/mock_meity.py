@@ -0,0 +1,102 @@
+"""
+Local stand-in for the MeitY press release API, for load tests.
+
+Serves /cms/wp-json/document/documents like meity.gov.in does, with
+deterministic posts (about half relevant to DPDP), a configurable number
+of pages, response latency, and injected errors. Point the API at it with
+MEITY_API_URL.
+
+Usage:
+    python -m app.mock_meity --port 9100 --latency 0.2 --jitter 0.1 --pages 50 --error-rate 0.02
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import random
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+settings = {
+    "latency": 0.1,
+    "jitter": 0.05,
+    "pages": 20,
+    "error_rate": 0.0,
+    "error_status": 503,
+}
+
+RELEVANT_TITLES = [
+    "Advisory on personal data breach reporting by data fiduciaries",
+    "Draft rules on consent managers under the DPDP Act notified for consultation",
+    "Data Protection Board issues penalty guidelines for privacy violations",
+    "Security safeguards for digital personal data processing clarified",
+]
+OTHER_TITLES = [
+    "Ministry launches semiconductor skilling programme in partnership with states",
+    "National conference on electronics manufacturing held in New Delhi",
+    "Union Minister inaugurates startup incubation centre in Bengaluru",
+]
+
+app = FastAPI(title="Mock MeitY API")
+
+
+def build_post(post_index: int) -> dict:
+    """Build the post at a position in the feed, newest first."""
+    rng = random.Random(post_index)
+    relevant = post_index % 2 == 0
+    title = rng.choice(RELEVANT_TITLES if relevant else OTHER_TITLES)
+    published = datetime(2025, 1, 1) - timedelta(hours=6 * post_index)
+    return {
+        "ID": 500000 - post_index,
+        "post_title": f"{title} ({post_index})",
+        "post_date": published.strftime('%Y-%m-%d %H:%M:%S'),
+        "post_slug": f"mock-press-release-{post_index}",
+        "post_excerpt": f"<p>{title}. Organisations processing personal data should review their compliance "
+                        f"programmes and reporting procedures.</p>" if relevant else f"<p>{title}.</p>",
+    }
+
+
+@app.get("/cms/wp-json/document/documents")
+async def documents(page: int = 1, limit: int = 10, type: str = "Press Release"):
+    delay = settings["latency"] + random.uniform(-settings["jitter"], settings["jitter"])
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    if random.random() < settings["error_rate"]:
+        return JSONResponse({"code": "mock_error", "message": "Injected error"}, status_code=settings["error_status"])
+
+    total_items = settings["pages"] * limit
+    start = (page - 1) * limit
+    posts = [build_post(index) for index in range(start, min(start + limit, total_items))]
+    return {
+        "posts": posts,
+        "total_items": total_items,
+        "total_pages": settings["pages"],
+        "current_page": page,
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a mock MeitY press release API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="Mean response delay (seconds)")
+    parser.add_argument("--jitter", type=float, default=settings["jitter"], help="Random +/- delay (seconds)")
+    parser.add_argument("--pages", type=int, default=settings["pages"], help="Pages of press releases")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"],
+                        help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=settings["error_status"])
+    args = parser.parse_args()
+
+    settings.update(
+        latency=args.latency, jitter=args.jitter, pages=args.pages,
+        error_rate=args.error_rate, error_status=args.error_status,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,155 @@
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, Text, DateTime, BigInteger, Integer, Index
+from datetime import datetime
+import json
+from sys import intern
 
 Base = declarative_base()
 
-# Add your models here
-# Example:
-# from sqlalchemy import Column, Integer, String, DateTime
-# from datetime import datetime
-#
-# class User(Base):
-#     __tablename__ = "users"
-#     
-#     id = Column(Integer, primary_key=True, index=True)
-#     email = Column(String, unique=True, index=True)
-#     created_at = Column(DateTime, default=datetime.utcnow)
+# SQLite only auto-increments INTEGER primary keys
+AutoIncrementId = BigInteger().with_variant(Integer(), "sqlite")
+
+
+class Change(Base):
+    """A regulatory change ingested from a monitored source."""
+    __tablename__ = "changes"
+    __table_args__ = (
+        # Keyset pagination of the feed on (detected_at, id)
+        Index("ix_changes_detected_at_id", "detected_at", "id"),
+    )
+
+    id = Column(String, primary_key=True)
+    source_id = Column(String, nullable=False, index=True)
+    source_name = Column(String, nullable=False)
+    change_summary = Column(Text, nullable=False)
+    detected_at = Column(DateTime, nullable=False, index=True)
+    risk_level = Column(String, nullable=False, index=True)
+    affected_sector = Column(String)
+    link = Column(Text)
+    content = Column(Text)
+    # Space-separated so the full-text index can cover it directly
+    matched_keywords = Column(Text)
+    analysis_summary = Column(Text)
+    ingest_seq = Column(BigInteger, nullable=False, index=True)
+    ingested_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        """Convert to the change dictionary format used by the API."""
+        # Source names, sectors, risk levels and keywords repeat across rows; share one copy of each
+        return {
+            "id": self.id,
+            "sourceName": intern(self.source_name) if self.source_name else self.source_name,
+            "sourceId": intern(self.source_id) if self.source_id else self.source_id,
+            "changeSummary": self.change_summary,
+            "detectedAt": self.detected_at.isoformat() + 'Z' if self.detected_at else None,
+            "riskLevel": intern(self.risk_level) if self.risk_level else self.risk_level,
+            "affectedSector": intern(self.affected_sector) if self.affected_sector else self.affected_sector,
+            "link": self.link,
+            "content": self.content or "",
+            "matchedKeywords": [intern(keyword) for keyword in self.matched_keywords.split()] if self.matched_keywords else []
+        }
+
+
+class CachedAnalysis(Base):
+    """An analysis in the durable tier of the analysis cache."""
+    __tablename__ = "analysis_cache"
+
+    # Cache key: the change ID, prefixed with the tenant for non-default tenants, then "@" and the knowledge version
+    key = Column(String, primary_key=True)
+    change_id = Column(String, nullable=False, index=True)
+    tenant_id = Column(String, nullable=False)
+    knowledge_version = Column(String, index=True)
+    obligation_id = Column(String, index=True)
+    cached_at = Column(DateTime, nullable=False, index=True)
+    # The cache entry as JSON, with its retrieved obligation
+    payload = Column(Text, nullable=False)
+
+
+class AnalysisHistory(Base):
+    """An ad-hoc analysis made with /api/analyze-update."""
+    __tablename__ = "analysis_history"
+
+    id = Column(AutoIncrementId, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    update_text = Column(Text, nullable=False)
+    # The analysis result as JSON
+    result = Column(Text, nullable=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "timestamp": self.created_at.isoformat(),
+            "update_text": self.update_text,
+            "result": json.loads(self.result),
+        }
+
+
+class CacheEvent(Base):
+    """A change to shared state, for other worker processes to apply to their in-memory copies."""
+    __tablename__ = "cache_events"
+
+    id = Column(AutoIncrementId, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    # Worker that made the change, which doesn't apply its own events
+    source = Column(String, nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+
+
+class AnalysisJob(Base):
+    """A change waiting for, or being analyzed by, an analysis worker."""
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        # Workers claim due jobs in rank order
+        Index("ix_analysis_jobs_status_rank_at", "status", "rank_at"),
+    )
+
+    id = Column(AutoIncrementId, primary_key=True, autoincrement=True)
+    # One job per change, so enqueueing a change twice is harmless
+    change_id = Column(String, nullable=False, unique=True)
+    # The change dictionary as JSON, so workers don't need the sources
+    change = Column(Text, nullable=False)
+    # queued, running, done, skipped (the pre-classifier ruled the change out) or dead
+    status = Column(String, nullable=False)
+    # The change's risk level, which sets the job's share of worker concurrency
+    risk_level = Column(String, nullable=False)
+    # Jobs run in order of this time: when the job was queued, moved earlier by its priority
+    rank_at = Column(DateTime, nullable=False)
+    # Attempts started; also identifies the current lease
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False)
+    worker_id = Column(String)
+    lease_expires_at = Column(DateTime)
+    last_error = Column(Text)
+    # The worker's pre-classification as JSON, when it skipped the change
+    result = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class LlmUsage(Base):
+    """Gemini tokens used in a minute for a source and tenant, summed over every worker."""
+    __tablename__ = "llm_usage"
+
+    # Start of the minute (UTC)
+    minute = Column(DateTime, primary_key=True)
+    # Source of the analyzed change, or "ad-hoc" for /api/analyze-update
+    source = Column(String, primary_key=True)
+    tenant_id = Column(String, primary_key=True)
+    # Calls that included the tenant; a multi-profile call counts once for each of its tenants
+    calls = Column(Integer, nullable=False, default=0)
+    # Gemini calls, counted on the row of each call's first tenant only, so they add up per source
+    requests = Column(Integer, nullable=False, default=0)
+    # Tokens of multi-profile calls are split between their tenants
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+
+
+class ImportedFile(Base):
+    """A data file already imported into the database, so it is only imported once."""
+    __tablename__ = "imported_files"
+
+    # SHA-256 of the file's contents, so an edited file is imported again
+    digest = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    imported_at = Column(DateTime, nullable=False, default=datetime.utcnow)
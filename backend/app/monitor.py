@@ -10,7 +10,7 @@ Parameters:
   - limit: 10 (items per page)
   - page: 1 (page number)
 
-For testing with mock data, run: python app/monitor_mock.py
+For testing with mock data, run: python -m app.monitor_mock
 """
 
 import requests
@@ -63,11 +63,11 @@ def fetch_and_filter_press_releases():
         
     except requests.RequestException as e:
         print(f"❌ Error fetching from API: {e}")
-        print("\nFor testing, run: python app/monitor_mock.py")
+        print("\nFor testing, run: python -m app.monitor_mock")
         return
     except Exception as e:
         print(f"❌ Error processing API response: {e}")
-        print("\nFor testing, run: python app/monitor_mock.py")
+        print("\nFor testing, run: python -m app.monitor_mock")
         return
     
     items = []
@@ -134,7 +134,7 @@ def fetch_and_filter_press_releases():
     if len(items) == 0:
         print("⚠️  Warning: No items found.")
         print("The API may have changed or returned unexpected data.")
-        print("\nFor testing, run: python app/monitor_mock.py")
+        print("\nFor testing, run: python -m app.monitor_mock")
         return
     
     if len(relevant_items) == 0:
@@ -1,11 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+import asyncio
 import re
 
+import httpx
+
+from app.fetch import fetch, close_client
+
 BASE_URL = "https://pib.gov.in"
 PIB_RELEASES_URL = "https://pib.gov.in/allRel.aspx"
 
+PIB_PARAMS = {
+    'relid': '0',
+    'lang': '1',
+    'state': '0',
+    'ministry': '54'  # Ministry of Electronics & IT
+}
+
 KEYWORDS = [
     "data", "digital", "personal", "protection", "privacy", 
     "breach", "consent", "security", "reporting", "fiduciary", 
@@ -15,24 +25,22 @@ KEYWORDS = [
 def fetch_and_filter_press_releases():
     print("Fetching PIB press releases (Ministry of Electronics & IT)...")
     
+    async def fetch_releases():
+        try:
+            return await fetch(PIB_RELEASES_URL, params=PIB_PARAMS, source="pib")
+        finally:
+            await close_client()
+    
+    # Through the shared fetch layer, so FETCH_MODE=record/replay applies
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        params = {
-            'relid': '0',
-            'lang': '1',
-            'state': '0',
-            'ministry': '54'  # Ministry of Electronics & IT
-        }
-        
-        response = requests.get(PIB_RELEASES_URL, headers=headers, params=params, timeout=15)
-        response.raise_for_status()
-    except requests.RequestException as e:
+        response = asyncio.run(fetch_releases())
+    except httpx.HTTPError as e:
         print(f"Error fetching press releases: {e}")
         return
     
+    # Imported here so app.fixtures can use the PIB constants without loading BeautifulSoup/lxml
+    from bs4 import BeautifulSoup
+    
     soup = BeautifulSoup(response.content, "lxml")
     
     items = []
@@ -1,8 +1,20 @@
 """
 Mock version of the monitor script for testing the filtering logic.
 This demonstrates how the script will work once proper web scraping is set up.
+
+Press releases recorded in the fixture archive (python -m app.fixtures record)
+are replayed when available; otherwise the built-in sample releases are used.
 """
 
+import asyncio
+import re
+from datetime import datetime
+
+import httpx
+
+from app.fetch import fetch_json, set_fetch_mode, close_client
+from app.meity_service import API_URL, BASE_URL
+
 KEYWORDS = [
     "data", "digital", "personal", "protection", "privacy", 
     "breach", "consent", "security", "reporting", "fiduciary", 
@@ -61,11 +73,48 @@ MOCK_PRESS_RELEASES = [
     },
 ]
 
+def post_to_item(post: dict) -> dict:
+    """Convert a MeitY API post to the item format used here."""
+    date = post.get('post_date', 'N/A')
+    try:
+        date = datetime.strptime(date, '%Y-%m-%d %H:%M:%S').strftime('%d-%m-%Y')
+    except ValueError:
+        pass
+    post_slug = post.get('post_slug', '')
+    snippet = re.sub(r'<[^>]+>', '', post.get('post_excerpt', '') or post.get('post_content', '')).strip()
+    return {
+        "title": post.get('post_title', '').strip(),
+        "date": date,
+        "link": f"{BASE_URL}/documents/press-release/{post_slug}" if post_slug else post.get('guid', ''),
+        "snippet": snippet[:300],
+    }
+
+
+def load_recorded_press_releases():
+    """Get the first page of press releases from the fixture archive, or None if not recorded."""
+    async def replay():
+        try:
+            return await fetch_json(API_URL, params={"type": "Press Release", "limit": 10, "page": 1}, source="meity")
+        finally:
+            await close_client()
+    
+    set_fetch_mode("replay")
+    try:
+        data = asyncio.run(replay())
+    except httpx.HTTPError:
+        return None
+    return [post_to_item(post) for post in data.get('posts', [])]
+
+
 def fetch_and_filter_press_releases():
-    print("Fetching MeitY press releases... (MOCK DATA)")
+    items = load_recorded_press_releases()
+    if items is None:
+        print("Fetching MeitY press releases... (MOCK DATA)")
+        items = MOCK_PRESS_RELEASES
+    else:
+        print("Fetching MeitY press releases... (RECORDED FIXTURES)")
     print()
     
-    items = MOCK_PRESS_RELEASES
     relevant_items = []
     
     for item in items:
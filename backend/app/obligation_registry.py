@@ -0,0 +1,129 @@
+"""
+Obligation registry across compliance frameworks.
+
+Holds the obligations of every loaded framework (DPDP Act, IT Rules,
+CERT-In directions, RBI data localisation, ...) and builds ID, category,
+severity and section indexes once at load time so lookups and filtered
+queries don't scan the obligation lists.
+"""
+
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+import re
+
+
+def normalize_key(value: Optional[str]) -> Optional[str]:
+    """Normalize a filter value for index lookups."""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    return value or None
+
+
+def get_section_keys(section: str) -> List[str]:
+    """
+    Get the index keys for a section reference.
+
+    "Rule 3(2)(b)" is indexed as "rule 3(2)(b)", "rule 3(2)" and "rule 3",
+    so a query for a whole section also finds its sub-sections.
+    """
+    key = normalize_key(section)
+    keys = []
+    while key:
+        keys.append(key)
+        parent = re.sub(r"\s*\([^()]*\)$", "", key)
+        key = parent if parent != key else None
+    return keys
+
+
+class ObligationRegistry:
+    """
+    Indexed, read-only collection of obligations from several frameworks.
+
+    Every combination of framework, severity and category (with None as a
+    wildcard) is pre-computed, so a filtered query is a single dictionary
+    lookup regardless of how many obligations are loaded.
+    """
+
+    def __init__(self, frameworks: List[Dict]):
+        """
+        Build the registry.
+
+        Args:
+            frameworks: Framework dictionaries, each with framework_id,
+                framework and obligations keys
+        """
+        self.frameworks: Dict[str, Dict] = {}
+        self._by_id: Dict[str, Dict] = {}
+        self._by_filter: Dict[Tuple, List[Dict]] = {}
+        self._by_section: Dict[str, List[Dict]] = {}
+
+        for framework in frameworks:
+            framework_id = framework.get("framework_id", "")
+            framework_key = normalize_key(framework_id)
+            obligations = framework.get("obligations", [])
+
+            self.frameworks[framework_key] = {
+                "id": framework_id,
+                "name": framework.get("framework", "Unknown"),
+                "version": framework.get("version"),
+                "last_updated": framework.get("last_updated"),
+                "obligations_count": len(obligations),
+            }
+
+            for obligation in obligations:
+                obligation_id = obligation.get("id")
+                if not obligation_id or obligation_id in self._by_id:
+                    continue
+
+                obligation = {**obligation, "framework_id": framework_id}
+                self._by_id[obligation_id] = obligation
+
+                keys = (
+                    (framework_key, None),
+                    (normalize_key(obligation.get("severity")), None),
+                    (normalize_key(obligation.get("category")), None),
+                )
+                for filter_key in product(*keys):
+                    self._by_filter.setdefault(filter_key, []).append(obligation)
+
+                for section in obligation.get("applicable_sections", []):
+                    for section_key in get_section_keys(section):
+                        matches = self._by_section.setdefault(section_key, [])
+                        if not matches or matches[-1] is not obligation:
+                            matches.append(obligation)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, obligation_id: str) -> Optional[Dict]:
+        """Get an obligation by ID."""
+        return self._by_id.get(obligation_id)
+
+    def query(self, framework: Optional[str] = None, severity: Optional[str] = None,
+              category: Optional[str] = None, section: Optional[str] = None) -> List[Dict]:
+        """
+        Get the obligations matching all of the given filters.
+
+        Args:
+            framework: Framework ID, e.g. "DPDP" or "CERT-IN"
+            severity: Severity, e.g. "critical"
+            category: Obligation category, e.g. "Incident Response"
+            section: Section reference, e.g. "Section 8"
+
+        Returns:
+            Matching obligations in load order
+        """
+        filter_key = (normalize_key(framework), normalize_key(severity), normalize_key(category))
+        matches = self._by_filter.get(filter_key, [])
+
+        if section is None:
+            return list(matches)
+
+        # Section lists are short, so narrow them by the other filters
+        section_keys = get_section_keys(section)
+        section_matches = self._by_section.get(section_keys[0], []) if section_keys else []
+        if filter_key == (None, None, None):
+            return list(section_matches)
+        allowed = {id(obligation) for obligation in matches}
+        return [obligation for obligation in section_matches if id(obligation) in allowed]
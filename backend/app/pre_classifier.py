@@ -0,0 +1,252 @@
+"""
+Local pre-classifier for press releases.
+
+Predicts whether a change is likely to be applicable to the company
+before a Gemini call is spent on it. Combines deterministic keyword rules
+with a small Naive Bayes model trained on the cached analyses, and keeps
+counters of how many LLM calls were saved.
+
+The prediction is tenant-agnostic: the model learns from every tenant's
+analyses, and a change is analyzed for all tenants in one pass, so it is
+ruled in or out (and counted) once for all of them.
+"""
+
+from typing import Dict, List, Optional
+import math
+import re
+import threading
+
+from app.config import PRE_CLASSIFIER_ENABLED, PRE_CLASSIFIER_SKIP_THRESHOLD
+
+# Phrases that strongly suggest a data protection obligation is affected
+APPLICABLE_SIGNALS = {
+    "dpdp": 1.5,
+    "personal data": 1.5,
+    "data protection": 1.0,
+    "data fiduciar": 1.5,
+    "data principal": 1.5,
+    "breach": 1.5,
+    "consent": 1.5,
+    "cross-border": 1.0,
+    "penalt": 1.0,
+    "privacy": 1.0,
+    "retention": 0.5,
+    "grievance": 0.5,
+}
+
+# Phrases typical of announcements, events and schemes with no compliance impact
+IRRELEVANT_SIGNALS = {
+    "digital india": 1.5,
+    "summit": 1.5,
+    "conference": 1.0,
+    "hackathon": 1.5,
+    "award": 1.0,
+    "inaugurat": 1.5,
+    "felicitat": 1.5,
+    "celebrat": 1.0,
+    "launches": 0.5,
+    "semiconductor": 1.5,
+    "startup": 1.0,
+    "skilling": 1.5,
+    "scholarship": 1.5,
+    "mou": 1.0,
+    "visit": 0.5,
+    "rural connectivity": 1.5,
+    "broadband": 1.0,
+}
+
+# Bias so that a change with no signals at all stays uncertain but leans applicable
+RULE_BIAS = 0.5
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z\-]{2,}")
+
+# Match phrases at word starts so "mou" does not fire on "amount"
+_APPLICABLE_PATTERNS = [(re.compile(r"\b" + re.escape(p)), w) for p, w in APPLICABLE_SIGNALS.items()]
+_IRRELEVANT_PATTERNS = [(re.compile(r"\b" + re.escape(p)), w) for p, w in IRRELEVANT_SIGNALS.items()]
+
+# Most recent changes evaluated, remembered so they are only counted once
+MAX_COUNTED = 10_000
+
+# Trained model and memoized predictions
+_model: Optional[Dict] = None
+_model_trained_on = -1
+_training_examples = 0
+_predictions: Dict[str, Dict] = {}
+_counted: Dict[str, None] = {}
+
+# Changes are classified in worker threads; one at a time, so the model is trained once
+_lock = threading.Lock()
+
+_stats = {
+    "evaluated": 0,
+    "sent_to_llm": 0,
+    "skipped": 0,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def get_change_text(change: Dict) -> str:
+    """Build the text used for classification from a change."""
+    text = change.get('changeSummary', '')
+    if change.get('content'):
+        text += "\n\n" + change.get('content', '')
+    return text
+
+
+def rule_score(text: str) -> float:
+    """
+    Score text with the deterministic rules.
+
+    Args:
+        text: Change title and content
+
+    Returns:
+        Log-odds contribution; positive means likely applicable
+    """
+    text_lower = text.lower()
+    score = RULE_BIAS
+    score += sum(w for pattern, w in _APPLICABLE_PATTERNS if pattern.search(text_lower))
+    score -= sum(w for pattern, w in _IRRELEVANT_PATTERNS if pattern.search(text_lower))
+    return score
+
+
+def train_model(cache_entries: Dict) -> Optional[Dict]:
+    """
+    Train a multinomial Naive Bayes model from cached analyses.
+
+    Args:
+        cache_entries: Analysis cache entry records keyed by change ID
+
+    Returns:
+        Model dictionary, or None if both classes are not represented
+    """
+    counts = {True: {}, False: {}}
+    totals = {True: 0, False: 0}
+    docs = {True: 0, False: 0}
+
+    for entry in cache_entries.values():
+        analysis = entry.analysis
+        if analysis.applicable is None:
+            continue
+
+        label = bool(analysis.applicable)
+        text = entry.update_text or analysis.summary or ''
+        docs[label] += 1
+        for token in tokenize(text):
+            counts[label][token] = counts[label].get(token, 0) + 1
+            totals[label] += 1
+
+    if not docs[True] or not docs[False]:
+        return None
+
+    vocabulary = set(counts[True]) | set(counts[False])
+    return {
+        "counts": counts,
+        "totals": totals,
+        "vocab_size": len(vocabulary),
+        "prior_log_odds": math.log(docs[True] / docs[False]),
+    }
+
+
+def model_score(model: Dict, text: str) -> float:
+    """Log-odds of applicability according to the Naive Bayes model."""
+    score = model["prior_log_odds"]
+    vocab_size = model["vocab_size"]
+    for token in tokenize(text):
+        pos = model["counts"][True].get(token, 0) + 1
+        neg = model["counts"][False].get(token, 0) + 1
+        score += math.log(pos / (model["totals"][True] + vocab_size))
+        score -= math.log(neg / (model["totals"][False] + vocab_size))
+    # Keep a tiny training set from overpowering the rules
+    return max(-3.0, min(3.0, score))
+
+
+def _get_model(cache_entries: Dict, version: Optional[int] = None) -> Optional[Dict]:
+    """Return the trained model, retraining when the version has changed (or the cache's size, without one)."""
+    global _model, _model_trained_on, _training_examples, _predictions
+
+    trained_on = len(cache_entries) if version is None else version
+    if trained_on != _model_trained_on:
+        _model = train_model(cache_entries)
+        _model_trained_on = trained_on
+        _training_examples = sum(1 for entry in cache_entries.values() if entry.analysis.applicable is not None)
+        _predictions = {}
+
+    return _model
+
+
+def classify_change(change: Dict, cache_entries: Dict, training_version: Optional[int] = None) -> Dict:
+    """
+    Predict whether a change is applicable to any tenant.
+
+    Args:
+        change: Change dictionary
+        cache_entries: Analysis cache used as training data
+        training_version: Changes whenever the model should retrain on
+            cache_entries; without it, it retrains when their number changes
+
+    Returns:
+        Dictionary with applicable, probability, confidence and send_to_llm,
+        and scope "all_tenants"
+    """
+    with _lock:
+        return _classify(change, cache_entries, training_version)
+
+
+def _classify(change: Dict, cache_entries: Dict, training_version: Optional[int]) -> Dict:
+    change_id = change.get('id')
+    model = _get_model(cache_entries, training_version)
+
+    prediction = _predictions.get(change_id) if change_id else None
+    if prediction is None:
+        text = get_change_text(change)
+        score = rule_score(text)
+        if model:
+            score += model_score(model, text)
+
+        probability = 1 / (1 + math.exp(-score))
+        prediction = {
+            "applicable": probability >= 0.5,
+            "probability": round(probability, 3),
+            "confidence": round(abs(probability - 0.5) * 2, 3),
+            "send_to_llm": probability >= PRE_CLASSIFIER_SKIP_THRESHOLD,
+            "model_used": model is not None,
+            "scope": "all_tenants",
+        }
+        if change_id:
+            _predictions[change_id] = prediction
+
+    # Count each change once, even if it is re-scored after retraining
+    if not change_id or change_id not in _counted:
+        _stats["evaluated"] += 1
+        if prediction["send_to_llm"]:
+            _stats["sent_to_llm"] += 1
+        else:
+            _stats["skipped"] += 1
+
+    if change_id and change_id not in _counted:
+        _counted[change_id] = None
+        if len(_counted) > MAX_COUNTED:
+            del _counted[next(iter(_counted))]
+
+    return prediction
+
+
+def get_pre_classifier_stats() -> Dict:
+    """Get statistics about the pre-classifier."""
+    evaluated = _stats["evaluated"]
+    return {
+        "enabled": PRE_CLASSIFIER_ENABLED,
+        "scope": "all_tenants",
+        "skip_threshold": PRE_CLASSIFIER_SKIP_THRESHOLD,
+        "model_trained": _model is not None,
+        "training_examples": _training_examples,
+        "evaluated": evaluated,
+        "sent_to_llm": _stats["sent_to_llm"],
+        "llm_calls_saved": _stats["skipped"],
+        "savings_rate": round(_stats["skipped"] / evaluated, 3) if evaluated else 0.0,
+    }
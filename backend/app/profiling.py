@@ -0,0 +1,273 @@
+"""
+On-demand profiling for a running worker.
+
+- SamplingProfiler: samples the stacks of all threads from a background
+  thread at a fixed rate and aggregates them as folded stacks
+  ("frame;frame;frame count" lines), which flamegraph.pl, speedscope and
+  most flamegraph viewers read directly. Nothing runs while it is stopped.
+- Memory snapshots: tracemalloc snapshots and diffs against a baseline,
+  plus the sizes of registered in-memory structures, to find what grows.
+- LoopLagMonitor: a heartbeat task on the event loop and a watchdog thread;
+  when the loop stops turning for longer than the threshold, the watchdog
+  logs the stack the loop thread is stuck in.
+
+Exposed through the admin-only /api/admin/profiling endpoints.
+"""
+
+from collections import Counter as FrameCounter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+
+from app.metrics import event_loop_lag
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", code.co_filename)
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def _stack(frame) -> List[str]:
+    """Frames of a stack, outermost first."""
+    frames = []
+    while frame is not None:
+        frames.append(_frame_label(frame))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class SamplingProfiler:
+    """Periodic stack sampler producing folded stacks."""
+
+    def __init__(self):
+        self._samples: FrameCounter = FrameCounter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.started_at: Optional[float] = None
+        self.interval = 0.01
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.01, seconds: Optional[float] = None) -> None:
+        """
+        Start sampling every `interval` seconds, optionally stopping after `seconds`.
+
+        Raises:
+            RuntimeError: If the profiler is already running
+        """
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        self._samples = FrameCounter()
+        self._stop.clear()
+        self.interval = interval
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval, seconds), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, interval: float, seconds: Optional[float]) -> None:
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + seconds if seconds else None
+        names = {}
+        while not self._stop.wait(interval):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self._samples[";".join([names.get(thread_id, str(thread_id))] + _stack(frame))] += 1
+
+    def wait(self) -> None:
+        """Block until a timed run finishes."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def stop(self) -> Dict:
+        """Stop sampling (if still running) and get the result."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.result()
+
+    def result(self) -> Dict:
+        """Samples collected so far, with the folded stacks."""
+        return {
+            "running": self.running,
+            "seconds": round(time.perf_counter() - self.started_at, 3) if self.started_at else 0,
+            "interval": self.interval,
+            "samples": sum(self._samples.values()),
+            "folded": self.folded(),
+        }
+
+    def folded(self) -> str:
+        """Samples as folded stacks, most frequent first."""
+        return "\n".join(f"{stack} {count}" for stack, count in self._samples.most_common())
+
+
+profiler = SamplingProfiler()
+
+
+# Memory
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+_size_probes: Dict[str, Callable[[], int]] = {}
+
+
+def register_size_probe(name: str, probe: Callable[[], int]) -> None:
+    """Report the size of an in-memory structure (e.g. entries of a cache) with memory snapshots."""
+    _size_probes[name] = probe
+
+
+def get_structure_sizes() -> Dict[str, int]:
+    return {name: probe() for name, probe in _size_probes.items()}
+
+
+def _stat_to_dict(stat) -> Dict:
+    frame = stat.traceback[0]
+    entry = {"location": f"{frame.filename}:{frame.lineno}", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def take_memory_snapshot(top: int = 20, frames: int = 1) -> Dict:
+    """
+    Start tracing allocations if needed and record a baseline snapshot.
+
+    Only allocations made after tracing starts are visible, so take the
+    baseline first and diff against it later.
+    """
+    global _baseline
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _baseline = _take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "taken_at": datetime.now().isoformat(),
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "structures": get_structure_sizes(),
+        "top": [_stat_to_dict(stat) for stat in _baseline.statistics("lineno")[:top]],
+    }
+
+
+def diff_memory_snapshot(top: int = 20) -> Dict:
+    """
+    Compare current allocations with the baseline snapshot.
+
+    Raises:
+        RuntimeError: If no baseline snapshot was taken
+    """
+    if _baseline is None or not tracemalloc.is_tracing():
+        raise RuntimeError("No baseline snapshot; take one first")
+    snapshot = _take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "taken_at": datetime.now().isoformat(),
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "structures": get_structure_sizes(),
+        "top": [_stat_to_dict(stat) for stat in snapshot.compare_to(_baseline, "lineno")[:top]],
+    }
+
+
+def stop_memory_tracing() -> None:
+    """Stop tracing allocations and drop the baseline."""
+    global _baseline
+
+    _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+# Event loop lag
+
+class LoopLagMonitor:
+    """Detects and logs event loop stalls longer than a threshold."""
+
+    def __init__(self, threshold: float = 0.1, max_events: int = 50):
+        self.threshold = threshold
+        self.max_events = max_events
+        self.events: List[Dict] = []
+        self.max_lag = 0.0
+        self._heartbeat = time.perf_counter()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _beat(self) -> None:
+        interval = self.threshold / 4
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            event_loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        # Report each stall once, with the stack the loop thread is in while stalled
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._heartbeat
+            stalled = time.perf_counter() - beat
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = _stack(frame) if frame is not None else []
+            # How long the loop had been blocked when the watchdog noticed
+            event = {
+                "detected_at": datetime.now().isoformat(),
+                "blocked_ms": round(stalled * 1000, 1),
+                "stack": stack[-12:],
+            }
+            self.events = (self.events + [event])[-self.max_events:]
+            print(f"⚠️  Event loop blocked for {event['blocked_ms']} ms in {stack[-1] if stack else 'unknown'}")
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocked_events": self.events,
+        }
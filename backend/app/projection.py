@@ -0,0 +1,75 @@
+"""
+Field projection for change payloads.
+
+List views only need a few fields per change, so /api/changes can return
+a compact representation or just the fields asked for with `fields=`.
+The heavy fields (content, matched keywords, the full analysis with its
+retrieved obligation) are fetched per change from /api/changes/{id}.
+"""
+
+from typing import Dict, List, Optional
+
+# Fields of the compact list representation
+COMPACT_FIELDS = [
+    "id", "sourceName", "sourceId", "changeSummary", "detectedAt", "riskLevel", "affectedSector", "link",
+    "ai_analysis.applicable", "ai_analysis.risk_level",
+]
+
+VIEWS = {"full", "compact"}
+
+
+def parse_fields(fields: Optional[str], view: str = "full") -> Optional[List[str]]:
+    """
+    Get the fields to return for a `fields=` parameter and view.
+
+    Args:
+        fields: Comma-separated field names; "ai_analysis.summary" selects
+            one key of a nested object
+        view: "full" or "compact"
+
+    Returns:
+        List of field paths, or None to return changes unprojected
+
+    Raises:
+        ValueError: If the view is unknown
+    """
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view '{view}', expected one of: {', '.join(sorted(VIEWS))}")
+
+    if fields:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        # Changes are always addressable by ID
+        return selected if "id" in selected else ["id"] + selected
+    if view == "compact":
+        return COMPACT_FIELDS
+    return None
+
+
+def project_change(change: Dict, fields: Optional[List[str]]) -> Dict:
+    """
+    Keep only the selected fields of a change.
+
+    Unknown fields are ignored, and a nested object is left out when none
+    of its selected keys are present.
+    """
+    if fields is None:
+        return change
+
+    projected = {}
+    for field in fields:
+        name, _, key = field.partition(".")
+        if name not in change:
+            continue
+        value = change[name]
+        if not key:
+            projected[name] = value
+        elif isinstance(value, dict) and key in value:
+            projected.setdefault(name, {})[key] = value[key]
+    return projected
+
+
+def project_changes(changes: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Project every change in a list."""
+    if fields is None:
+        return changes
+    return [project_change(change, fields) for change in changes]
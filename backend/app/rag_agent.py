@@ -4,18 +4,29 @@ Minimal RAG-based Autonomous Compliance Agent
 This script demonstrates a simple RAG (Retrieval-Augmented Generation) approach
 for compliance monitoring using Google Gemini API.
 
-No FastAPI, no database, no vector database, no async - just console output.
+Run directly, it analyzes a sample update and prints the result. The API
+server uses the same retrieval and prompts, calling Gemini through
+call_gemini_api_async so the event loop isn't blocked.
 """
 
+from typing import Sequence
+import asyncio
 import os
 import json
-import google.generativeai as genai
+import time
 from dotenv import load_dotenv
-from app.knowledge import load_company_profile, load_compliance_knowledge
+from app.config import GEMINI_BACKEND
+from app.knowledge import DEFAULT_TENANT, load_company_profile, load_compliance_knowledge
+from app.llm_budget import AD_HOC_SOURCE, estimate_tokens, llm_budget
+from app.metrics import gemini_duration, gemini_requests, gemini_tokens
+from app.tracing import span
 
 # Load environment variables
 load_dotenv()
 
+# Gemini SDK, imported on first use (it pulls in the whole gRPC/protobuf stack)
+_genai = None
+
 # Retrieval rules for keyword-based obligation matching
 RETRIEVAL_RULES = {
     "breach": "DPDP-004",
@@ -141,59 +152,262 @@ Return ONLY the JSON object. No markdown formatting. No additional text."""
     return prompt
 
 
-def call_gemini_api(prompt: str) -> dict:
+def construct_multi_profile_prompt(company_profiles: dict, update_text: str, obligation: dict) -> str:
     """
-    Call Google Gemini API with the constructed prompt.
+    Construct one prompt that evaluates an update for several company profiles.
+    
+    The update, obligation and instructions come first so every batch for
+    the same update shares an identical prompt prefix; only the trailing
+    profile section differs between batches.
     
     Args:
-        prompt: The formatted prompt
+        company_profiles: Company profiles keyed by tenant ID
+        update_text: Regulatory update text
+        obligation: Retrieved obligation
         
     Returns:
-        Parsed JSON response or raw text if parsing fails
+        Formatted prompt string
+    """
+    profile_sections = "\n\n".join(
+        f"TENANT {tenant_id}:\n{json.dumps(profile, indent=2)}"
+        for tenant_id, profile in company_profiles.items()
+    )
+    
+    prompt = f"""You are an autonomous compliance agent for Indian DPDP regulatory monitoring. Return valid JSON only.
+
+REGULATORY UPDATE:
+{update_text}
+
+RETRIEVED OBLIGATION:
+{json.dumps(obligation, indent=2)}
+
+INSTRUCTIONS:
+Evaluate the update separately for each company profile listed under COMPANY PROFILES.
+For each company:
+1. Determine if this update is applicable to the company (true/false)
+2. Assess risk level: Low, Medium, High, or Critical
+3. Generate 2-4 actionable tasks with priorities
+4. Assign realistic deadlines in days (Critical=3, High=7, Medium=14, Low=30)
+5. Provide short reasoning steps
+
+OUTPUT SCHEMA (JSON only, no markdown, no explanations):
+{{
+  "results": [
+    {{
+      "tenant_id": "Tenant ID exactly as given",
+      "applicable": boolean,
+      "risk_level": "Low" | "Medium" | "High" | "Critical",
+      "affected_obligation_id": "{obligation.get('id', '')}",
+      "summary": "Brief summary of impact",
+      "tasks": [
+        {{
+          "title": "Task description",
+          "priority": "Low" | "Medium" | "High",
+          "deadline_days": integer
+        }}
+      ],
+      "reasoning_steps": [
+        "Step 1: ...",
+        "Step 2: ..."
+      ]
+    }}
+  ]
+}}
+
+Return exactly one result per tenant. Return ONLY the JSON object. No markdown formatting. No additional text.
+
+COMPANY PROFILES:
+{profile_sections}"""
+    
+    return prompt
+
+
+def split_multi_profile_result(result: dict, tenant_ids: list) -> dict:
+    """
+    Split a multi-profile Gemini response into per-tenant results.
+    
+    Args:
+        result: Parsed response from a multi-profile prompt
+        tenant_ids: Tenant IDs included in the prompt
+        
+    Returns:
+        Dictionary of tenant ID to result; tenants missing from the response are omitted
     """
+    results = {}
+    for item in result.get("results", []):
+        if not isinstance(item, dict):
+            continue
+        tenant_id = item.pop("tenant_id", None)
+        if tenant_id in tenant_ids:
+            results[tenant_id] = item
+    return results
+
+
+def get_genai():
+    """Import the Gemini SDK on first use."""
+    global _genai
+    
+    if _genai is None:
+        from app.startup import record_import
+        
+        started = time.perf_counter()
+        import google.generativeai as genai
+        record_import("google.generativeai", time.perf_counter() - started)
+        _genai = genai
+    return _genai
+
+
+def get_gemini_model():
+    """
+    Get a configured Gemini model.
+    
+    Returns:
+        The model, or None if GEMINI_API_KEY is not set
+    """
+    if GEMINI_BACKEND == "fake":
+        from app.fake_gemini import FakeGeminiModel
+        return FakeGeminiModel()
+    
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         print("❌ Error: GEMINI_API_KEY not found in environment variables")
         print("Please set GEMINI_API_KEY in your .env file")
-        return {"error": "API key not found"}
+        return None
     
-    try:
-        # Configure Gemini
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Generate response
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0,
-            )
-        )
-        
-        # Extract text from response
-        response_text = response.text.strip()
+    genai = get_genai()
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+
+def get_generation_config():
+    """Get the generation config used for every Gemini call."""
+    if GEMINI_BACKEND == "fake":
+        return None
+    return get_genai().types.GenerationConfig(
+        temperature=0,
+    )
+
+
+def record_gemini_usage(response, gemini_span=None, source: str = AD_HOC_SOURCE,
+                        tenant_ids: Sequence[str] = (DEFAULT_TENANT,), estimated_tokens: int = 0) -> None:
+    """
+    Count the prompt and output tokens reported for a Gemini response, against the token budget too.
+
+    A response without usage metadata is counted as `estimated_tokens` prompt tokens.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        prompt_tokens, output_tokens = estimated_tokens, 0
+    else:
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    gemini_tokens.inc(prompt_tokens, kind="prompt")
+    gemini_tokens.inc(output_tokens, kind="output")
+    llm_budget.record(prompt_tokens, output_tokens, source, tenant_ids)
+    if gemini_span is not None:
+        gemini_span.set_attribute("gemini.prompt_tokens", prompt_tokens)
+        gemini_span.set_attribute("gemini.output_tokens", output_tokens)
+
+
+def _finish_gemini_call(response, mode: str) -> dict:
+    """Record the outcome of a Gemini call and parse its response."""
+    with span("parse"):
+        result = parse_gemini_response(response.text)
+    gemini_requests.inc(mode=mode, outcome="unparsed" if "raw_response" in result else "ok")
+    return result
+
+
+def parse_gemini_response(response_text: str) -> dict:
+    """
+    Parse the text of a Gemini response as JSON.
+    
+    Args:
+        response_text: Raw response text, possibly wrapped in a markdown code block
         
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
+    Returns:
+        Parsed JSON response or raw text if parsing fails
+    """
+    response_text = response_text.strip()
+    
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.startswith("```"):
+        response_text = response_text[3:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    response_text = response_text.strip()
+    
+    # Parse JSON
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        print("⚠️  Warning: Could not parse JSON response")
+        print("Raw response:")
+        print(response_text)
+        return {"raw_response": response_text}
+
+
+def call_gemini_api(prompt: str, source: str = AD_HOC_SOURCE, tenant_ids: Sequence[str] = (DEFAULT_TENANT,)) -> dict:
+    """
+    Call Google Gemini API with the constructed prompt.
+    
+    Args:
+        prompt: The formatted prompt
+        source: Source of the analyzed change, for token accounting
+        tenant_ids: Tenants the prompt analyzes, for token accounting
         
-        # Parse JSON
+    Returns:
+        Parsed JSON response or raw text if parsing fails
+    
+    Raises:
+        BudgetExceeded: The call doesn't fit the token budget
+    """
+    estimated = estimate_tokens(prompt, len(tenant_ids))
+    with llm_budget.reserve(estimated):
+        try:
+            model = get_gemini_model()
+            if model is None:
+                return {"error": "API key not found"}
+            
+            with gemini_duration.time(mode="sync"), span("gemini", mode="sync") as gemini_span:
+                response = model.generate_content(prompt, generation_config=get_generation_config())
+                record_gemini_usage(response, gemini_span, source, tenant_ids, estimated)
+            return _finish_gemini_call(response, "sync")
+                
+        except Exception as e:
+            gemini_requests.inc(mode="sync", outcome="error")
+            print(f"❌ Error calling Gemini API: {e}")
+            return {"error": str(e)}
+
+
+async def call_gemini_api_async(prompt: str, source: str = AD_HOC_SOURCE,
+                                tenant_ids: Sequence[str] = (DEFAULT_TENANT,)) -> dict:
+    """
+    Call Google Gemini API without blocking the event loop.
+    
+    Same contract as call_gemini_api, for use from the API server.
+    """
+    estimated = estimate_tokens(prompt, len(tenant_ids))
+    with llm_budget.reserve(estimated):
         try:
-            return json.loads(response_text)
-        except json.JSONDecodeError:
-            print("⚠️  Warning: Could not parse JSON response")
-            print("Raw response:")
-            print(response_text)
-            return {"raw_response": response_text}
+            # Without the startup warm-up, the first call imports the SDK; do that off the event loop
+            if _genai is None and GEMINI_BACKEND == "gemini":
+                model = await asyncio.to_thread(get_gemini_model)
+            else:
+                model = get_gemini_model()
+            if model is None:
+                return {"error": "API key not found"}
             
-    except Exception as e:
-        print(f"❌ Error calling Gemini API: {e}")
-        return {"error": str(e)}
+            with gemini_duration.time(mode="async"), span("gemini", mode="async") as gemini_span:
+                response = await model.generate_content_async(prompt, generation_config=get_generation_config())
+                record_gemini_usage(response, gemini_span, source, tenant_ids, estimated)
+            return _finish_gemini_call(response, "async")
+                
+        except Exception as e:
+            gemini_requests.inc(mode="async", outcome="error")
+            print(f"❌ Error calling Gemini API: {e}")
+            return {"error": str(e)}
 
 
 def print_separator():
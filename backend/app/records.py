@@ -0,0 +1,232 @@
+"""
+Memory-compact records for cached analyses and their obligations.
+
+The API speaks dictionaries, but the analysis cache lives for the whole
+process, so its entries are slotted dataclasses instead: no per-object
+__dict__, repeated short strings (risk levels, priorities, obligation IDs,
+knowledge versions, tenant IDs) interned so every record shares one copy,
+and analyses refer to their retrieved obligation by ID instead of each
+keeping a full copy of it.
+
+Obligations are stored once per (ID, knowledge version) in an obligation
+table, so an analysis still returns the exact obligation it was made with
+after the knowledge base changes.
+"""
+
+from dataclasses import dataclass
+from sys import intern
+from typing import Dict, Optional, Tuple
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class ObligationRecord:
+    """An obligation from a compliance framework, as retrieved for an analysis."""
+
+    id: str
+    title: str
+    description: str
+    category: Optional[str]
+    severity: Optional[str]
+    requirements: Tuple[str, ...]
+    applicable_sections: Tuple[str, ...]
+    penalties: Optional[str]
+    # Any other keys, in their original order
+    extra: Optional[Dict] = None
+
+    FIELDS = ("id", "title", "description", "category", "severity", "requirements", "applicable_sections", "penalties")
+
+    @classmethod
+    def from_dict(cls, obligation: Dict) -> "ObligationRecord":
+        extra = {key: value for key, value in obligation.items() if key not in cls.FIELDS}
+        return cls(
+            id=_intern(obligation.get("id", "")),
+            title=obligation.get("title", ""),
+            description=obligation.get("description", ""),
+            category=_intern(obligation.get("category")),
+            severity=_intern(obligation.get("severity")),
+            requirements=tuple(obligation.get("requirements") or ()),
+            applicable_sections=tuple(_intern(section) for section in obligation.get("applicable_sections") or ()),
+            penalties=obligation.get("penalties"),
+            extra=extra or None,
+        )
+
+    def to_dict(self) -> Dict:
+        obligation = {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "category": self.category,
+            "severity": self.severity,
+            "requirements": list(self.requirements),
+            "applicable_sections": list(self.applicable_sections),
+            "penalties": self.penalties,
+        }
+        obligation = {key: value for key, value in obligation.items() if value is not None}
+        if self.extra:
+            obligation.update(self.extra)
+        return obligation
+
+
+# Obligations referenced by analyses, one per (obligation ID, knowledge version)
+_obligations: Dict[Tuple[str, Optional[str]], ObligationRecord] = {}
+
+
+def register_obligation(obligation: Dict, knowledge_version: Optional[str]) -> str:
+    """Add an obligation to the obligation table (once per version) and get its ID."""
+    obligation_id = _intern(obligation.get("id", ""))
+    key = (obligation_id, _intern(knowledge_version))
+    if key not in _obligations:
+        _obligations[key] = ObligationRecord.from_dict(obligation)
+    return obligation_id
+
+
+def get_obligation(obligation_id: str, knowledge_version: Optional[str]) -> Optional[ObligationRecord]:
+    return _obligations.get((obligation_id, knowledge_version))
+
+
+def get_obligation_table() -> Dict[Tuple[str, Optional[str]], ObligationRecord]:
+    return _obligations
+
+
+def clear_obligation_table() -> None:
+    _obligations.clear()
+
+
+@dataclass(slots=True)
+class TaskRecord:
+    """An action item of an analysis."""
+
+    title: str
+    priority: Optional[str]
+    deadline_days: Optional[int]
+
+    @classmethod
+    def from_dict(cls, task: Dict) -> "TaskRecord":
+        return cls(task.get("title", ""), _intern(task.get("priority")), task.get("deadline_days"))
+
+    def to_dict(self) -> Dict:
+        return {"title": self.title, "priority": self.priority, "deadline_days": self.deadline_days}
+
+
+@dataclass(slots=True)
+class AnalysisRecord:
+    """An analysis of a change for one tenant."""
+
+    applicable: Optional[bool]
+    risk_level: Optional[str]
+    affected_obligation_id: Optional[str]
+    summary: Optional[str]
+    tasks: Tuple[TaskRecord, ...]
+    reasoning_steps: Tuple[str, ...]
+    # Retrieved obligation, by reference into the obligation table
+    obligation_id: Optional[str]
+    knowledge_version: Optional[str]
+    timings_ms: Optional[Dict[str, float]] = None
+    # Any other keys returned by the model, in their original order
+    extra: Optional[Dict] = None
+
+    FIELDS = ("applicable", "risk_level", "affected_obligation_id", "summary", "tasks", "reasoning_steps",
+              "retrieved_obligation", "retrieved_obligation_id", "knowledge_version", "timings_ms")
+
+    @classmethod
+    def from_dict(cls, analysis: Dict, knowledge_version: Optional[str] = None) -> "AnalysisRecord":
+        """
+        Build a record from an analysis dictionary.
+
+        Args:
+            analysis: Analysis as returned by the pipeline, with the full
+                retrieved_obligation, or as saved, with retrieved_obligation_id
+            knowledge_version: Version the analysis was made with, if the
+                analysis doesn't say
+        """
+        version = _intern(analysis.get("knowledge_version", knowledge_version))
+        obligation = analysis.get("retrieved_obligation")
+        if isinstance(obligation, dict):
+            obligation_id = register_obligation(obligation, version)
+        else:
+            obligation_id = _intern(analysis.get("retrieved_obligation_id"))
+
+        tasks = analysis.get("tasks") or ()
+        extra = {key: value for key, value in analysis.items() if key not in cls.FIELDS}
+        return cls(
+            applicable=analysis.get("applicable"),
+            risk_level=_intern(analysis.get("risk_level")),
+            affected_obligation_id=_intern(analysis.get("affected_obligation_id")),
+            summary=analysis.get("summary"),
+            tasks=tuple(TaskRecord.from_dict(task) if isinstance(task, dict) else task for task in tasks),
+            reasoning_steps=tuple(analysis.get("reasoning_steps") or ()),
+            obligation_id=obligation_id,
+            knowledge_version=version if "knowledge_version" in analysis else None,
+            # Kept by reference so stages timed after storing still show up
+            timings_ms=analysis.get("timings_ms"),
+            extra=extra or None,
+        )
+
+    def to_dict(self, entry_version: Optional[str] = None) -> Dict:
+        """Convert to the analysis dictionary format used by the API, with the full obligation."""
+        analysis = {
+            "applicable": self.applicable,
+            "risk_level": self.risk_level,
+            "affected_obligation_id": self.affected_obligation_id,
+            "summary": self.summary,
+            "tasks": [task.to_dict() if isinstance(task, TaskRecord) else task for task in self.tasks],
+            "reasoning_steps": list(self.reasoning_steps),
+        }
+        analysis = {key: value for key, value in analysis.items() if value is not None}
+        if self.extra:
+            analysis.update(self.extra)
+        if self.obligation_id is not None:
+            obligation = get_obligation(self.obligation_id, self.knowledge_version or entry_version)
+            analysis["retrieved_obligation"] = obligation.to_dict() if obligation else {"id": self.obligation_id}
+        if self.knowledge_version is not None:
+            analysis["knowledge_version"] = self.knowledge_version
+        if self.timings_ms is not None:
+            analysis["timings_ms"] = self.timings_ms
+        return analysis
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    """An analysis cache entry."""
+
+    analysis: AnalysisRecord
+    cached_at: str
+    change_id: str
+    tenant_id: str
+    knowledge_version: Optional[str]
+    update_text: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, entry: Dict, tenant_id: str = "default") -> "CacheEntry":
+        version = _intern(entry.get("knowledge_version"))
+        return cls(
+            analysis=AnalysisRecord.from_dict(entry.get("analysis") or {}, version),
+            cached_at=entry.get("cached_at", ""),
+            change_id=entry.get("change_id", ""),
+            tenant_id=_intern(entry.get("tenant_id", tenant_id)),
+            knowledge_version=version,
+            update_text=entry.get("update_text"),
+        )
+
+    def to_dict(self) -> Dict:
+        """Convert to the cache entry dictionary format, with the full analysis."""
+        entry = {
+            "analysis": self.analysis.to_dict(self.knowledge_version),
+            "cached_at": self.cached_at,
+            "change_id": self.change_id,
+            "tenant_id": self.tenant_id,
+            "knowledge_version": self.knowledge_version,
+        }
+        if self.update_text:
+            entry["update_text"] = self.update_text
+        return entry
+
+
+def entries_from_storage(data: Dict) -> Dict[str, CacheEntry]:
+    """Load cache entries from an analysis cache file: entries with full obligation copies, by key."""
+    return {key: CacheEntry.from_dict(entry) for key, entry in data.items()}
+
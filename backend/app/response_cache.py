@@ -0,0 +1,251 @@
+"""
+HTTP response caching for read endpoints.
+
+Each cached route has a data version: the highest ingest sequence in the
+`changes` table, the latest cache event (analyses stored or invalidated
+by any worker) or the knowledge snapshot hash. Versions read from the
+database are the same in every worker and across restarts; they are read
+at most every VERSION_REFRESH seconds, and source-backed versions also
+change every RESPONSE_CACHE_TTL seconds, so responses built from a live
+fetch (when the database is unavailable) are refreshed too. The version
+and query string give a strong ETag, so a dashboard re-polling with If-None-Match
+gets a bodiless 304 without the route running at all, and rendered bodies
+are kept in a small in-process LRU so other clients get them without
+recomputing or reserializing the payload.
+"""
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import hashlib
+import time
+
+from sqlalchemy import func, select
+
+from app.config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_TTL
+from app.responses import get_request_encoding
+from app.metrics import cache_requests, cache_evictions, register_collector, gauge_lines
+from app.profiling import register_size_probe
+
+
+# Seconds a version read from the database is reused
+VERSION_REFRESH = 1.0
+
+# Last versions read from the database, and when (monotonic)
+_database_versions: Dict[str, Tuple] = {}
+_database_versions_at = 0.0
+
+
+async def _read_database_versions() -> Dict[str, Tuple]:
+    """Highest ingest sequence, and latest cache event ID with the number of events."""
+    global _database_versions, _database_versions_at
+
+    from app.db import engine
+    from app.models import CacheEvent, Change
+
+    now = time.monotonic()
+    if now - _database_versions_at < VERSION_REFRESH:
+        return _database_versions
+    try:
+        events = CacheEvent.__table__
+        async with engine.connect() as connection:
+            ingest_seq = (await connection.execute(select(func.max(Change.__table__.c.ingest_seq)))).scalar()
+            # The count catches events that committed after one with a higher ID
+            latest_event = (await connection.execute(select(func.max(events.c.id), func.count()))).one()
+        _database_versions = {"source": ("seq", ingest_seq), "analysis": ("event", *latest_event)}
+    except Exception:
+        # Responses are still reused for up to RESPONSE_CACHE_TTL seconds
+        _database_versions = {"source": ("db-down",), "analysis": ("db-down",)}
+    _database_versions_at = now
+    return _database_versions
+
+
+async def _source_version() -> Tuple:
+    """
+    Version of data read from the sources: the ingest sequence, which moves
+    whenever any worker stores new data, plus a RESPONSE_CACHE_TTL bucket.
+    """
+    versions = await _read_database_versions()
+    return versions["source"] + ("ttl", int(time.time() // RESPONSE_CACHE_TTL))
+
+
+async def _analysis_version() -> Tuple:
+    """Version of the analysis cache and the knowledge that produced it."""
+    from app.knowledge import get_knowledge_version
+
+    versions = await _read_database_versions()
+    return versions["analysis"] + (get_knowledge_version(),)
+
+
+async def _knowledge_version() -> Tuple:
+    """Version of the knowledge snapshot."""
+    from app.knowledge import get_knowledge_version
+
+    return (get_knowledge_version(),)
+
+
+async def _changes_version() -> Tuple:
+    return await _source_version() + await _analysis_version()
+
+
+# Cached routes and the data version each one depends on
+CACHED_ROUTES: Dict[str, Callable[[], Awaitable[Tuple]]] = {
+    "/api/changes": _changes_version,
+    "/api/stats": _source_version,
+    "/api/knowledge/compliance": _knowledge_version,
+    "/api/knowledge/obligations": _knowledge_version,
+    "/api/knowledge/frameworks": _knowledge_version,
+}
+
+# Response headers kept with a cached body
+CACHED_HEADERS = {b"content-type", b"content-encoding", b"vary"}
+
+
+class ResponseCache:
+    """Bounded LRU of rendered response bodies keyed by route, query and version."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[list, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag: str) -> Optional[Tuple[list, bytes]]:
+        entry = self._entries.get(etag)
+        if entry is None:
+            self.misses += 1
+            cache_requests.inc(cache="response", result="miss")
+            return None
+        self._entries.move_to_end(etag)
+        self.hits += 1
+        cache_requests.inc(cache="response", result="hit")
+        return entry
+
+    def put(self, etag: str, headers: list, body: bytes) -> None:
+        self._entries[etag] = (headers, body)
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            cache_evictions.inc(cache="response")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+register_collector(lambda: gauge_lines(
+    "response_cache_entries", "Rendered responses in the HTTP response cache",
+    {(): len(response_cache._entries)}
+))
+register_size_probe("response_cache", lambda: len(response_cache._entries))
+
+
+def compute_etag(path: str, query_string: bytes, version: Tuple, encoding: Optional[str] = None) -> str:
+    """
+    Build a strong ETag for a route, its query string and the data version.
+
+    Each content encoding is a different representation, so it gets its own ETag.
+    """
+    digest = hashlib.sha256(f"{path}?{query_string.decode('latin-1')}|{version!r}".encode("utf-8"))
+    suffix = f"-{encoding}" if encoding else ""
+    return f'"{digest.hexdigest()[:32]}{suffix}"'
+
+
+def get_cache_control() -> bytes:
+    """Cache-Control for cached routes: private, and revalidated unless a max age is set."""
+    if RESPONSE_CACHE_MAX_AGE > 0:
+        return f"private, max-age={RESPONSE_CACHE_MAX_AGE}, must-revalidate".encode("latin-1")
+    return b"private, no-cache"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware adding ETags, 304s and body caching to CACHED_ROUTES."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        get_version = CACHED_ROUTES.get(scope["path"])
+        if get_version is None:
+            await self.app(scope, receive, send)
+            return
+
+        version = await get_version()
+        etag = compute_etag(scope["path"], scope.get("query_string", b""), version, get_request_encoding(scope))
+        validators = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", get_cache_control()),
+        ]
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match and etag_matches(if_none_match.decode("latin-1"), etag):
+            response_cache.not_modified += 1
+            cache_requests.inc(cache="response", result="not_modified")
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": validators + [(b"vary", b"Accept-Encoding")],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cached = response_cache.get(etag)
+        if cached is not None:
+            headers, body = cached
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": headers + validators + [(b"content-length", str(len(body)).encode("latin-1"))],
+            })
+            await send({"type": "http.response.body", "body": body if scope["method"] == "GET" else b""})
+            return
+
+        await self._render_and_store(scope, receive, send, etag, validators, version, get_version)
+
+    async def _render_and_store(self, scope, receive, send, etag, validators, version, get_version):
+        """Run the route, add the validators and keep the body if it is cacheable."""
+        start_message = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                if message["status"] == 200:
+                    message = {**message, "headers": list(message.get("headers", [])) + validators}
+                await send(message)
+                return
+
+            if message["type"] == "http.response.body" and start_message["status"] == 200:
+                chunks.append(message.get("body", b""))
+                # Only keep the body if the data didn't change while it was rendered
+                if not message.get("more_body", False) and scope["method"] == "GET" and await get_version() == version:
+                    headers = [(name, value) for name, value in start_message.get("headers", [])
+                               if name.lower() in CACHED_HEADERS]
+                    response_cache.put(etag, headers, b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
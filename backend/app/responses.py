@@ -0,0 +1,179 @@
+"""
+Fast JSON responses and response compression.
+
+Routes return plain dictionaries and lists of JSON-native values, so they
+are serialized straight to bytes with orjson instead of going through
+FastAPI's jsonable_encoder pass and the stdlib json module. Large bodies
+are compressed with brotli (when installed) or gzip.
+"""
+
+from functools import wraps
+from typing import Any, Optional
+import gzip
+import inspect
+
+import orjson
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from app.config import COMPRESSION_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def _default(value: Any) -> Any:
+    """Fallback for values orjson can't serialize natively (e.g. Pydantic models)."""
+    return jsonable_encoder(value)
+
+
+def dump_json(content: Any) -> bytes:
+    """Serialize content to JSON bytes."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route returning plain dictionaries and lists as FastJSONResponse directly.
+
+    FastAPI otherwise runs every return value through jsonable_encoder
+    before serializing it, which copies the whole payload once more.
+    Routes with a response model keep FastAPI's validation path.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        if isinstance(response_model, DefaultPlaceholder):
+            response_model = response_model.value
+        annotated = inspect.signature(endpoint).return_annotation is not inspect.Signature.empty
+        if response_model is None and not annotated:
+            endpoint = _wrap_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _wrap_endpoint(endpoint, status_code: Optional[int]):
+    """Wrap an endpoint so plain dict/list results become FastJSONResponse."""
+    status_code = status_code or 200
+
+    def to_response(result):
+        if isinstance(result, (dict, list)):
+            return FastJSONResponse(result, status_code=status_code)
+        return result
+
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapped(*args, **kwargs):
+            return to_response(await endpoint(*args, **kwargs))
+    else:
+        @wraps(endpoint)
+        def wrapped(*args, **kwargs):
+            return to_response(endpoint(*args, **kwargs))
+
+    return wrapped
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the response encoding for an Accept-Encoding header value."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip().lower())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with the given encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def get_request_encoding(scope) -> Optional[str]:
+    """Negotiate the response encoding for an ASGI request scope."""
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            return negotiate_encoding(value.decode("latin-1"))
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON and text responses of at least
+    COMPRESSION_MIN_SIZE bytes with brotli or gzip.
+
+    Streamed responses (more than one body message) are passed through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = get_request_encoding(scope) if scope["type"] == "http" else None
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                passthrough = b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                if passthrough:
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming response: send it as is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = [(name, value) for name, value in start_message.get("headers", [])
+                       if name != b"content-length"]
+            headers.append((b"vary", b"Accept-Encoding"))
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+            await send({**start_message, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,221 @@
+"""
+Full-text search over ingested changes and their analyses.
+
+Uses a Postgres tsvector column with a GIN index in production and an
+SQLite FTS5 table for local runs. Both cover the change title, content,
+matched keywords and analysis summary, and return ranked results with
+highlighted matches.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+import re
+import time
+
+from sqlalchemy import text, bindparam, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# External-content FTS5 table kept in sync with `changes` by triggers
+SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS changes_fts USING fts5(
+        change_summary, content, matched_keywords, analysis_summary,
+        content='changes', content_rowid='rowid', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS changes_fts_insert AFTER INSERT ON changes BEGIN
+        INSERT INTO changes_fts(rowid, change_summary, content, matched_keywords, analysis_summary)
+        VALUES (new.rowid, new.change_summary, new.content, new.matched_keywords, new.analysis_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS changes_fts_delete AFTER DELETE ON changes BEGIN
+        INSERT INTO changes_fts(changes_fts, rowid, change_summary, content, matched_keywords, analysis_summary)
+        VALUES ('delete', old.rowid, old.change_summary, old.content, old.matched_keywords, old.analysis_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS changes_fts_update AFTER UPDATE ON changes BEGIN
+        INSERT INTO changes_fts(changes_fts, rowid, change_summary, content, matched_keywords, analysis_summary)
+        VALUES ('delete', old.rowid, old.change_summary, old.content, old.matched_keywords, old.analysis_summary);
+        INSERT INTO changes_fts(rowid, change_summary, content, matched_keywords, analysis_summary)
+        VALUES (new.rowid, new.change_summary, new.content, new.matched_keywords, new.analysis_summary);
+    END
+    """,
+]
+
+# Rank title matches above keyword/summary matches above body matches
+SQLITE_BM25_WEIGHTS = "10.0, 1.0, 5.0, 3.0"
+
+# Both searches return the total number of matches with every row; SQLite
+# counts them in a subquery, since FTS5 functions can't share a query with window functions
+POSTGRES_SEARCH_SQL = """
+SELECT c.*, ranked.rank, ranked.total,
+       ts_headline('english', c.change_summary, ranked.q,
+                   'HighlightAll=true, StartSel={start}, StopSel={end}') AS title_highlight,
+       ts_headline('english', coalesce(c.content, '') || ' ' || coalesce(c.analysis_summary, ''), ranked.q,
+                   'MaxFragments=2, MaxWords=30, MinWords=10, StartSel={start}, StopSel={end}') AS snippet
+FROM (
+    SELECT c.id, ts_rank_cd(c.search_vector, q) AS rank, q, count(*) OVER () AS total
+    FROM changes AS c, websearch_to_tsquery('english', :query) AS q
+    WHERE c.search_vector @@ q {filters}
+    ORDER BY rank DESC, c.detected_at DESC
+    LIMIT :limit OFFSET :offset
+) AS ranked
+JOIN changes AS c ON c.id = ranked.id
+ORDER BY ranked.rank DESC, c.detected_at DESC
+""".replace("{start}", HIGHLIGHT_START).replace("{end}", HIGHLIGHT_END)
+
+SQLITE_SEARCH_SQL = f"""
+SELECT c.*, -bm25(changes_fts, {SQLITE_BM25_WEIGHTS}) AS rank,
+       (SELECT count(*) FROM changes_fts JOIN changes AS c ON c.rowid = changes_fts.rowid
+        WHERE changes_fts MATCH :query {{filters}}) AS total,
+       highlight(changes_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') AS title_highlight,
+       snippet(changes_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24) AS snippet
+FROM changes_fts
+JOIN changes AS c ON c.rowid = changes_fts.rowid
+WHERE changes_fts MATCH :query {{filters}}
+ORDER BY bm25(changes_fts, {SQLITE_BM25_WEIGHTS}), c.detected_at DESC
+LIMIT :limit OFFSET :offset
+"""
+
+QUERY_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def to_fts5_query(query: str) -> str:
+    """
+    Convert a user search string into a safe FTS5 query.
+
+    Quoted phrases stay phrases and every other word becomes a quoted term,
+    so punctuation such as "cross-border" can't break the FTS5 syntax.
+    All terms must match.
+    """
+    terms = []
+    for phrase, word in QUERY_TERM_PATTERN.findall(query):
+        term = (phrase or word).replace('"', '').strip()
+        if term:
+            terms.append(f'"{term}"')
+    return " ".join(terms)
+
+
+async def create_sqlite_search_index(connection) -> None:
+    """Create the FTS5 table and sync triggers on an SQLite connection."""
+    for statement in SQLITE_FTS_DDL:
+        await connection.execute(text(statement))
+
+
+def _build_filters(risk_level: Optional[str], source: Optional[str],
+                   date_from: Optional[datetime], date_to: Optional[datetime]) -> str:
+    """Build the SQL filter clause for the optional search filters."""
+    filters = []
+    if risk_level:
+        filters.append("AND c.risk_level = :risk_level")
+    if source:
+        filters.append("AND c.source_id = :source")
+    if date_from:
+        filters.append("AND c.detected_at >= :date_from")
+    if date_to:
+        filters.append("AND c.detected_at <= :date_to")
+    return " ".join(filters)
+
+
+async def search_changes(
+    session: AsyncSession,
+    query: str,
+    risk_level: Optional[str] = None,
+    source: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict:
+    """
+    Search changes by title, content, matched keywords and analysis summary.
+
+    Args:
+        session: Database session
+        query: Search text; quoted phrases are matched as phrases
+        risk_level: Only return changes with this risk level
+        source: Only return changes from this source ID
+        date_from: Only return changes detected at or after this time
+        date_to: Only return changes detected at or before this time
+        limit: Maximum number of results
+        offset: Number of results to skip
+
+    Returns:
+        Dictionary with ranked, highlighted results and the total number of matches
+    """
+    started = time.perf_counter()
+    dialect = session.bind.dialect.name
+
+    if dialect == "sqlite":
+        query_text = to_fts5_query(query)
+        sql = SQLITE_SEARCH_SQL
+    else:
+        query_text = query
+        sql = POSTGRES_SEARCH_SQL
+
+    results = []
+    total = 0
+    if query_text.strip():
+        filters = _build_filters(risk_level, source, date_from, date_to)
+        statement = text(sql.replace("{filters}", filters))
+        params = {"query": query_text, "limit": limit, "offset": offset}
+        if risk_level:
+            params["risk_level"] = risk_level.lower()
+        if source:
+            params["source"] = source
+        # Dates are bound with the column type so SQLite compares them correctly
+        if date_from:
+            statement = statement.bindparams(bindparam("date_from", type_=DateTime))
+            params["date_from"] = date_from
+        if date_to:
+            statement = statement.bindparams(bindparam("date_to", type_=DateTime))
+            params["date_to"] = date_to
+
+        rows = (await session.execute(statement, params)).mappings().all()
+        # Every row carries the number of matches; past the last page, count them from the first
+        if not rows and offset > 0:
+            first = (await session.execute(statement, {**params, "limit": 1, "offset": 0})).mappings().all()
+            total = first[0]["total"] if first else 0
+        elif rows:
+            total = rows[0]["total"]
+        results = [_row_to_result(row) for row in rows]
+
+    return {
+        "query": query,
+        "results": results,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def _row_to_result(row) -> Dict:
+    """Convert a search result row into an API result."""
+    detected_at = row["detected_at"]
+    if isinstance(detected_at, str):
+        detected_at = datetime.fromisoformat(detected_at)
+
+    return {
+        "id": row["id"],
+        "sourceName": row["source_name"],
+        "sourceId": row["source_id"],
+        "changeSummary": row["change_summary"],
+        "detectedAt": detected_at.isoformat() + 'Z' if detected_at else None,
+        "riskLevel": row["risk_level"],
+        "affectedSector": row["affected_sector"],
+        "link": row["link"],
+        "matchedKeywords": row["matched_keywords"].split() if row["matched_keywords"] else [],
+        "analysisSummary": row["analysis_summary"],
+        "rank": round(float(row["rank"]), 4),
+        "highlights": {
+            "title": row["title_highlight"],
+            "snippet": row["snippet"]
+        }
+    }
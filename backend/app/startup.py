@@ -0,0 +1,187 @@
+"""
+Startup phases, readiness and import timing.
+
+API startup is split into must-have work (the knowledge base, which every
+endpoint reads) that runs before the server accepts requests, and
+background phases (analysis cache, database check, local schema, SDK
+warm-up) that run afterwards. Readiness is reported separately from
+liveness so a new worker is only sent traffic once the background phases
+it needs have finished.
+
+Import times of heavy SDKs loaded lazily on first use are recorded for
+the startup report, and with IMPORT_TIMING=true those of the app modules
+too (the app package installs the import hook before its first module
+loads). For a full per-module breakdown of a cold import, run:
+    python -m app.startup
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import importlib.abc
+import subprocess
+import sys
+import time
+
+_process_started = time.perf_counter()
+
+# Phases that must finish before the worker reports ready
+REQUIRED_PHASES = ["knowledge", "database", "schema", "analysis_cache"]
+
+_phases: Dict[str, Dict] = {}
+_import_timings: Dict[str, float] = {}
+_ready_at: Optional[float] = None
+
+
+class _TimingLoader(importlib.abc.Loader):
+    """Loader wrapper recording how long a module takes to execute."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            _import_timings[module.__name__] = round(time.perf_counter() - started, 4)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Meta path finder timing the imports of modules under a package prefix."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def find_spec(self, name, path, target=None):
+        if not name.startswith(self.prefix):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+
+def install_import_timer(prefix: str = "app.") -> None:
+    """Record import times of modules under `prefix` imported from now on."""
+    if not any(isinstance(finder, _TimingFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _TimingFinder(prefix))
+
+
+def record_import(name: str, seconds: float) -> None:
+    """Record the import time of a lazily imported dependency."""
+    _import_timings[name] = round(seconds, 4)
+
+
+@contextmanager
+def startup_phase(name: str):
+    """Time a startup phase and record whether it succeeded."""
+    _phases[name] = {"status": "running", "started_at": datetime.now().isoformat()}
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _phases[name].update(status="failed", error=str(e), seconds=round(time.perf_counter() - started, 4))
+        raise
+    _phases[name].update(status="done", seconds=round(time.perf_counter() - started, 4))
+
+
+def mark_ready() -> None:
+    """Record the time the worker became ready."""
+    global _ready_at
+
+    if _ready_at is None:
+        _ready_at = time.perf_counter()
+
+
+def is_ready() -> bool:
+    """Whether the required startup phases finished and the worker was marked ready."""
+    return _ready_at is not None and all(
+        _phases.get(name, {}).get("status") == "done" for name in REQUIRED_PHASES
+    )
+
+
+def get_uptime() -> float:
+    """Seconds since the app modules started loading."""
+    return round(time.perf_counter() - _process_started, 3)
+
+
+def get_startup_report() -> Dict:
+    """Get the startup phases, time to ready and import timings."""
+    return {
+        "ready": is_ready(),
+        "seconds_to_ready": round(_ready_at - _process_started, 3) if _ready_at is not None else None,
+        "uptime": get_uptime(),
+        "phases": dict(_phases),
+        "imports": dict(sorted(_import_timings.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def profile_cold_import(module: str = "app.main") -> List[Dict]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        One entry per imported module with self and cumulative seconds
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented two spaces per level after the separator space
+        name = name[1:]
+        timings.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+        })
+    return timings
+
+
+def main():
+    """Print a per-module cold import report."""
+    parser = argparse.ArgumentParser(description="Report per-module import times of the API")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to show")
+    args = parser.parse_args()
+
+    timings = profile_cold_import(args.module)
+    if not timings:
+        print(f"✗ Could not import {args.module}")
+        return
+
+    total = max(timing["cumulative"] for timing in timings)
+    packages = {}
+    for timing in timings:
+        package = timing["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + timing["self"]
+
+    print(f"Cold import of {args.module}: {total:.3f}s")
+    print("\nBy package (self time of all its modules):")
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {seconds:8.3f}s  {package}")
+    print("\nSlowest modules (self time):")
+    for timing in sorted(timings, key=lambda timing: timing["self"], reverse=True)[:args.top]:
+        print(f"  {timing['self']:8.3f}s  {timing['module']}")
+
+
+if __name__ == "__main__":
+    main()
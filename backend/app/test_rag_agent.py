@@ -1,15 +1,19 @@
 """
 Test script for RAG agent without calling Gemini API.
 Tests the retrieval and prompt construction logic.
+
+Run from the backend directory with pytest or as a script:
+    python -m pytest app/test_rag_agent.py
+    python -m app.test_rag_agent
 """
 
 import json
-from knowledge import load_company_profile, load_compliance_knowledge
-from rag_agent import retrieve_relevant_obligation, construct_prompt
+from app.knowledge import load_company_profile, load_compliance_knowledge
+from app.rag_agent import retrieve_relevant_obligation, construct_prompt
 
 
-def test_knowledge_loading():
-    """Test that knowledge base loads correctly."""
+def load_knowledge():
+    """Load the company profile and compliance knowledge, checking both are present."""
     print("Testing knowledge loading...")
     
     company_profile = load_company_profile()
@@ -26,11 +30,16 @@ def test_knowledge_loading():
     return company_profile, compliance_knowledge
 
 
+def test_knowledge_loading():
+    """Test that knowledge base loads correctly."""
+    load_knowledge()
+
+
 def test_retrieval():
     """Test obligation retrieval with different update texts."""
     print("Testing retrieval...")
     
-    _, compliance_knowledge = test_knowledge_loading()
+    _, compliance_knowledge = load_knowledge()
     
     test_cases = [
         ("Data breach notification timeline updated", "DPDP-004"),
@@ -54,7 +63,7 @@ def test_prompt_construction():
     """Test prompt construction."""
     print("Testing prompt construction...")
     
-    company_profile, compliance_knowledge = test_knowledge_loading()
+    company_profile, compliance_knowledge = load_knowledge()
     
     update_text = "Organizations must notify authorities within 72 hours of a data breach."
     obligation = retrieve_relevant_obligation(update_text, compliance_knowledge)
@@ -83,7 +92,7 @@ def test_full_flow():
     """Test the complete flow without API call."""
     print("Testing full flow (without API call)...")
     
-    company_profile, compliance_knowledge = test_knowledge_loading()
+    company_profile, compliance_knowledge = load_knowledge()
     
     update_text = """
     The Ministry has revised breach reporting timelines. Organizations must now 
@@ -146,7 +155,7 @@ def main():
         print()
         print("To run the full agent with Gemini API:")
         print("1. Set GEMINI_API_KEY in .env file")
-        print("2. Run: python app/rag_agent.py")
+        print("2. Run: python -m app.rag_agent")
         print()
         
     except AssertionError as e:
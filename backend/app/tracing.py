@@ -0,0 +1,190 @@
+"""
+Span tracing for the analysis pipeline.
+
+Stages of an analysis (obligation retrieval, prompt construction, the
+Gemini call, response parsing, the cache write) run inside spans. Spans
+nest through a context variable, so stages running in concurrent tasks
+still attach to the analysis that started them, and each span can report
+the time spent in each stage below it.
+
+Finished traces are exported in the OTLP/JSON format used by
+OpenTelemetry: appended one request per line to TRACE_EXPORT_FILE (which
+the OpenTelemetry Collector's otlpjsonfile receiver reads), and/or posted
+to an OTLP/HTTP collector at TRACE_EXPORT_ENDPOINT.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+from app.config import TRACE_EXPORT_FILE, TRACE_EXPORT_ENDPOINT
+from app.filelock import file_lock
+
+SERVICE_NAME = "compliance-backend"
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+_pending_exports = set()
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        self.children: List["Span"] = []
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.end_ns: Optional[int] = None
+        self.duration: Optional[float] = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the span started, or its duration once ended."""
+        seconds = self.duration if self.duration is not None else time.perf_counter() - self._started
+        return round(seconds * 1000, 2)
+
+    def timings(self) -> Dict[str, float]:
+        """Milliseconds spent in each stage below this span, summed by span name."""
+        totals: Dict[str, float] = {}
+        for child in self.walk():
+            if child is not self and child.duration is not None:
+                totals[child.name] = totals.get(child.name, 0) + child.duration
+        return {name: round(seconds * 1000, 2) for name, seconds in totals.items()}
+
+    def walk(self):
+        """Yield this span and all spans below it."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def get_current_span() -> Optional[Span]:
+    """Get the innermost active span, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Run a block inside a span.
+
+    A span started outside any other span begins a new trace, which is
+    exported when it ends.
+    """
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        if parent is None:
+            export_trace(current)
+
+
+def _attribute_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(root: Span) -> Dict:
+    """Convert a finished trace to an OTLP/JSON ExportTraceServiceRequest."""
+    spans = []
+    for item in root.walk():
+        otlp_span = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 1,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns or item.start_ns),
+            "attributes": [{"key": key, "value": _attribute_value(value)} for key, value in item.attributes.items()],
+            "status": {"code": item.status, "message": item.status_message} if item.status_message else {"code": item.status},
+        }
+        if item.parent is not None:
+            otlp_span["parentSpanId"] = item.parent.span_id
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+def _write_trace(line: str) -> None:
+    # Workers append to the same file; take turns so lines don't interleave
+    with _export_lock, file_lock(TRACE_EXPORT_FILE):
+        with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+async def _post_trace(payload: Dict) -> None:
+    from app.fetch import get_client
+
+    try:
+        await get_client().post(TRACE_EXPORT_ENDPOINT, json=payload)
+    except Exception as e:
+        print(f"⚠️  Could not export trace: {e}")
+
+
+def export_trace(root: Span) -> None:
+    """Export a finished trace to the configured file and/or collector."""
+    if not TRACE_EXPORT_FILE and not TRACE_EXPORT_ENDPOINT:
+        return
+
+    payload = to_otlp(root)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if TRACE_EXPORT_FILE:
+        line = json.dumps(payload, separators=(",", ":"))
+        if loop is not None:
+            loop.run_in_executor(None, _write_trace, line)
+        else:
+            _write_trace(line)
+
+    if TRACE_EXPORT_ENDPOINT and loop is not None:
+        task = loop.create_task(_post_trace(payload))
+        _pending_exports.add(task)
+        task.add_done_callback(_pending_exports.discard)
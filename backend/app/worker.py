@@ -0,0 +1,222 @@
+"""
+Analysis worker: runs queued analysis jobs outside the API.
+
+With ANALYSIS_MODE=queue, the API and ingestion queue changes in the
+`analysis_jobs` table (app.jobs) and workers run the Gemini analyses.
+Start as many workers as needed, on any hosts that share the database;
+they claim jobs without blocking each other, so throughput grows with the
+number of workers until Gemini or the database is the limit:
+    python -m app.worker --concurrency 4
+
+Each worker runs up to --concurrency jobs at once, highest ranked first,
+and heartbeats their leases. Jobs of a risk level only take up to its
+JOB_RISK_QUOTAS share of the slots (at least one), so with the default
+quotas a worker running four jobs keeps a slot for critical changes while
+working through a backlog of high-risk ones. Jobs whose Gemini calls
+don't fit the token budget (app.llm_budget) go back in the queue, and the
+worker claims nothing until the budget has room. SIGINT/SIGTERM stop it
+claiming new jobs; running jobs are finished first. Run until the queue is
+empty (retries included; dead jobs are left) and exit with:
+    python -m app.worker --drain
+"""
+
+from typing import Dict
+import argparse
+import asyncio
+import signal
+import time
+
+from app.auto_analyzer import AnalysisSkipped, run_analysis_job, flush_cache
+from app.config import (
+    JOB_LEASE_SECONDS, JOB_RISK_QUOTAS, KNOWLEDGE_WATCH_INTERVAL, WORKER_CONCURRENCY, WORKER_POLL_INTERVAL
+)
+from app.db import create_local_schema, engine
+from app.events import WORKER_ID
+from app.jobs import (
+    Job, QUEUED, claim_jobs, complete_job, count_unfinished_jobs, dead_letter_abandoned, defer_job, extend_leases,
+    fail_job, skip_job
+)
+from app.llm_budget import BudgetExceeded, llm_budget, start_usage_sync, stop_usage_sync
+from app.metrics import analysis_jobs
+
+# Polls between checks for jobs abandoned on their last attempt
+DEAD_LETTER_EVERY = 30
+
+
+def get_risk_quotas(concurrency: int, shares: Dict[str, float] = JOB_RISK_QUOTAS) -> Dict[str, int]:
+    """Slots each risk level may use in a worker running `concurrency` jobs at once."""
+    return {level: max(1, min(concurrency, int(concurrency * share))) for level, share in shares.items()}
+
+
+class AnalysisWorker:
+    """Claims due analysis jobs and runs up to `concurrency` of them at a time."""
+
+    def __init__(self, concurrency: int = WORKER_CONCURRENCY, poll_interval: float = WORKER_POLL_INTERVAL,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.quotas = get_risk_quotas(concurrency)
+        self.stats = {"done": 0, "skipped": 0, "retried": 0, "deferred": 0, "dead": 0, "lost": 0}
+        self._jobs: Dict[asyncio.Task, Job] = {}
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; run() returns once the running ones finish."""
+        self._stopping.set()
+
+    async def _run_job(self, job: Job) -> None:
+        started = time.perf_counter()
+        try:
+            try:
+                analyzed = await run_analysis_job(job.change)
+            except AnalysisSkipped as e:
+                outcome = "skipped" if await skip_job(job, e.prediction) else "lost"
+                print(f"✓ Job {job.id}: change {job.change_id} skipped by the pre-classifier")
+            except BudgetExceeded as e:
+                outcome = "deferred" if await defer_job(job, e.retry_after) else "lost"
+                print(f"⚠️  Job {job.id} (change {job.change_id}) deferred: {e}")
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                status = await fail_job(job, error)
+                outcome = "lost" if status is None else "retried" if status == QUEUED else "dead"
+                print(f"⚠️  Job {job.id} (change {job.change_id}) failed on attempt {job.attempt}: {error}")
+                if outcome == "dead":
+                    print(f"✗ Dead-lettered change {job.change_id} after {job.attempt} attempts")
+            else:
+                outcome = "done" if await complete_job(job) else "lost"
+                print(f"✓ Job {job.id}: change {job.change_id} analyzed for {analyzed} tenants "
+                      f"in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            # The lease expires and the job is claimed again
+            outcome = "lost"
+            print(f"⚠️  Could not record the outcome of job {job.id}: {e}")
+        if outcome == "lost":
+            print(f"⚠️  Job {job.id} (change {job.change_id}) was taken over by another worker")
+        self.stats[outcome] += 1
+        analysis_jobs.inc(outcome=outcome)
+
+    async def _heartbeat(self) -> None:
+        """Extend the leases of running jobs well before they expire."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            jobs = list(self._jobs.values())
+            try:
+                extended = set(await extend_leases(jobs, self.lease_seconds))
+            except Exception as e:
+                print(f"⚠️  Error extending job leases: {e}")
+                continue
+            for job in jobs:
+                if job.id not in extended:
+                    print(f"⚠️  Lost the lease of job {job.id} (change {job.change_id})")
+
+    def _free_quotas(self) -> Dict[str, int]:
+        """Slots each risk level with a quota may still take."""
+        running = [job.risk_level for job in self._jobs.values()]
+        return {level: max(0, slots - running.count(level)) for level, slots in self.quotas.items()}
+
+    async def _has_unfinished_jobs(self) -> bool:
+        try:
+            return await count_unfinished_jobs() > 0
+        except Exception as e:
+            print(f"⚠️  Error counting jobs: {e}")
+            return True
+
+    async def _wait(self) -> None:
+        """Wait for a job to finish, a stop request or the next poll."""
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            await asyncio.wait([stopping, *self._jobs], timeout=self.poll_interval,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+
+    async def run(self, drain: bool = False) -> Dict[str, int]:
+        """
+        Run jobs until stopped, or with `drain` until no job is queued or
+        running (dead jobs are left).
+
+        Returns:
+            Number of jobs by outcome: done, skipped (by the pre-classifier),
+            retried, deferred (over the token budget), dead, or lost
+            (another worker took the job over)
+        """
+        heartbeat = asyncio.create_task(self._heartbeat())
+        polls = 0
+        try:
+            while not self._stopping.is_set():
+                claimed = []
+                free = self.concurrency - len(self._jobs)
+                # Jobs would only be deferred until the token budget has room
+                if free > 0 and not llm_budget.retry_after():
+                    try:
+                        if polls % DEAD_LETTER_EVERY == 0:
+                            await dead_letter_abandoned()
+                        claimed = await claim_jobs(free, self.lease_seconds, quotas=self._free_quotas())
+                    except Exception as e:
+                        print(f"⚠️  Error claiming jobs: {e}")
+                    polls += 1
+
+                for job in claimed:
+                    task = asyncio.create_task(self._run_job(job))
+                    self._jobs[task] = job
+                    task.add_done_callback(self._jobs.pop)
+
+                if drain and not claimed and not self._jobs and not await self._has_unfinished_jobs():
+                    break
+                await self._wait()
+        finally:
+            if self._jobs:
+                await asyncio.gather(*self._jobs, return_exceptions=True)
+            heartbeat.cancel()
+        return dict(self.stats)
+
+
+async def start_worker() -> None:
+    """
+    Load what analyses need: the knowledge base and, for local SQLite runs,
+    the schema; then share token usage with the other workers.
+    """
+    from app.knowledge import initialize_knowledge_base, start_knowledge_watcher
+
+    await asyncio.to_thread(initialize_knowledge_base)
+    start_knowledge_watcher(KNOWLEDGE_WATCH_INTERVAL)
+    await create_local_schema()
+    start_usage_sync()
+
+
+def main():
+    """Command line entry point for analysis workers."""
+    parser = argparse.ArgumentParser(description="Run queued analysis jobs")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="Jobs run at once")
+    parser.add_argument("--poll-interval", type=float, default=WORKER_POLL_INTERVAL,
+                        help="Seconds between polls of an empty queue")
+    parser.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args()
+
+    async def run():
+        worker = AnalysisWorker(max(1, args.concurrency), args.poll_interval)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, worker.stop)
+            except NotImplementedError:  # Windows
+                pass
+
+        try:
+            await start_worker()
+            print(f"✓ Analysis worker {WORKER_ID} running {worker.concurrency} jobs at a time")
+            stats = await worker.run(drain=args.drain)
+            print(f"✓ Analysis worker stopped: {stats['done']} done, {stats['skipped']} skipped, "
+                  f"{stats['retried']} retried, {stats['deferred']} deferred, {stats['dead']} dead-lettered, "
+                  f"{stats['lost']} taken over")
+        finally:
+            await flush_cache()
+            await stop_usage_sync()
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
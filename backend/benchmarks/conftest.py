@@ -0,0 +1,90 @@
+"""
+Benchmark configuration and shared corpora.
+
+Corpus sizes are set on the command line, so quick local runs and full
+runs use the same suite:
+    python -m pytest benchmarks --corpus-sizes=1000,10000,100000 --obligation-counts=10,100,1000
+
+Save a run and compare later runs against it (results are stored as
+JSON under .benchmarks/, named after the commit):
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+from functools import lru_cache
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.models import Base
+from benchmarks.corpus import make_posts, make_knowledge, make_update_texts
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("corpus")
+    group.addoption("--corpus-sizes", default="1000,10000",
+                    help="Comma-separated press release corpus sizes (default: 1000,10000)")
+    group.addoption("--obligation-counts", default="10,100,1000",
+                    help="Comma-separated obligation counts (default: 10,100,1000)")
+
+
+def _sizes(config, option: str):
+    return [int(size) for size in config.getoption(option).split(",") if size.strip()]
+
+
+def pytest_generate_tests(metafunc):
+    if "corpus_size" in metafunc.fixturenames:
+        metafunc.parametrize("corpus_size", _sizes(metafunc.config, "corpus_sizes"))
+    if "obligation_count" in metafunc.fixturenames:
+        metafunc.parametrize("obligation_count", _sizes(metafunc.config, "obligation_counts"))
+
+
+# Corpora are shared by every benchmark using the same size
+cached_posts = lru_cache(maxsize=None)(make_posts)
+cached_knowledge = lru_cache(maxsize=None)(make_knowledge)
+
+
+@pytest.fixture
+def posts(corpus_size):
+    return cached_posts(corpus_size)
+
+
+@pytest.fixture
+def knowledge(obligation_count):
+    return cached_knowledge(obligation_count)
+
+
+@pytest.fixture(scope="session")
+def update_texts():
+    return make_update_texts(100)
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def sqlite_db(request, tmp_path, monkeypatch, loop):
+    """
+    A throwaway SQLite database standing in for the app's, parametrised
+    indirectly with the models whose tables it needs and the modules whose
+    `engine` it replaces:
+        @pytest.mark.parametrize("sqlite_db", [([AnalysisJob], [jobs])], indirect=True)
+    """
+    models, modules = request.param
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db", poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all, tables=[model.__table__ for model in models])
+
+    loop.run_until_complete(create())
+    for module in modules:
+        monkeypatch.setattr(module, "engine", engine)
+    yield engine
+    loop.run_until_complete(engine.dispose())
@@ -0,0 +1,118 @@
+"""
+Synthetic corpora for the benchmarks.
+
+Generated deterministically from a seed, so every run (and every commit)
+benchmarks the same data.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List
+import random
+
+from app.knowledge import load_compliance_knowledge
+from app.meity_service import KEYWORDS
+from app.records import CacheEntry
+
+# Knowledge version the synthetic analyses were made with
+KNOWLEDGE_VERSION = "0123456789ab"
+
+FILLER_WORDS = [
+    "ministry", "government", "announces", "launch", "scheme", "initiative", "citizens", "programme",
+    "national", "mission", "innovation", "startups", "workshop", "conference", "partnership", "services",
+    "electronics", "manufacturing", "semiconductor", "skills", "network", "infrastructure", "rural", "india",
+]
+
+CATEGORIES = ["Consent", "Rights", "Security", "Breach", "Transfer", "Retention", "Governance", "Children"]
+
+
+def _sentence(rng: random.Random, words: int, keyword_rate: float) -> str:
+    return " ".join(
+        rng.choice(KEYWORDS) if rng.random() < keyword_rate else rng.choice(FILLER_WORDS)
+        for _ in range(words)
+    )
+
+
+def make_posts(count: int, seed: int = 42) -> List[Dict]:
+    """
+    Build MeitY API posts; about half mention enough DPDP keywords to be relevant.
+    """
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    posts = []
+    for i in range(count):
+        keyword_rate = 0.2 if i % 2 else 0.01
+        title = _sentence(rng, 10, keyword_rate).capitalize()
+        body = ". ".join(_sentence(rng, 18, keyword_rate) for _ in range(6))
+        posts.append({
+            "ID": 100000 + i,
+            "post_title": title,
+            "post_date": (started + timedelta(minutes=37 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+            "post_slug": f"press-release-{i}",
+            "post_excerpt": f"<p>{body}</p><p><strong>{_sentence(rng, 8, keyword_rate)}</strong></p>",
+        })
+    return posts
+
+
+def make_knowledge(obligation_count: int, seed: int = 42) -> Dict:
+    """Build a compliance knowledge base with the real obligations followed by synthetic ones."""
+    rng = random.Random(seed)
+    knowledge = dict(load_compliance_knowledge() or {})
+    obligations = list(knowledge.get("obligations", []))[:obligation_count]
+    for i in range(len(obligations), obligation_count):
+        obligations.append({
+            "id": f"SYN-{i:04d}",
+            "title": f"{rng.choice(FILLER_WORDS).title()} {rng.choice(CATEGORIES)} Obligation {i}",
+            "description": _sentence(rng, 14, 0.1),
+            "category": rng.choice(CATEGORIES),
+            "severity": rng.choice(["critical", "high", "medium", "low"]),
+            "requirements": [_sentence(rng, 10, 0.1) for _ in range(4)],
+            "applicable_sections": [f"Section {rng.randint(1, 40)}"],
+            "penalties": "Up to ₹50 crores for non-compliance",
+        })
+    knowledge["obligations"] = obligations
+    return knowledge
+
+
+def make_update_texts(count: int, seed: int = 7) -> List[str]:
+    """Build regulatory update texts to run retrieval against."""
+    rng = random.Random(seed)
+    return [". ".join(_sentence(rng, 16, 0.15) for _ in range(4)) for _ in range(count)]
+
+
+def make_analysis(seed: int, obligation: Dict) -> Dict:
+    """Build an analysis like Gemini returns, with the fields added by the analyzer."""
+    rng = random.Random(seed)
+    return {
+        "applicable": rng.random() < 0.7,
+        "risk_level": rng.choice(["Critical", "High", "Medium", "Low"]),
+        "affected_obligation_id": obligation.get("id"),
+        "summary": _sentence(rng, 24, 0.1),
+        "tasks": [
+            {"title": _sentence(rng, 6, 0.1), "priority": "High", "deadline_days": rng.randint(1, 30)}
+            for _ in range(3)
+        ],
+        "reasoning_steps": [_sentence(rng, 12, 0.1) for _ in range(3)],
+        "retrieved_obligation": obligation,
+        "knowledge_version": KNOWLEDGE_VERSION,
+    }
+
+
+def make_cache_entry_dicts(count: int, obligations: List[Dict]) -> Dict:
+    """Build analysis cache entries, in their dictionary form, keyed by cache key."""
+    entries = {}
+    for i in range(count):
+        change_id = str(100000 + i)
+        entries[f"{change_id}@{KNOWLEDGE_VERSION}"] = {
+            "analysis": make_analysis(i, obligations[i % len(obligations)]),
+            "cached_at": datetime(2024, 1, 1).isoformat(),
+            "change_id": change_id,
+            "tenant_id": "default",
+            "knowledge_version": KNOWLEDGE_VERSION,
+            "update_text": f"Synthetic press release {i} on personal data protection",
+        }
+    return entries
+
+
+def make_cache_entries(count: int, obligations: List[Dict]) -> Dict:
+    """Build analysis cache entry records keyed by cache key."""
+    return {key: CacheEntry.from_dict(entry) for key, entry in make_cache_entry_dicts(count, obligations).items()}
@@ -0,0 +1,98 @@
+"""Benchmarks for analysis cache reads and writes."""
+
+import tracemalloc
+
+import pytest
+
+from app import analysis_cache, auto_analyzer, knowledge
+from app.analysis_cache import TieredAnalysisCache
+from app.models import CachedAnalysis
+from app.records import CacheEntry
+from benchmarks.corpus import KNOWLEDGE_VERSION, make_cache_entries, make_cache_entry_dicts, make_knowledge, make_analysis
+
+
+@pytest.fixture
+def cache_entries(corpus_size):
+    return make_cache_entries(corpus_size, make_knowledge(10)["obligations"])
+
+
+# A throwaway SQLite database for the durable tier
+cache_db = pytest.mark.parametrize("sqlite_db", [([CachedAnalysis], [analysis_cache])], indirect=True, ids=["sqlite"])
+
+
+@pytest.fixture
+def tiered_cache(monkeypatch):
+    cache = TieredAnalysisCache(max_entries=100000, ttl=0, flush_delay=0)
+    monkeypatch.setattr(auto_analyzer, "_analysis_cache", cache)
+    # Lookups are for the knowledge version the corpus analyses were made with
+    monkeypatch.setattr(knowledge, "get_tenant_knowledge_version", lambda tenant_id: KNOWLEDGE_VERSION)
+    return cache
+
+
+@pytest.mark.benchmark(group="analysis_cache_read")
+def test_cache_lookup(benchmark, cache_entries, tiered_cache, loop):
+    for key, entry in cache_entries.items():
+        tiered_cache.memory.put(key, entry)
+    change_ids = [entry.change_id for entry in cache_entries.values()]
+
+    hits = benchmark(lambda: loop.run_until_complete(auto_analyzer.get_cached_entries(change_ids)))
+    assert len(hits) == len(cache_entries)
+
+
+@pytest.mark.benchmark(group="analysis_cache_read")
+@cache_db
+def test_cache_read_through(benchmark, cache_entries, sqlite_db, tiered_cache, loop):
+    loop.run_until_complete(analysis_cache.write_entries(cache_entries))
+    change_ids = [entry.change_id for entry in cache_entries.values()]
+
+    def read():
+        tiered_cache.memory.clear()
+        return loop.run_until_complete(auto_analyzer.get_cached_entries(change_ids))
+
+    hits = benchmark.pedantic(read, rounds=5)
+    assert len(hits) == len(cache_entries)
+
+
+@pytest.mark.benchmark(group="analysis_cache_write")
+def test_cache_store(benchmark, cache_entries, tiered_cache):
+    obligation = make_knowledge(10)["obligations"][0]
+    analyses = [(entry.change_id, make_analysis(i, obligation)) for i, entry in enumerate(cache_entries.values())]
+
+    def store():
+        for change_id, analysis in analyses:
+            auto_analyzer._store_analysis(change_id, analysis, "update text", KNOWLEDGE_VERSION, "default")
+
+    benchmark(store)
+    assert len(tiered_cache.memory) == len(cache_entries)
+
+
+@pytest.mark.benchmark(group="analysis_cache_write")
+@cache_db
+def test_cache_flush(benchmark, cache_entries, sqlite_db, loop):
+    benchmark.pedantic(lambda: loop.run_until_complete(analysis_cache.write_entries(cache_entries)), rounds=5)
+    assert len(loop.run_until_complete(analysis_cache.load_recent_entries(len(cache_entries)))) == len(cache_entries)
+
+
+def _allocated(build) -> int:
+    tracemalloc.start()
+    try:
+        kept = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+@pytest.mark.benchmark(group="analysis_cache_memory")
+def test_cache_entry_memory(benchmark, corpus_size):
+    obligations = make_knowledge(10)["obligations"]
+    dicts = make_cache_entry_dicts(corpus_size, obligations)
+
+    # Records share interned strings and one copy of each obligation; dict entries copy both per entry
+    dict_bytes = _allocated(lambda: make_cache_entry_dicts(corpus_size, obligations))
+    record_bytes = _allocated(lambda: {key: CacheEntry.from_dict(entry) for key, entry in dicts.items()})
+    benchmark.extra_info.update(dict_bytes=dict_bytes, record_bytes=record_bytes)
+
+    benchmark.pedantic(lambda: {key: CacheEntry.from_dict(entry) for key, entry in dicts.items()}, rounds=3)
+    assert record_bytes < dict_bytes
@@ -0,0 +1,28 @@
+"""Benchmarks for press release processing, keyword filtering and risk scoring."""
+
+import pytest
+
+from app.meity_service import process_press_release, process_press_releases, match_keywords, calculate_risk_level
+
+
+@pytest.mark.benchmark(group="process_press_release")
+def test_process_press_release(benchmark, posts):
+    changes = benchmark(process_press_releases, posts)
+    assert 0 < len(changes) < len(posts)
+
+
+@pytest.mark.benchmark(group="keyword_filtering")
+def test_keyword_filtering(benchmark, posts):
+    texts = [f"{post['post_title']} {post['post_excerpt']}".lower() for post in posts]
+
+    matched = benchmark(lambda: [match_keywords(text) for text in texts])
+    assert len(matched) == len(posts)
+
+
+@pytest.mark.benchmark(group="calculate_risk_level")
+def test_calculate_risk_level(benchmark, posts):
+    changes = [change for change in map(process_press_release, posts) if change]
+    inputs = [(change["matchedKeywords"], change["changeSummary"], change["content"]) for change in changes]
+
+    levels = benchmark(lambda: [calculate_risk_level(*args) for args in inputs])
+    assert set(levels) <= {"critical", "high", "medium", "low"}
@@ -0,0 +1,17 @@
+"""Benchmarks for the Gemini token budget."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.llm_budget import TokenBudget
+
+
+@pytest.mark.benchmark(group="llm_budget")
+def test_check_with_a_day_of_usage(benchmark):
+    budget = TokenBudget(per_minute=10 ** 9, per_day=10 ** 12)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    budget._shared = {now - timedelta(minutes=minute): 50_000 for minute in range(24 * 60)}
+
+    # Every Gemini call is checked first, so this has to stay cheap next to the call
+    benchmark(budget.check, 2_000)
@@ -0,0 +1,72 @@
+"""Benchmarks for the analysis job queue."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import jobs
+from app.models import AnalysisJob
+
+CLAIM_BATCH = 8
+
+# A throwaway SQLite database for the job queue
+jobs_db = pytest.mark.parametrize("sqlite_db", [([AnalysisJob], [jobs])], indirect=True, ids=["sqlite"])
+
+
+@pytest.fixture
+def changes(posts):
+    return [{"id": f"job-{i}", "riskLevel": "high", "changeSummary": post["post_title"]} for i, post in enumerate(posts)]
+
+
+@pytest.mark.benchmark(group="analysis_jobs")
+@jobs_db
+def test_enqueue(benchmark, changes, sqlite_db, loop):
+    assert loop.run_until_complete(jobs.enqueue_changes(changes)) == len(changes)
+
+    # Enqueueing again (every page view of an unanalyzed change) leaves the queued jobs alone
+    queued = benchmark.pedantic(lambda: loop.run_until_complete(jobs.enqueue_changes(changes)), rounds=3)
+    assert queued == 0
+
+
+@pytest.mark.benchmark(group="analysis_jobs")
+@jobs_db
+def test_claim_and_complete(benchmark, changes, sqlite_db, loop):
+    async def drain():
+        done = 0
+        while claimed := await jobs.claim_jobs(CLAIM_BATCH):
+            for job in claimed:
+                done += await jobs.complete_job(job)
+        return done
+
+    def setup():
+        loop.run_until_complete(jobs.enqueue_changes(changes))
+
+    done = benchmark.pedantic(lambda: loop.run_until_complete(drain()), setup=setup, rounds=3)
+    assert done == len(changes)
+
+
+@jobs_db
+def test_priority_and_quotas(changes, sqlite_db, loop):
+    now = datetime.utcnow()
+    backlog = [{**change, "detectedAt": (now - timedelta(days=90)).isoformat() + "Z"} for change in changes[:10]]
+    critical = {"id": "breach-notice", "riskLevel": "critical", "detectedAt": now.isoformat() + "Z"}
+
+    async def run():
+        await jobs.enqueue_changes(backlog)
+        await jobs.enqueue_changes([critical])
+        # High-risk jobs may only take one of the three slots
+        return await jobs.claim_jobs(3, quotas={"high": 1})
+
+    claimed = loop.run_until_complete(run())
+    assert [job.risk_level for job in claimed] == ["critical", "high"]
+
+
+def test_aging():
+    now = datetime.utcnow()
+    high = {"id": "old", "riskLevel": "high", "detectedAt": (now - timedelta(days=90)).isoformat() + "Z"}
+    critical = {"id": "new", "riskLevel": "critical", "detectedAt": now.isoformat() + "Z"}
+    gap = jobs.priority_credit(critical, now) - jobs.priority_credit(high, now)
+
+    # A high-risk job that waited longer than the credit gap runs before a new critical one
+    assert jobs.rank_change(high, now - timedelta(seconds=gap + 1)) < jobs.rank_change(critical, now)
+    assert jobs.rank_change(high, now - timedelta(seconds=gap - 1)) > jobs.rank_change(critical, now)
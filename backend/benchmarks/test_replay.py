@@ -0,0 +1,47 @@
+"""Benchmarks for ingestion throughput over replayed upstream responses."""
+
+import asyncio
+import json
+
+import pytest
+
+from app import fetch
+from app.fixtures import FixtureArchive
+from app.meity_service import API_URL, fetch_press_releases, process_press_releases
+
+PAGE_SIZE = 100
+
+
+@pytest.fixture
+def replay_pages(posts, tmp_path):
+    """Record the corpus as MeitY API pages in a fixture archive and replay from it."""
+    archive = FixtureArchive(tmp_path / "fixtures")
+    pages = [posts[start:start + PAGE_SIZE] for start in range(0, len(posts), PAGE_SIZE)]
+    for page, page_posts in enumerate(pages, start=1):
+        body = json.dumps({
+            "posts": page_posts, "total_items": len(posts), "total_pages": len(pages), "current_page": page,
+        }).encode("utf-8")
+        archive.store("GET", API_URL, {"type": "Press Release", "limit": PAGE_SIZE, "page": page}, 200,
+                      {"content-type": "application/json"}, body)
+
+    previous_mode = fetch._mode
+    fetch.set_fetch_mode("replay", archive.path)
+    yield len(pages)
+    fetch.set_fetch_mode(previous_mode)
+
+
+@pytest.mark.benchmark(group="replay_ingestion")
+def test_replay_ingestion(benchmark, replay_pages, posts):
+    async def ingest():
+        changes = []
+        for page in range(1, replay_pages + 1):
+            data = await fetch_press_releases(page, PAGE_SIZE)
+            changes.extend(process_press_releases(data["posts"]))
+        return changes
+
+    loop = asyncio.new_event_loop()
+    try:
+        changes = benchmark(lambda: loop.run_until_complete(ingest()))
+    finally:
+        loop.close()
+    assert 0 < len(changes) < len(posts)
@@ -0,0 +1,35 @@
+"""Benchmarks for obligation retrieval and prompt construction."""
+
+import pytest
+
+from app.knowledge import load_company_profile
+from app.rag_agent import retrieve_relevant_obligation, construct_prompt, construct_multi_profile_prompt
+from benchmarks.corpus import make_knowledge
+
+
+@pytest.mark.benchmark(group="retrieve_relevant_obligation")
+def test_retrieve_relevant_obligation(benchmark, knowledge, update_texts):
+    obligations = benchmark(lambda: [retrieve_relevant_obligation(text, knowledge) for text in update_texts])
+    assert all(obligation.get("id") for obligation in obligations)
+
+
+@pytest.mark.benchmark(group="construct_prompt")
+def test_construct_prompt(benchmark, update_texts):
+    profile = load_company_profile()
+    knowledge = make_knowledge(10)
+    obligations = [retrieve_relevant_obligation(text, knowledge) for text in update_texts]
+
+    prompts = benchmark(lambda: [
+        construct_prompt(profile, text, obligation) for text, obligation in zip(update_texts, obligations)
+    ])
+    assert all(obligation["id"] in prompt for prompt, obligation in zip(prompts, obligations))
+
+
+@pytest.mark.benchmark(group="construct_prompt")
+def test_construct_multi_profile_prompt(benchmark, update_texts):
+    profile = load_company_profile()
+    profiles = {f"tenant-{i}": dict(profile, company_name=f"Tenant {i}") for i in range(5)}
+    obligation = retrieve_relevant_obligation(update_texts[0], make_knowledge(10))
+
+    prompts = benchmark(lambda: [construct_multi_profile_prompt(profiles, text, obligation) for text in update_texts])
+    assert all("tenant-4" in prompt for prompt in prompts)
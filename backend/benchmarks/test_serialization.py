@@ -0,0 +1,36 @@
+"""Benchmarks for JSON serialization and compression of API responses."""
+
+import gzip
+
+import pytest
+
+from app.bench_responses import build_feed, build_history, encode_default
+from app.responses import dump_json, GZIP_LEVEL
+
+PAYLOADS = {"feed": build_feed, "history": build_history}
+
+
+@pytest.fixture(params=[100, 1000], ids=lambda count: f"items={count}")
+def items(request):
+    return request.param
+
+
+@pytest.mark.parametrize("payload_name", PAYLOADS)
+@pytest.mark.benchmark(group="json_default")
+def test_encode_default(benchmark, payload_name, items):
+    payload = PAYLOADS[payload_name](items)
+    assert benchmark(encode_default, payload)
+
+
+@pytest.mark.parametrize("payload_name", PAYLOADS)
+@pytest.mark.benchmark(group="json_orjson")
+def test_encode_orjson(benchmark, payload_name, items):
+    payload = PAYLOADS[payload_name](items)
+    assert benchmark(dump_json, payload)
+
+
+@pytest.mark.benchmark(group="compression")
+def test_gzip_feed(benchmark, items):
+    body = dump_json(build_feed(items))
+    compressed = benchmark(gzip.compress, body, compresslevel=GZIP_LEVEL)
+    assert len(compressed) < len(body)
@@ -0,0 +1,3 @@
+"""Fixtures shared with the benchmarks."""
+
+from benchmarks.conftest import loop, sqlite_db  # noqa: F401
@@ -0,0 +1,97 @@
+"""Tests for analysis cache invalidation and knowledge versions."""
+
+import shutil
+
+import pytest
+
+from app import analysis_cache, events, knowledge
+from app.analysis_cache import Selection, TieredAnalysisCache, load_entries
+from app.models import CacheEvent, CachedAnalysis
+from app.records import CacheEntry
+
+# A throwaway SQLite database for the durable tier and the events it publishes
+cache_db = pytest.mark.parametrize(
+    "sqlite_db", [([CachedAnalysis, CacheEvent], [analysis_cache, events])], indirect=True, ids=["sqlite"]
+)
+
+
+def make_entry(change_id: str, tenant_id: str, version: str) -> CacheEntry:
+    return CacheEntry.from_dict({
+        "analysis": {"applicable": True, "risk_level": "High", "summary": f"{change_id} for {tenant_id}"},
+        "cached_at": "2026-01-01T00:00:00",
+        "change_id": change_id,
+        "tenant_id": tenant_id,
+        "knowledge_version": version,
+    })
+
+
+@cache_db
+def test_stale_analyses_are_invalidated_per_tenant(sqlite_db, loop):
+    entries = {
+        "DEMO-001@d1": make_entry("DEMO-001", "default", "d1"),
+        "payments:DEMO-001@p0": make_entry("DEMO-001", "payments", "p0"),
+        "payments:DEMO-001@p1": make_entry("DEMO-001", "payments", "p1"),
+        "retired:DEMO-001@d1": make_entry("DEMO-001", "retired", "d1"),
+    }
+    # Only the payments profile changed (p0 -> p1), and the retired tenant was removed
+    current = Selection(current_versions={"default": "d1", "payments": "p1"})
+
+    async def run():
+        cache = TieredAnalysisCache(max_entries=100, ttl=0, flush_delay=0)
+        for key, entry in entries.items():
+            cache.put(key, entry)
+        assert await cache.flush()
+        # Another worker applies the same selection from the published event
+        assert Selection(**current.to_dict()).to_dict() == current.to_dict()
+        removed = await cache.invalidate(current)
+        return removed, set(cache.memory.entries()), set(await load_entries(entries))
+
+    removed, in_memory, in_database = loop.run_until_complete(run())
+    assert removed == 2
+    assert in_memory == in_database == {"DEMO-001@d1", "payments:DEMO-001@p1"}
+
+
+@cache_db
+def test_invalidation_removes_unwritten_entries(sqlite_db, loop):
+    async def run():
+        cache = TieredAnalysisCache(max_entries=100, ttl=0, flush_delay=60)
+        cache.put("DEMO-001@d1", make_entry("DEMO-001", "default", "d1"))
+        cache.put("DEMO-002@d1", make_entry("DEMO-002", "default", "d1"))
+        removed = await cache.invalidate(Selection(change_id="DEMO-001"))
+        assert await cache.flush()
+        return removed, set(await load_entries(["DEMO-001@d1", "DEMO-002@d1"]))
+
+    removed, in_database = loop.run_until_complete(run())
+    assert removed == 1
+    assert in_database == {"DEMO-002@d1"}
+
+
+def test_tenant_versions_only_follow_their_files(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    shutil.copytree(knowledge.DATA_DIR, data, ignore=shutil.ignore_patterns("analysis_cache*"))
+    monkeypatch.setattr(knowledge, "COMPANY_PROFILE_FILE", data / "company_profile.json")
+    monkeypatch.setattr(knowledge, "COMPLIANCE_KNOWLEDGE_FILE", data / "compliance_knowledge.json")
+    monkeypatch.setattr(knowledge, "COMPANY_PROFILES_DIR", data / "company_profiles")
+    monkeypatch.setattr(knowledge, "FRAMEWORKS_DIR", data / "frameworks")
+
+    before = knowledge.build_knowledge_snapshot()
+    payments = data / "company_profiles" / "payments.json"
+    payments.write_text(payments.read_text() + "\n")
+    framework = next((data / "frameworks").glob("*.json"))
+    framework.write_text(framework.read_text() + "\n")
+    (data / "company_profiles" / "lending.json").write_text('{"company_name": "Lending"}')
+    after = knowledge.build_knowledge_snapshot()
+
+    assert after.version != before.version
+    assert after.tenant_version("payments") != before.tenant_version("payments")
+    # Other tenants keep their version, and so their cached analyses
+    for tenant_id in before.tenant_versions:
+        if tenant_id != "payments":
+            assert after.tenant_version(tenant_id) == before.tenant_version(tenant_id)
+    assert "lending" in after.tenant_versions
+
+    # Every tenant depends on the compliance knowledge
+    knowledge_file = data / "compliance_knowledge.json"
+    knowledge_file.write_text(knowledge_file.read_text() + "\n")
+    edited = knowledge.build_knowledge_snapshot()
+    assert all(edited.tenant_version(tenant_id) != after.tenant_version(tenant_id) for tenant_id in after.tenant_versions)
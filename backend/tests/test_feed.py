@@ -0,0 +1,80 @@
+"""Tests for the keyset-paginated changes feed."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.feed import decode_cursor, list_changes
+from app.models import Change
+
+# A throwaway SQLite database with just the changes table
+feed_db = pytest.mark.parametrize("sqlite_db", [([Change], [])], indirect=True, ids=["sqlite"])
+
+START = datetime(2026, 1, 1)
+
+
+def make_change(change_id: str, detected_at: datetime, risk_level: str = "high") -> Change:
+    return Change(id=change_id, source_id="meity", source_name="MeitY", change_summary=change_id,
+                  detected_at=detected_at, risk_level=risk_level, ingest_seq=1)
+
+
+async def add_changes(engine, changes):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all(changes)
+        await session.commit()
+
+
+async def page_ids(engine, **kwargs):
+    async with AsyncSession(engine) as session:
+        page = await list_changes(session, **kwargs)
+    return [change["id"] for change in page["changes"]], page
+
+
+@feed_db
+def test_cursor_stable_while_changes_arrive(sqlite_db, loop):
+    # Ten changes a minute apart, and two more detected with c06, so a page boundary falls between them
+    changes = [make_change(f"c{i:02d}", START + timedelta(minutes=i)) for i in range(10)]
+    changes += [make_change("tie-a", START + timedelta(minutes=6)), make_change("tie-b", START + timedelta(minutes=6))]
+
+    async def run():
+        await add_changes(sqlite_db, changes)
+        seen = []
+        first, page = await page_ids(sqlite_db, limit=4)
+        seen += first
+        # Newer changes arriving in front don't shift the pages already being read
+        await add_changes(sqlite_db, [make_change(f"new{i}", START + timedelta(days=1, minutes=i)) for i in range(3)])
+        while page["hasNext"]:
+            ids, page = await page_ids(sqlite_db, limit=4, cursor=page["nextCursor"])
+            seen += ids
+        back, _ = await page_ids(sqlite_db, limit=4, cursor=page["prevCursor"], direction="prev")
+        return first, seen, back, page
+
+    first, seen, back, last = loop.run_until_complete(run())
+    expected = sorted(changes, key=lambda change: (change.detected_at, change.id), reverse=True)
+    assert seen == [change.id for change in expected]
+    assert first == seen[:4]
+    # Going back from the last page gives the page before it
+    assert back == seen[4:8]
+    assert not last["hasNext"] and last["nextCursor"] is None
+
+
+@feed_db
+def test_filters_and_first_page(sqlite_db, loop):
+    changes = [make_change(f"c{i}", START + timedelta(minutes=i), "critical" if i % 2 else "low") for i in range(5)]
+
+    async def run():
+        await add_changes(sqlite_db, changes)
+        return await page_ids(sqlite_db, limit=10, risk_level="CRITICAL", include_total=True)
+
+    ids, page = loop.run_until_complete(run())
+    assert ids == ["c3", "c1"]
+    assert page["total"] == 2 and page["totalIsApproximate"] is False
+    assert page["prevCursor"] is None and not page["hasPrev"]
+
+
+def test_invalid_cursor_and_direction(loop):
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        loop.run_until_complete(list_changes(None, direction="sideways"))
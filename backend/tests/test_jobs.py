@@ -0,0 +1,80 @@
+"""Tests for the analysis job queue's leases."""
+
+import pytest
+
+from app import jobs
+from app.models import AnalysisJob
+
+# A throwaway SQLite database for the job queue
+jobs_db = pytest.mark.parametrize("sqlite_db", [([AnalysisJob], [jobs])], indirect=True, ids=["sqlite"])
+
+CHANGES = [{"id": f"job-{i}", "riskLevel": "high", "changeSummary": f"Change {i}"} for i in range(3)]
+
+
+@jobs_db
+def test_lease_fencing(sqlite_db, loop):
+    async def run():
+        await jobs.enqueue_changes(CHANGES[:1])
+        [job] = await jobs.claim_jobs(1, lease_seconds=0)
+        # The lease expired, so the job is claimed again as a new attempt
+        [retry] = await jobs.claim_jobs(1)
+        assert retry.attempt == job.attempt + 1
+
+        # The first attempt can no longer change the job in any way
+        assert await jobs.extend_leases([job, retry]) == [retry.id]
+        assert not await jobs.complete_job(job)
+        assert await jobs.fail_job(job, "late failure") is None
+        assert not await jobs.skip_job(job, {"send_to_llm": False})
+        assert not await jobs.defer_job(job, 60)
+
+        assert await jobs.fail_job(retry, "failed", max_attempts=3) == jobs.QUEUED
+        return await jobs.get_job(job.change_id)
+
+    job = loop.run_until_complete(run())
+    assert job["status"] == jobs.QUEUED
+    assert job["attempts"] == 2
+    assert job["error"] == "failed"
+
+
+@jobs_db
+def test_finished_lease_cannot_be_reused(sqlite_db, loop):
+    async def run():
+        await jobs.enqueue_changes(CHANGES[:1])
+        [job] = await jobs.claim_jobs(1)
+        assert await jobs.complete_job(job)
+        # Completing twice, or failing after completing, is refused
+        assert not await jobs.complete_job(job)
+        assert await jobs.fail_job(job, "late failure") is None
+        return await jobs.get_job(job.change_id)
+
+    assert loop.run_until_complete(run())["status"] == jobs.DONE
+
+
+@jobs_db
+def test_concurrent_claims_are_disjoint(sqlite_db, loop):
+    async def run():
+        await jobs.enqueue_changes(CHANGES)
+        first = await jobs.claim_jobs(2)
+        second = await jobs.claim_jobs(2)
+        return first, second
+
+    first, second = loop.run_until_complete(run())
+    assert len(first) == 2 and len(second) == 1
+    assert not {job.id for job in first} & {job.id for job in second}
+
+
+@jobs_db
+def test_skipped_job_stays_skipped(sqlite_db, loop):
+    prediction = {"applicable": False, "send_to_llm": False}
+
+    async def run():
+        await jobs.enqueue_changes(CHANGES[:1])
+        [job] = await jobs.claim_jobs(1)
+        assert await jobs.skip_job(job, prediction)
+        # Viewing the change again doesn't queue it again
+        assert await jobs.enqueue_changes(CHANGES[:1], demanded=True) == 0
+        return await jobs.get_job(job.change_id)
+
+    job = loop.run_until_complete(run())
+    assert job["status"] == jobs.SKIPPED
+    assert job["pre_classification"] == prediction
@@ -0,0 +1,50 @@
+"""Tests for the Gemini token budget."""
+
+import pytest
+
+from app import llm_budget as budget_module
+from app.llm_budget import BudgetExceeded, TokenBudget
+from app.models import LlmUsage
+
+
+def test_minute_budget():
+    budget = TokenBudget(per_minute=1_000)
+    budget.record(600, 200, "meity", ["default"])
+    budget.check(200)
+
+    with pytest.raises(BudgetExceeded) as refused:
+        with budget.reserve(100):
+            budget.check(150)
+    assert refused.value.window == "minute"
+    assert 0 < refused.value.retry_after <= 120
+    assert budget.retry_after() > 0
+    # The reservation was released with the refused call
+    assert budget.status()["reserved"] == 0
+
+
+@pytest.mark.parametrize("sqlite_db", [([LlmUsage], [budget_module])], indirect=True, ids=["sqlite"])
+def test_usage_shared_between_workers(sqlite_db, loop):
+    api, worker = TokenBudget(per_day=1_000), TokenBudget(per_day=1_000)
+    # A multi-profile call: its tokens are split between the tenants
+    api.record(701, 200, "meity", ["default", "fintech", "health"])
+
+    async def run():
+        # Usage not written yet is counted the same way
+        unsynced = await api.get_usage()
+        assert unsynced["by_source"]["meity"]["calls"] == 1
+        assert unsynced["by_tenant"]["fintech"]["calls"] == 1
+        await api.sync()
+        await worker.sync()
+        return await worker.get_usage()
+
+    usage = loop.run_until_complete(run())
+    # One Gemini call for the source; each tenant counts it, with its share of the tokens
+    assert usage["by_source"]["meity"] == {"calls": 1, "prompt_tokens": 701, "output_tokens": 200}
+    assert usage["by_tenant"]["default"] == {"calls": 1, "prompt_tokens": 235, "output_tokens": 68}
+    assert worker.status()["used"]["day"] == 901
+
+    with pytest.raises(BudgetExceeded) as refused:
+        worker.check(200)
+    assert refused.value.window == "day"
+    # Room again once the call's minute leaves the rolling day
+    assert refused.value.retry_after > 23 * 3600
@@ -0,0 +1,38 @@
+"""Tests for the fields=/view projection of change payloads."""
+
+import pytest
+
+from app.projection import COMPACT_FIELDS, parse_fields, project_change
+
+CHANGE = {
+    "id": "DEMO-001",
+    "changeSummary": "Breach notification within 72 hours",
+    "content": "Full press release text",
+    "ai_analysis": {"applicable": True, "risk_level": "High", "summary": "Update the incident runbook"},
+}
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields(None, "compact") == COMPACT_FIELDS
+    # Blank entries and whitespace are dropped, and the ID is always included
+    assert parse_fields(" changeSummary, ,ai_analysis.risk_level ") == ["id", "changeSummary", "ai_analysis.risk_level"]
+    assert parse_fields("changeSummary,id") == ["changeSummary", "id"]
+    # fields= takes precedence over the view
+    assert parse_fields("changeSummary", "compact") == ["id", "changeSummary"]
+
+    with pytest.raises(ValueError):
+        parse_fields(None, "summary")
+
+
+def test_project_change():
+    assert project_change(CHANGE, None) is CHANGE
+    assert project_change(CHANGE, parse_fields("changeSummary,ai_analysis.risk_level")) == {
+        "id": "DEMO-001",
+        "changeSummary": "Breach notification within 72 hours",
+        "ai_analysis": {"risk_level": "High"},
+    }
+    # Unknown fields and nested keys are ignored, and so is a nested key of a non-object
+    assert project_change(CHANGE, parse_fields("unknown,ai_analysis.unknown,content.length")) == {"id": "DEMO-001"}
+    # Selecting the whole object keeps all of it
+    assert project_change(CHANGE, parse_fields("ai_analysis"))["ai_analysis"] == CHANGE["ai_analysis"]
@@ -0,0 +1,64 @@
+"""Tests for ETag revalidation of cached routes."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import response_cache as response_cache_module
+from app.response_cache import ResponseCacheMiddleware, response_cache
+
+
+def make_client(monkeypatch):
+    version = {"value": 1}
+    calls = []
+
+    async def get_version():
+        return ("test", version["value"])
+
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware)
+
+    @app.get("/data")
+    async def data(page: int = 1):
+        calls.append(page)
+        return {"page": page, "version": version["value"]}
+
+    monkeypatch.setitem(response_cache_module.CACHED_ROUTES, "/data", get_version)
+    response_cache.clear()
+    return TestClient(app), version, calls
+
+
+def test_etag_revalidation(monkeypatch):
+    client, version, calls = make_client(monkeypatch)
+
+    first = client.get("/data")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    # Revalidating an unchanged version is a 304 without running the route
+    revalidated = client.get("/data", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    # A client without the ETag gets the stored body
+    assert client.get("/data").json() == first.json()
+    assert calls == [1]
+
+    # Other query strings are other representations
+    assert client.get("/data?page=2", headers={"If-None-Match": etag}).status_code == 200
+
+    # A new data version changes the ETag, so the old one no longer matches
+    version["value"] = 2
+    changed = client.get("/data", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json() == {"page": 1, "version": 2}
+    assert calls == [1, 2, 1]
+
+
+def test_if_none_match_lists_and_weak_tags(monkeypatch):
+    client, _, _ = make_client(monkeypatch)
+    etag = client.get("/data").headers["etag"]
+
+    assert client.get("/data", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/data", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/data", headers={"If-None-Match": '"other"'}).status_code == 200
@@ -65,7 +65,7 @@ export function ChangesFeedPage() {
   const [analysisError, setAnalysisError] = useState<string | null>(null);
 
   const { data: changesData, loading: changesLoading } = useApi(
-    () => api.getChanges(1, 50),
+    () => api.getChangeList(1, 50),
     []
   );
 
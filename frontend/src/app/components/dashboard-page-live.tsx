@@ -34,7 +34,7 @@ export function DashboardPage() {
     []
   );
   const { data: changesData, loading: changesLoading } = useApi(
-    () => api.getChanges(1, 10),
+    () => api.getChangeList(1, 10),
     []
   );
   const { data: sourcesData } = useApi(() => api.getSources(), []);
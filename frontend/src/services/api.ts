@@ -14,12 +14,26 @@ export interface Change {
   ai_analysis?: any;
 }
 
-export interface ChangesResponse {
-  changes: Change[];
-  total: number;
-  page: number;
+// Compact list representation: no content and only the analysis verdict
+export type ChangeListItem = Omit<Change, 'content' | 'matchedKeywords' | 'ai_analysis'> & {
+  ai_analysis?: { applicable?: boolean; risk_level?: string };
+};
+
+export type ChangesView = 'full' | 'compact';
+
+export interface ChangesResponse<T = Change> {
+  changes: T[];
   limit: number;
-  totalPages: number;
+  // Keyset pagination: pass a cursor back to get the adjacent page
+  nextCursor?: string | null;
+  prevCursor?: string | null;
+  hasNext?: boolean;
+  hasPrev?: boolean;
+  total?: number;
+  totalIsApproximate?: boolean;
+  // Only set when the feed is served live before anything is ingested
+  page?: number;
+  totalPages?: number;
 }
 
 export interface Stats {
@@ -91,8 +105,21 @@ export const api = {
   getChanges: (page: number = 1, limit: number = 10, autoAnalyze: boolean = true): Promise<ChangesResponse> =>
     api.get(`/api/changes?page=${page}&limit=${limit}&auto_analyze=${autoAnalyze}`),
 
-  getChange: (id: string): Promise<Change> =>
-    api.get(`/api/changes/${id}`),
+  // List views fetch the compact representation; details come from getChange
+  getChangeList: (
+    page: number = 1,
+    limit: number = 10,
+    autoAnalyze: boolean = true,
+    cursor?: string,
+    direction: 'next' | 'prev' = 'next'
+  ): Promise<ChangesResponse<ChangeListItem>> =>
+    api.get(
+      `/api/changes?page=${page}&limit=${limit}&auto_analyze=${autoAnalyze}&view=compact` +
+        (cursor ? `&cursor=${encodeURIComponent(cursor)}&direction=${direction}` : '')
+    ),
+
+  getChange: (id: string, includeAnalysis: boolean = false): Promise<Change> =>
+    api.get(`/api/changes/${id}?include_analysis=${includeAnalysis}`),
 
   getStats: (): Promise<Stats> =>
     api.get('/api/stats'),